@@ -5,9 +5,13 @@ from bs4 import BeautifulSoup
 import json
 from datetime import datetime
 import time
+import argparse
 import csv
+import os
 import re
 from urllib.parse import urljoin
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -15,44 +19,23 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
 
-import time
-from datetime import datetime
-
-def run_weekly_scraper(scraper, max_pages=None, max_schemes=None):
-    """
-    Runs the UnifiedSchemeScraper once every week in a continuous loop.
-    scraper = instance of UnifiedSchemeScraper()
-    """
-
-    WEEK_SECONDS = 7 * 24 * 60 * 60  # 604800 seconds
-
-    print("==============================================")
-    print("📅 WEEKLY SCRAPER STARTED")
-    print("It will run automatically every 7 days.")
-    print("==============================================\n")
-
-    while True:
-        start_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        print(f"\n🚀 Running scraper at: {start_time}")
-        print("----------------------------------------------------")
-
-        try:
-            scraper.run_complete_scrape(
-                max_pages=max_pages,
-                max_schemes=max_schemes
-            )
-            print("\n✅ Weekly scrape completed successfully!")
-
-        except Exception as e:
-            print(f"\n❌ Error during weekly scraping: {e}")
-
-        print("\n⏳ Sleeping for 7 days...\n")
-        time.sleep(WEEK_SECONDS)  # Wait a full week
+from scrape_output import JsonlStreamWriter, stream_path, write_summary_csv, write_failed_csv, iter_jsonl
+from corpus import compile_corpus
+from html_cache import HtmlCache
+from rate_limit import AdaptiveRateLimiter, RetryQueue, backoff_delay
 
 class UnifiedSchemeScraper:
-    def __init__(self):
-        self.base_url = "https://www.myscheme.gov.in"
-        self.search_url = "https://www.myscheme.gov.in/search"
+    def __init__(self, html_cache_dir="html_cache", rate_limiter=None, max_attempts=3,
+                 base_url="https://www.myscheme.gov.in"):
+        # Raw HTML of every fetched scheme page is kept so parsers can be re-run offline
+        self.html_cache = HtmlCache(html_cache_dir) if html_cache_dir else None
+        # One limiter paces every page load (listing and detail); failures are retried with backoff
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.retry_queue = RetryQueue(max_attempts=max_attempts)
+        # Overridable so benchmarks can point the crawler at a local fixture site (mock_site.py)
+        self.base_url = base_url
+        self.search_url = f"{base_url}/search"
+        self._paused = 0.0  # fixed listing-page sleeps so far; excluded from the latency the limiter sees
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -73,6 +56,19 @@ class UnifiedSchemeScraper:
         
         return webdriver.Chrome(options=options)
     
+    def _pause(self, seconds):
+        """Fixed wait between listing-page actions (not page latency)"""
+        time.sleep(seconds)
+        self._paused += seconds
+    
+    def _page_clock(self):
+        return time.monotonic(), self._paused
+    
+    def _page_seconds(self, clock):
+        """Time since _page_clock() minus the fixed pauses in between, i.e. what the site actually took"""
+        started, paused = clock
+        return max(0.0, time.monotonic() - started - (self._paused - paused))
+    
     def scrape_all_scheme_urls(self, max_pages=None):
         """Phase 1: Scrape all scheme URLs from search pages"""
         driver = self.setup_driver()
@@ -83,22 +79,25 @@ class UnifiedSchemeScraper:
             print("=" * 70)
             print(f"\n🔍 Loading {self.search_url}...\n")
             
+            self.rate_limiter.acquire()
+            page_clock = self._page_clock()
             driver.get(self.search_url)
             wait = WebDriverWait(driver, 20)
-            time.sleep(5)
+            self._pause(5)
             
             try:
                 wait.until(EC.presence_of_element_located((By.XPATH, "//h2[contains(@id, 'scheme-name')]")))
                 print("✅ Search page loaded successfully!\n")
             except TimeoutException:
                 print("⏳ Extended wait for page load...")
-                time.sleep(5)
+                self._pause(5)
             
             all_urls = []
             seen_urls = set()
             current_page = 1
             max_attempts_no_schemes = 3
             consecutive_no_schemes = 0
+            page_attempts = 0
             
             while True:
                 if max_pages and current_page > max_pages:
@@ -109,13 +108,13 @@ class UnifiedSchemeScraper:
                 print(f"📄 Scraping Page {current_page}")
                 print(f"{'='*70}")
                 
-                time.sleep(4)
+                self._pause(4)
                 
                 # Scroll to load content
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
+                self._pause(2)
                 driver.execute_script("window.scrollTo(0, 0);")
-                time.sleep(1)
+                self._pause(1)
                 
                 # Parse current page
                 soup = BeautifulSoup(driver.page_source, "html.parser")
@@ -137,6 +136,15 @@ class UnifiedSchemeScraper:
                             page_schemes += 1
                 
                 if page_schemes == 0:
+                    page_attempts += 1
+                    self.rate_limiter.record(self._page_seconds(page_clock), ok=False)
+                    if page_attempts < self.retry_queue.max_attempts:
+                        # Page may still be rendering or throttled - back off and rescan it
+                        delay = backoff_delay(page_attempts)
+                        print(f"🔁 No schemes on page {current_page} yet - rescanning in {delay:.1f}s")
+                        self._pause(delay)
+                        continue
+                    
                     consecutive_no_schemes += 1
                     print(f"⚠️ No schemes found on page {current_page} (attempt {consecutive_no_schemes}/{max_attempts_no_schemes})")
                     
@@ -144,11 +152,15 @@ class UnifiedSchemeScraper:
                         print(f"❌ No schemes found after {max_attempts_no_schemes} consecutive pages. Stopping.")
                         break
                 else:
+                    self.rate_limiter.record(self._page_seconds(page_clock), ok=True)
                     consecutive_no_schemes = 0
                     print(f"✅ Found {page_schemes} schemes on page {current_page}")
                     print(f"📊 Total schemes collected: {len(all_urls)}\n")
                 
                 # Navigate to next page
+                self.rate_limiter.acquire()
+                page_clock = self._page_clock()
+                page_attempts = 0
                 if not self._go_to_next_page(driver, current_page):
                     print(f"\n⚡ No more pages found - finished at page {current_page}")
                     break
@@ -177,7 +189,7 @@ class UnifiedSchemeScraper:
     def _go_to_next_page(self, driver, current_page):
         """Navigate to the next page in pagination"""
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
+        self._pause(2)
         
         # Strategy 1: Find and click next page number
         try:
@@ -199,7 +211,7 @@ class UnifiedSchemeScraper:
                         
                         if "bg-green-700" not in btn_classes:
                             driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", btn)
-                            time.sleep(1)
+                            self._pause(1)
                             
                             try:
                                 btn.click()
@@ -207,7 +219,7 @@ class UnifiedSchemeScraper:
                                 driver.execute_script("arguments[0].click();", btn)
                             
                             print(f"🔄 Clicked page number {btn_page_num}")
-                            time.sleep(5)
+                            self._pause(5)
                             return True
                 except (StaleElementReferenceException, ValueError):
                     continue
@@ -236,10 +248,10 @@ class UnifiedSchemeScraper:
                                 continue
                             
                             driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", parent)
-                            time.sleep(1)
+                            self._pause(1)
                             driver.execute_script("arguments[0].click();", parent)
                             print(f"🔄 Clicked next arrow → Page {current_page + 1}")
-                            time.sleep(5)
+                            self._pause(5)
                             return True
                 except:
                     continue
@@ -253,30 +265,24 @@ class UnifiedSchemeScraper:
         driver = self.setup_driver()
         
         try:
-            driver.get(scheme_url)
-            
-            wait = WebDriverWait(driver, 15)
-            wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            self.rate_limiter.acquire()
+            start = time.monotonic()
+            try:
+                driver.get(scheme_url)
+                wait = WebDriverWait(driver, 15)
+                wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            except Exception:
+                self.rate_limiter.record(time.monotonic() - start, ok=False)
+                raise
+            self.rate_limiter.record(time.monotonic() - start, ok=True)
             time.sleep(3)
             
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            
-            data = {
-                'scheme_name': self.extract_scheme_name(soup),
-                'scheme_details': self.extract_scheme_details(soup),
-                'eligibility': self.extract_section_by_keyword(soup, ['eligibility', 'eligible', 'who can apply', 'beneficiary']),
-                'benefits': self.extract_section_by_keyword(soup, ['benefit', 'benefits', 'assistance', 'financial support', 'amount']),
-                'application_process': self.extract_section_by_keyword(soup, ['application', 'how to apply', 'process', 'procedure', 'registration', 'apply']),
-                'documents_required': self.extract_section_by_keyword(soup, ['document', 'documents required', 'papers', 'required documents']),
-                'contact_info': self.extract_contact_info(soup),
-                'all_sections': self.extract_all_sections(soup),
-                'metadata': {
-                    'scraped_at': datetime.now().isoformat(),
-                    'source_url': scheme_url
-                }
-            }
+            html = driver.page_source
+            fetched_at = datetime.now().isoformat()
+            if self.html_cache is not None:
+                self.html_cache.put(scheme_url, html, fetched_at)
             
-            return data
+            return self.parse_scheme_html(html, scheme_url, fetched_at)
         
         except Exception as e:
             return {
@@ -290,6 +296,25 @@ class UnifiedSchemeScraper:
         finally:
             driver.quit()
     
+    def parse_scheme_html(self, html, scheme_url, scraped_at):
+        """Parse stage: turn a scheme page's HTML into structured data (no network access)"""
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        return {
+            'scheme_name': self.extract_scheme_name(soup),
+            'scheme_details': self.extract_scheme_details(soup),
+            'eligibility': self.extract_section_by_keyword(soup, ['eligibility', 'eligible', 'who can apply', 'beneficiary']),
+            'benefits': self.extract_section_by_keyword(soup, ['benefit', 'benefits', 'assistance', 'financial support', 'amount']),
+            'application_process': self.extract_section_by_keyword(soup, ['application', 'how to apply', 'process', 'procedure', 'registration', 'apply']),
+            'documents_required': self.extract_section_by_keyword(soup, ['document', 'documents required', 'papers', 'required documents']),
+            'contact_info': self.extract_contact_info(soup),
+            'all_sections': self.extract_all_sections(soup),
+            'metadata': {
+                'scraped_at': scraped_at,
+                'source_url': scheme_url
+            }
+        }
+    
     def extract_scheme_name(self, soup):
         """Extract scheme name"""
         selectors = [
@@ -455,8 +480,68 @@ class UnifiedSchemeScraper:
             }
         }
     
-    def run_complete_scrape(self, max_pages=None, max_schemes=None, save_intermediate=True):
-        """Run complete scraping process: URLs first, then details"""
+    def scrape_details_to_stream(self, scheme_urls, writer, failed_writer):
+        """
+        Phase 2: scrape each scheme and stream it to disk as soon as it is parsed.
+        Failed schemes go to the retry queue with exponential backoff and are only
+        written to the failed stream once their attempts are used up.
+        """
+        succeeded = 0
+        failed = 0
+        pending = deque(scheme_urls)
+        total = len(scheme_urls)
+        done = 0
+        
+        while pending or len(self.retry_queue):
+            retry = self.retry_queue.pop_ready()
+            if retry is not None:
+                scheme_info, attempts = retry
+            elif pending:
+                scheme_info, attempts = pending.popleft(), 0
+            else:
+                # Only backed-off retries left - wait for the earliest one
+                time.sleep(self.retry_queue.next_ready_in() or 0)
+                continue
+            
+            label = f"retry {attempts}" if attempts else f"{done + 1}/{total}"
+            print(f"\n[{label}] Scraping: {scheme_info['name'][:60]}...")
+            
+            try:
+                scheme_data = self.scrape_scheme_details(scheme_info['url'])
+                if 'error' in scheme_data:
+                    error = scheme_data['error'] or 'Unknown error'
+                else:
+                    error = None
+                    writer.write(self.format_for_ai_agent(scheme_data))
+            except Exception as e:
+                error = str(e) or 'Unknown error'
+            
+            if error is None:
+                succeeded += 1
+                done += 1
+                print(f"    ✅ Success")
+            elif self.retry_queue.push(scheme_info, attempts + 1, error):
+                print(f"    🔁 Failed ({error}) - queued for retry")
+            else:
+                failed_writer.write({
+                    'name': scheme_info['name'],
+                    'url': scheme_info['url'],
+                    'error': error,
+                    'attempts': attempts + 1
+                })
+                failed += 1
+                done += 1
+                print(f"    ❌ Failed after {attempts + 1} attempts: {error}")
+        
+        print(f"\n📈 Rate limiter: {self.rate_limiter.stats()}")
+        return succeeded, failed
+    
+    def run_complete_scrape(self, max_pages=None, max_schemes=None, save_intermediate=True, compression=None):
+        """
+        Run complete scraping process: URLs first, then details.
+        Schemes are streamed to a JSONL file (optionally gzip/zstd compressed) as they
+        are parsed; summaries are derived from that stream afterwards.
+        """
         
         print("=" * 70)
         print("🚀 UNIFIED MYSCHEME SCRAPER")
@@ -500,131 +585,168 @@ class UnifiedSchemeScraper:
         print("PHASE 2: SCRAPING DETAILED INFORMATION")
         print("=" * 70)
         
-        all_schemes_data = []
-        failed_schemes = []
+        schemes_stream = stream_path(f"all_schemes_{timestamp}.jsonl", compression)
+        failed_stream = f"failed_schemes_{timestamp}.jsonl"
+        print(f"📝 Streaming schemes to {schemes_stream}")
         
-        for idx, scheme_info in enumerate(scheme_urls, 1):
-            print(f"\n[{idx}/{len(scheme_urls)}] Scraping: {scheme_info['name'][:60]}...")
-            
-            try:
-                scheme_data = self.scrape_scheme_details(scheme_info['url'])
-                
-                if 'error' not in scheme_data:
-                    ai_formatted = self.format_for_ai_agent(scheme_data)
-                    all_schemes_data.append(ai_formatted)
-                    print(f"    ✅ Success")
-                else:
-                    failed_schemes.append({
-                        'name': scheme_info['name'],
-                        'url': scheme_info['url'],
-                        'error': scheme_data.get('error', 'Unknown error')
-                    })
-                    print(f"    ❌ Failed: {scheme_data.get('error', 'Unknown error')}")
-                
-                # Save intermediate results every 10 schemes
-                if save_intermediate and idx % 10 == 0:
-                    backup_filename = f"schemes_backup_{timestamp}_{idx}.json"
-                    with open(backup_filename, 'w', encoding='utf-8') as f:
-                        json.dump(all_schemes_data, f, indent=2, ensure_ascii=False)
-                    print(f"    💾 Backup saved: {backup_filename}")
-                
-                time.sleep(2)  # Respectful delay
-                
-            except Exception as e:
-                print(f"    ❌ Unexpected error: {str(e)}")
-                failed_schemes.append({
-                    'name': scheme_info['name'],
-                    'url': scheme_info['url'],
-                    'error': str(e)
-                })
+        # With save_intermediate the stream is fsynced every 10 schemes (the old backup cadence)
+        fsync_every = 10 if save_intermediate else 0
+        with JsonlStreamWriter(schemes_stream, compression, fsync_every=fsync_every) as writer, \
+                JsonlStreamWriter(failed_stream, fsync_every=fsync_every) as failed_writer:
+            succeeded, failed = self.scrape_details_to_stream(scheme_urls, writer, failed_writer)
         
-        # Final save with timestamp
+        # Derived outputs: a separate pass over the streams
         print("\n" + "=" * 70)
-        print("💾 SAVING FINAL RESULTS")
+        print("💾 DERIVING SUMMARIES FROM STREAM")
         print("=" * 70)
+        print(f"✅ Streamed {succeeded} complete schemes to {schemes_stream}")
+        
+        summary_csv = f"schemes_summary_{timestamp}.csv"
+        write_summary_csv(schemes_stream, summary_csv)
+        print(f"✅ Saved summary to {summary_csv}")
         
-        # Save complete schemes data in multiple formats
-        complete_json = f"all_schemes_complete_{timestamp}.json"
-        with open(complete_json, 'w', encoding='utf-8') as f:
-            json.dump(all_schemes_data, f, indent=2, ensure_ascii=False)
-        print(f"✅ Saved {len(all_schemes_data)} complete schemes to {complete_json}")
+        corpus_db = f"schemes_{timestamp}.db"
+        compile_corpus(iter_jsonl(schemes_stream), corpus_db)
+        print(f"✅ Compiled corpus to {corpus_db}")
         
-        # Save raw data (non-AI formatted) for reference
-        raw_json = f"all_schemes_raw_{timestamp}.json"
-        with open(raw_json, 'w', encoding='utf-8') as f:
+        manifest_json = f"scrape_manifest_{timestamp}.json"
+        with open(manifest_json, 'w', encoding='utf-8') as f:
             json.dump({
                 'total_schemes': len(scheme_urls),
-                'successfully_scraped': len(all_schemes_data),
-                'failed': len(failed_schemes),
+                'successfully_scraped': succeeded,
+                'failed': failed,
                 'scraping_date': datetime.now().isoformat(),
-                'schemes': all_schemes_data
+                'schemes_file': schemes_stream,
+                'corpus_file': corpus_db,
+                'failed_file': failed_stream if failed else None
             }, f, indent=2, ensure_ascii=False)
-        print(f"✅ Saved complete data with metadata to {raw_json}")
+        print(f"✅ Saved run metadata to {manifest_json}")
         
-        # Save as CSV summary
-        summary_csv = f"schemes_summary_{timestamp}.csv"
-        with open(summary_csv, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "Scheme Name", 
-                "Eligibility Count", 
-                "Benefits Count", 
-                "Documents Count",
-                "Application Steps Count",
-                "Has Contact Info",
-                "Source URL"
-            ])
-            for scheme in all_schemes_data:
-                kb = scheme.get('knowledge_base_entry', {})
-                ki = kb.get('key_information', {})
-                writer.writerow([
-                    kb.get('scheme', 'Unknown'),
-                    len(ki.get('eligibility_criteria', [])),
-                    len(ki.get('benefits', [])),
-                    len(ki.get('required_documents', [])),
-                    len(ki.get('application_steps', [])),
-                    'Yes' if kb.get('contact', {}) else 'No',
-                    kb.get('source', '')
-                ])
-        print(f"✅ Saved summary to {summary_csv}")
-        
-        if failed_schemes:
-            failed_json = f"failed_schemes_{timestamp}.json"
-            with open(failed_json, 'w', encoding='utf-8') as f:
-                json.dump(failed_schemes, f, indent=2, ensure_ascii=False)
-            print(f"⚠️  Saved {len(failed_schemes)} failed schemes to {failed_json}")
-            
-            # Save failed schemes as CSV too
+        if failed:
             failed_csv = f"failed_schemes_{timestamp}.csv"
-            with open(failed_csv, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Scheme Name", "URL", "Error"])
-                for failed in failed_schemes:
-                    writer.writerow([failed['name'], failed['url'], failed['error']])
-            print(f"⚠️  Saved failed schemes to {failed_csv}")
+            write_failed_csv(failed_stream, failed_csv)
+            print(f"⚠️  Saved {failed} failed schemes to {failed_stream} and {failed_csv}")
+        else:
+            os.remove(failed_stream)
         
         # Summary
         print("\n" + "=" * 70)
         print("📊 SCRAPING SUMMARY")
         print("=" * 70)
         print(f"Total schemes found: {len(scheme_urls)}")
-        print(f"Successfully scraped: {len(all_schemes_data)}")
-        print(f"Failed: {len(failed_schemes)}")
-        print(f"Success rate: {len(all_schemes_data)/len(scheme_urls)*100:.1f}%")
+        print(f"Successfully scraped: {succeeded}")
+        print(f"Failed: {failed}")
+        print(f"Success rate: {succeeded/len(scheme_urls)*100:.1f}%")
         print(f"End Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("=" * 70)
+        
+        return schemes_stream
+
+
+# =========================
+# OFFLINE REPARSE MODE
+# =========================
+_reparse_scraper = None
+_reparse_cache = None
+
+
+def _init_reparse_worker(cache_dir):
+    global _reparse_scraper, _reparse_cache
+    _reparse_scraper = UnifiedSchemeScraper(html_cache_dir=None)
+    _reparse_cache = HtmlCache(cache_dir)
+
+
+def _reparse_entry(entry):
+    """Worker: parse + format one cached page; returns (entry, record or error)"""
+    html = _reparse_cache.get(entry['sha256'])
+    if html is None:
+        return entry, {'error': 'cached HTML object missing'}
+    try:
+        data = _reparse_scraper.parse_scheme_html(html, entry['url'], entry['fetched_at'])
+        return entry, _reparse_scraper.format_for_ai_agent(data)
+    except Exception as e:
+        return entry, {'error': str(e)}
+
+
+def reparse_cached_html(cache_dir="html_cache", output_path=None, workers=None, compression=None):
+    """
+    Re-run the parse and format_for_ai_agent stages over the latest cached HTML
+    of every URL, in parallel across cores and without any network access.
+    """
+    cache = HtmlCache(cache_dir)
+    entries = sorted(cache.latest_entries(), key=lambda e: e['url'])
+    if not entries:
+        print(f"❌ No cached pages found in {cache_dir}")
+        return None
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_path = output_path or stream_path(f"all_schemes_reparsed_{timestamp}.jsonl", compression)
+    failed_path = f"failed_reparse_{timestamp}.jsonl"
+    
+    print("=" * 70)
+    print(f"♻️  REPARSING {len(entries)} CACHED PAGES (offline)")
+    print("=" * 70)
+    start = time.time()
+    
+    succeeded = failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_reparse_worker, initargs=(cache_dir,)) as pool, \
+            JsonlStreamWriter(output_path, compression) as writer, \
+            JsonlStreamWriter(failed_path) as failed_writer:
+        # Ordered map keeps the output deterministic for reproducible parser benchmarks
+        for entry, record in pool.map(_reparse_entry, entries, chunksize=8):
+            if 'error' in record:
+                failed_writer.write({'name': '', 'url': entry['url'], 'error': record['error']})
+                failed += 1
+            else:
+                writer.write(record)
+                succeeded += 1
+    
+    if not failed:
+        os.remove(failed_path)
+    
+    elapsed = time.time() - start
+    print(f"✅ Reparsed {succeeded} schemes into {output_path} in {elapsed:.1f}s")
+    if failed:
+        print(f"⚠️  {failed} pages failed to parse (see {failed_path})")
+    
+    summary_csv = f"schemes_summary_reparsed_{timestamp}.csv"
+    write_summary_csv(output_path, summary_csv)
+    print(f"✅ Saved summary to {summary_csv}")
+    return output_path
 
 
 if __name__ == "__main__":
-    scraper = UnifiedSchemeScraper()
-    run_weekly_scraper(scraper, max_pages=10, max_schemes=50)
+    parser = argparse.ArgumentParser(description="MyScheme scraper")
+    parser.add_argument("mode", nargs="?", default="scrape", choices=["scrape", "reparse", "schedule"],
+                        help="'scrape' crawls the site once; 'reparse' re-runs the parsers over cached HTML offline; "
+                             "'schedule' runs the persistent crawl scheduler")
+    parser.add_argument("--cache-dir", default="html_cache", help="Raw HTML cache directory")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes for reparse (default: all cores)")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default=None)
+    args = parser.parse_args()
+    
+    if args.mode == "reparse":
+        reparse_cached_html(cache_dir=args.cache_dir, workers=args.workers, compression=args.compression)
+        raise SystemExit(0)
+    
+    scraper = UnifiedSchemeScraper(html_cache_dir=args.cache_dir)
+    
+    if args.mode == "schedule":
+        # Imported here: the scheduler pulls in graph_snapshot (numpy), which scrape/reparse don't need
+        from scheduler import CrawlScheduler
+        # Listing refresh, prioritized detail recrawls and index rebuilds, with state persisted across restarts
+        CrawlScheduler(scraper).run_forever()
+        raise SystemExit(0)
+    
     # Configuration
     MAX_PAGES = None  # Set to None for all pages, or a number like 5 for testing
     MAX_SCHEMES = None  # Set to None for all schemes, or a number like 10 for testing
+    COMPRESSION = args.compression  # None for plain JSONL, or "gzip" / "zstd"
     
     # Run complete scraping process
     scraper.run_complete_scrape(
         max_pages=MAX_PAGES,
         max_schemes=MAX_SCHEMES,
-        save_intermediate=True
-    )   
\ No newline at end of file
+        save_intermediate=True,
+        compression=COMPRESSION
+    )
\ No newline at end of file
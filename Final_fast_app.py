@@ -1,3 +1,4 @@
+import io
 import os
 import json
 import re
@@ -8,13 +9,16 @@ import speech_recognition as sr
 from dotenv import load_dotenv
 from datetime import datetime
 
-# LangChain / LLM imports
-from langchain.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.schema import Document
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
+from ocr_service import OcrService, OcrBusyError, make_config, format_timings, run_ocr
+from ocr_fields import run_field_ocr
+from ocr_cache import OcrCache, make_key as make_ocr_cache_key
+from id_documents import detect_document_type, extract_aadhaar_details, complete_ocr_result
+from eligibility_schema import load_table as load_eligibility_table
+import tracing
+from rerun_profiler import RerunProfiler, stop_active as stop_rerun_profiler
+from token_accounting import TokenLedger, UsageLog
+from scheme_matcher import (SchemeMatcher, EvaluationBudget, open_vectordb, build_vectordb, load_eligibility_data,
+                            make_llm_router, is_eligible)
 
 # =========================
 # CONFIG
@@ -25,16 +29,44 @@ load_dotenv()
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 JSON_PATH = "schemes.json"
+CORPUS_PATH = "schemes.db"  # compiled from JSON_PATH; see corpus.py
 ELIGIBILITY_JSON_PATH = "eligibility_summary-2.json"
 DB_DIR = "rag_db"
 EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 HISTORY_PATH = "user_history.json"
+OCR_WORKERS = 2
+OCR_TARGET_DPI = 300  # OCR latency scales with this, not with the upload's resolution
+OCR_CACHE_DIR = "ocr_cache"
+LLM_PARALLEL = 4  # eligibility evaluations in flight at once (most relevant schemes first)
+# "fake" = offline stand-in (fake_llm.py) for load and regression testing
+LLM_OPTIONS = ["gemini", "grok"] + (["fake"] if os.getenv("SAHAYAK_FAKE_LLM") else [])
 
 st.set_page_config(page_title="Intelligent Government Scheme Assistant (SAHAYAK)", layout="wide")
 
+# Opt-in sampling profile of this rerun (Advanced Settings); stops one left over from an interrupted rerun
+stop_rerun_profiler()
+rerun_profiler = RerunProfiler(__file__).start() if st.session_state.get("profile_reruns") else None
+
+# Per-rerun timing trace for the debug panel (Advanced Settings); also drops a
+# trace left behind by an interrupted rerun
+if st.session_state.get("debug_timings"):
+    rerun_trace = tracing.start_trace("rerun")
+else:
+    tracing.finish_trace()
+    rerun_trace = None
+
+@st.cache_resource
+def start_metrics_server():
+    """Prometheus /metrics for this Streamlit process when SAHAYAK_METRICS_PORT is set"""
+    port = os.getenv("SAHAYAK_METRICS_PORT")
+    return tracing.serve_metrics(int(port)) if port else None
+
+start_metrics_server()
+
 # =========================
 # USER HISTORY SYSTEM
 # =========================
+@tracing.traced("load_user_history")
 def load_user_history():
     """Load user search history from JSON file"""
     if not os.path.exists(HISTORY_PATH):
@@ -46,6 +78,7 @@ def load_user_history():
         st.error(f"Error loading history: {e}")
         return []
 
+@tracing.traced("save_user_history")
 def save_user_history(entry):
     """Save a new search entry to user history"""
     history = load_user_history()
@@ -72,12 +105,8 @@ def load_data():
     # Check if vector DB already exists - much faster loading
     if os.path.exists(DB_DIR) and os.path.exists(os.path.join(DB_DIR, "chroma.sqlite3")):
         try:
-            embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-            vectordb = Chroma(persist_directory=DB_DIR, embedding_function=embeddings)
-            
-            with open(ELIGIBILITY_JSON_PATH, "r", encoding="utf-8") as f:
-                eligibility_json = json.load(f)
-            eligibility_data = {item["scheme_name"]: item["eligibility"] for item in eligibility_json}
+            vectordb = open_vectordb(DB_DIR, EMBED_MODEL)
+            eligibility_data = load_eligibility_data(ELIGIBILITY_JSON_PATH)
             
             # Get approximate doc count
             num_docs = len(eligibility_data)
@@ -86,40 +115,10 @@ def load_data():
             st.warning(f"Existing DB load failed: {e}. Rebuilding...")
     
     # Build new vector DB (slower first-time process)
-    with open(JSON_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    docs = []
-    for entry in data:
-        kb = entry["knowledge_base_entry"]
-        text_parts = [f"Scheme: {kb.get('scheme', '')}", f"Summary: {kb.get('summary', '')}"]
-
-        for section in ["key_information", "all_extracted_sections"]:
-            section_data = kb.get(section, {})
-            if isinstance(section_data, dict):
-                for key, value in section_data.items():
-                    if isinstance(value, list):
-                        text_parts.extend(value)
-                    elif isinstance(value, str):
-                        text_parts.append(value)
-
-        full_text = "\n".join(text_parts).strip()
-        if full_text:
-            docs.append(Document(page_content=full_text, metadata={"scheme": kb.get("scheme", "Unknown")}))
-
-    with open(ELIGIBILITY_JSON_PATH, "r", encoding="utf-8") as f:
-        eligibility_json = json.load(f)
-
-    eligibility_data = {item["scheme_name"]: item["eligibility"] for item in eligibility_json}
+    vectordb, num_docs = build_vectordb(JSON_PATH, CORPUS_PATH, DB_DIR, EMBED_MODEL)
+    eligibility_data = load_eligibility_data(ELIGIBILITY_JSON_PATH)
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
-
-    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-    vectordb = Chroma.from_documents(chunks, embedding=embeddings, persist_directory=DB_DIR)
-    vectordb.persist()
-
-    return vectordb, eligibility_data, len(docs), False
+    return vectordb, eligibility_data, num_docs, False
 
 # Initialize session state for loading status
 if 'data_loaded' not in st.session_state:
@@ -139,144 +138,130 @@ user_gemini_key = st.sidebar.text_input("Gemini API Key (leave empty to use fall
 GROQ_FALLBACK = None  # set to a string if you have a fallback Groq key
 GEMINI_FALLBACK = None  # set to a string if you have a fallback Gemini key
 
+# =========================
+# Sidebar: evaluation budget (early exit)
+# =========================
+with st.sidebar.expander("🎯 Evaluation Budget"):
+    budgeted_mode = st.checkbox("Budgeted mode", value=False,
+                                help="Stop early instead of evaluating every retrieved candidate")
+    budget_max_eligible = st.number_input("Stop after N eligible schemes (0 = no limit)", min_value=0, max_value=30, value=5)
+    budget_max_tokens = st.number_input("Token budget (0 = no limit)", min_value=0, max_value=500000, value=20000, step=1000)
+    budget_max_seconds = st.number_input("Time budget in seconds (0 = no limit)", min_value=0, max_value=600, value=30)
+    budget_min_score = st.slider("Min retrieval score (LLM is never called below it)", 0.0, 1.0, 0.0, 0.05)
+
+def make_budget():
+    """EvaluationBudget from the sidebar settings, or None when budgeted mode is off"""
+    if not budgeted_mode:
+        return None
+    return EvaluationBudget(
+        max_eligible=budget_max_eligible or None,
+        max_tokens=budget_max_tokens or None,
+        max_seconds=budget_max_seconds or None,
+        min_score=budget_min_score or None
+    )
+
+@st.cache_resource
+def get_llm_router(llm_choice, groq_key, gemini_key):
+    """Provider router kept across reruns, so latency percentiles and circuit breakers persist"""
+    return make_llm_router(llm_choice, groq_key=groq_key, gemini_key=gemini_key)
+
 def get_llm_instance(llm_choice):
     """
     Uses user-provided key if present, otherwise falls back to hardcoded.
+    The selected LLM is the primary; the other provider (if it initialises)
+    takes failover and hedged requests.
     """
     groq_key = user_groq_key.strip() or GROQ_FALLBACK
     gemini_key = user_gemini_key.strip() or GEMINI_FALLBACK
 
-    if llm_choice.lower() == "grok":
-        try:
-            return ChatGroq(model="llama-3.3-70b-versatile", temperature=0, api_key=groq_key)
-        except Exception as e:
-            st.error(f"Failed to initialize Groq: {e}")
-            return None
-    elif llm_choice.lower() == "gemini":
-        try:
-            if gemini_key:
-                return ChatGoogleGenerativeAI(model="gemini-2.0-flash-001", temperature=0, google_api_key=gemini_key)
-            else:
-                return ChatGoogleGenerativeAI(model="gemini-2.0-flash-001", temperature=0)
-        except Exception as e:
-            st.error(f"Failed to initialize Gemini: {e}")
-            return None
-    return None
+    try:
+        return get_llm_router(llm_choice, groq_key, gemini_key)
+    except Exception as e:
+        st.error(f"Failed to initialize {llm_choice}: {e}")
+        return None
 
 # =========================
-# Utility: retrieval context
+# Matching (core logic lives in scheme_matcher.SchemeMatcher)
 # =========================
 def retrieve_context(query, k=10):
     """Retrieve relevant context from vector database"""
-    if vectordb is None:
-        return ""
-    retriever = vectordb.as_retriever(search_kwargs={"k": k})
-    results = retriever.get_relevant_documents(query)
-    return "\n\n".join([r.page_content for r in results])
+    return matcher.retrieve_context(query, k)
 
 def get_top_schemes_from_query(query, top_k=30, search_k=500):
     """Get top relevant schemes based on query"""
-    if vectordb is None:
-        return []
-    retriever = vectordb.as_retriever(search_kwargs={"k": search_k})
-    results = retriever.get_relevant_documents(query)
-    seen, top_schemes = set(), []
-    for doc in results:
-        name = doc.metadata.get("scheme")
-        if name and name not in seen:
-            top_schemes.append(name)
-            seen.add(name)
-        if len(top_schemes) >= top_k:
-            break
-    return top_schemes
-
-def filter_eligible_schemes(client_profile, schemes, eligibility_data, llm_choice="gemini"):
-    """Filter schemes based on eligibility criteria using LLM reasoning"""
-    filtered, reasoning_results = [], {}
+    return matcher.top_schemes(query, top_k, search_k)
+
+def stream_eligibility(client_profile, schemes, llm_choice="gemini", budget=None, scores=None, ledger=None):
+    """Yield (scheme, {'reasoning': ...}) as each LLM verdict arrives, most relevant schemes first"""
     llm = get_llm_instance(llm_choice)
     if llm is None:
         st.error("LLM initialization failed – check your API key or LLM selection.")
-        return filtered, reasoning_results
-
-    profile_text = (
-        f"{client_profile.get('name', 'User')} is a {client_profile.get('age', '')}-year-old "
-        f"{client_profile.get('gender', '')} {client_profile.get('nationality', '')} citizen. "
-        f"They belong to the {client_profile.get('caste', 'General')} category. "
-        f"They are working as a {client_profile.get('occupation', '')} "
-        f"and pursuing {client_profile.get('education', '')}. "
-        f"Their annual income is {client_profile.get('income', 0)} rupees. "
-        f"Aadhaar linked: {client_profile.get('aadhaar_linked', False)}."
-    ).strip()
-
-    for scheme in schemes:
-        criteria = eligibility_data.get(scheme)
-        if not criteria:
-            continue
-        eligibility_text = ". ".join([f"{k}: {v}" for k, v in criteria.items()])
-
-        prompt = f"""
-        You are an intelligent government scheme eligibility evaluator.
-        Evaluate whether this person is eligible for the scheme based on reasoning.
-        Base your judgment strictly on the scheme's eligibility criteria – don't assume missing data.
-        Consider caste, age, income, gender, occupation, and education.
-        Respond with a short logical explanation and end with "Eligible: Yes" or "Eligible: No".
-
-        Person Profile:
-        {profile_text}
-
-        Scheme Eligibility Requirements:
-        {eligibility_text}
-
-        Answer:
-        """
+        return iter(())
+    return matcher.iter_verdicts(client_profile, schemes, llm, max_parallel=LLM_PARALLEL,
+                                 budget=budget, scores=scores, ledger=ledger)
+
+def history_entry_for(run):
+    """History record for a (possibly cancelled) matching run"""
+    entry = {
+        "user_id": get_user_id(run["profile"]["name"], run["profile"]["aadhaar"]),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "query": run["query"],
+        "profile": run["profile"],
+        "eligible_schemes": [s for s in run["candidates"] if s in run["eligible"]]
+    }
+    if run["cancelled"]:
+        entry["cancelled"] = True
+    if run.get("evaluation"):
+        entry["evaluation"] = run["evaluation"]
+    entry["tokens"] = run["ledger"].totals()
+    return entry
+
+def cancel_match():
+    """Cancel button callback: the rerun it triggers stops the evaluation loop; keep what finished"""
+    run = st.session_state.get("match_run")
+    if run and not run["finished"]:
+        run["cancelled"] = True
+        entry = history_entry_for(run)
+        save_user_history(entry)
+        UsageLog().append(entry["user_id"], run["query"], entry["tokens"])
 
-        try:
-            response = llm.invoke(prompt)
-            reasoning_text = response.content.strip()
-        except Exception as e:
-            reasoning_text = f"Error during reasoning: {e}"
+# =========================
+# Eligibility pre-filter (typed columns)
+# =========================
+@st.cache_resource
+def get_eligibility_table():
+    """Typed eligibility columns (npz next to the JSON) used for the pre-filter"""
+    try:
+        return load_eligibility_table(ELIGIBILITY_JSON_PATH)
+    except Exception as e:
+        st.warning(f"Eligibility pre-filter unavailable: {e}")
+        return None
 
-        reasoning_results[scheme] = {"reasoning": reasoning_text}
-        if "eligible: yes" in reasoning_text.lower():
-            filtered.append(scheme)
+@st.cache_resource
+def get_matcher(db_key, _vectordb, _eligibility_data):
+    """One SchemeMatcher per loaded vector DB (db_key), so its context cache survives reruns"""
+    return SchemeMatcher(_vectordb, _eligibility_data, get_eligibility_table())
 
-    return filtered, reasoning_results
+def prefilter_schemes(client_profile, schemes):
+    """Drop schemes whose age/income/gender/state/category limits rule the profile out (no LLM call)"""
+    return matcher.prefilter(client_profile, schemes)
 
 # =========================
 # OCR + Aadhaar auto-fill helpers
 # =========================
-def detect_document_type(text):
-    """Detect document type from OCR text"""
-    t = text.upper()
-    if re.search(r"\b\d{4}\s\d{4}\s\d{4}\b", t) or "AADHAAR" in t or "UNIQUE IDENTIFICATION" in t:
-        return "Aadhaar"
-    if re.search(r"[A-Z]{5}[0-9]{4}[A-Z]{1}", t) or "INCOME TAX" in t or "PERMANENT ACCOUNT NUMBER" in t:
-        return "PAN"
-    if re.search(r"\bDL[-\s]*\d+", t) or "DRIVING LICENCE" in t or "TRANSPORT" in t:
-        return "Driving License"
-    return "Unknown"
-
-def extract_aadhaar_details(text):
-    """Extract personal details from Aadhaar card text"""
-    details = {"name": None, "dob": None, "gender": None, "aadhaar_number": None}
-    # Aadhaar number pattern
-    match = re.search(r"\b\d{4}\s\d{4}\s\d{4}\b", text)
-    if match:
-        details["aadhaar_number"] = match.group(0).replace(" ", "")
-    # DOB patterns (dd/mm/yyyy or dd-mm-yyyy)
-    dob = re.search(r"\b\d{2}[/-]\d{2}[/-]\d{4}\b", text)
-    if dob:
-        details["dob"] = dob.group(0)
-    # Gender
-    if "MALE" in text.upper():
-        details["gender"] = "male"
-    elif "FEMALE" in text.upper():
-        details["gender"] = "female"
-    # Name (heuristic: two capitalized words)
-    name = re.search(r"[A-Z][a-z]+(?:\s[A-Z][a-z]+)+", text)
-    if name:
-        details["name"] = name.group(0)
-    return details
+@st.cache_resource
+def get_ocr_service():
+    """Shared OCR process pool (one per Streamlit server process)"""
+    return OcrService(
+        max_workers=OCR_WORKERS,
+        tesseract_cmd=pytesseract.pytesseract.tesseract_cmd,
+        config=make_config(target_dpi=OCR_TARGET_DPI)
+    )
+
+@st.cache_resource
+def get_ocr_cache():
+    """OCR results keyed by image hash + preprocessing config (memory LRU with disk spill)"""
+    return OcrCache(spill_dir=OCR_CACHE_DIR)
 
 # =========================
 # SIDEBAR: USER HISTORY
@@ -298,6 +283,10 @@ if st.sidebar.button("🔍 View My History"):
             st.sidebar.info("No history found for this user.")
         else:
             st.sidebar.success(f"Found {len(my_history)} searches")
+            usage = UsageLog().user_totals(user_id)
+            if usage["queries"]:
+                st.sidebar.caption(f"🧮 {usage['total_tokens']:,} tokens over {usage['queries']} queries "
+                                   f"(≈ ${usage['cost_usd']:.4f})")
             for item in reversed(my_history[-5:]):  # Show last 5 searches
                 st.sidebar.markdown(f"""
                 🕒 **{item.get('timestamp', 'N/A')}**  
@@ -329,7 +318,8 @@ if not st.session_state.data_loaded:
         loading_placeholder.info("⏳ First-time loading may take 30-60 seconds. Subsequent loads will be instant!")
         
         try:
-            vectordb, eligibility_data, num_docs, from_cache = load_data()
+            with tracing.span("load_data"):
+                vectordb, eligibility_data, num_docs, from_cache = load_data()
             st.session_state.vectordb = vectordb
             st.session_state.eligibility_data = eligibility_data
             st.session_state.num_docs = num_docs
@@ -351,6 +341,7 @@ else:
 # Use session state variables
 vectordb = st.session_state.vectordb
 eligibility_data = st.session_state.eligibility_data
+matcher = get_matcher(id(vectordb), vectordb, eligibility_data)
 
 # Left column: user inputs + OCR + mic
 left, right = st.columns([1, 1])
@@ -358,16 +349,34 @@ left, right = st.columns([1, 1])
 with left:
     st.subheader("🧾 Upload Document (Aadhaar / PAN / Driving License)")
     uploaded_file = st.file_uploader("Upload Document Image", type=["jpg", "jpeg", "png"])
+    field_ocr = st.checkbox("Field-targeted OCR (faster, reads only the card's known fields)", value=True)
 
     extracted_text = ""
     auto_aadhaar_linked = False
 
     if uploaded_file is not None:
         try:
-            image = Image.open(uploaded_file)
+            image_bytes = uploaded_file.getvalue()
+            image = Image.open(io.BytesIO(image_bytes))
             st.image(image, caption="Uploaded Document", use_column_width=False, width=320)
-            with st.spinner("Extracting text using OCR..."):
-                extracted_text = pytesseract.image_to_string(image)
+            ocr_service = get_ocr_service()
+            ocr_job = run_field_ocr if field_ocr else run_ocr
+            # Every widget interaction reruns this block; the cache keeps tesseract out of reruns
+            cache_key = make_ocr_cache_key(image_bytes, ocr_service.config, ocr_job.__name__)
+            ocr_result = get_ocr_cache().get(cache_key)
+            if ocr_result is None:
+                with st.spinner("Extracting text using OCR..."):
+                    ocr_result = complete_ocr_result(ocr_service.ocr(image_bytes, job=ocr_job))
+                    get_ocr_cache().put(cache_key, ocr_result)
+                st.caption(f"⏱️ OCR {ocr_result['original_size'][0]}×{ocr_result['original_size'][1]} → "
+                           f"{ocr_result['processed_size'][0]}×{ocr_result['processed_size'][1]}: "
+                           f"{format_timings(ocr_result['timings'])}")
+            else:
+                st.caption("⚡ OCR result reused from cache")
+            extracted_text = ocr_result["text"]
+        except OcrBusyError as e:
+            st.warning(f"OCR is busy: {e}")
+            extracted_text = ""
         except Exception as e:
             st.error(f"OCR failed: {e}")
             extracted_text = ""
@@ -375,13 +384,13 @@ with left:
         if extracted_text:
             st.subheader("🧾 Extracted Text")
             st.text_area("Extracted Text", extracted_text, height=180)
-            doc_type = detect_document_type(extracted_text)
+            doc_type = ocr_result.get("doc_type") or detect_document_type(extracted_text)
             st.success(f"🔍 Detected Document Type: {doc_type}")
 
             if doc_type == "Aadhaar":
                 auto_aadhaar_linked = True
                 st.info("Aadhaar detected – attempting to auto-fill profile fields")
-                details = extract_aadhaar_details(extracted_text)
+                details = ocr_result.get("fields") or extract_aadhaar_details(extracted_text)
 
                 if details.get("name"):
                     st.session_state["ocr_name"] = details["name"]
@@ -427,6 +436,7 @@ with right:
     age = st.number_input("Age", min_value=18, max_value=100, value=st.session_state.get("ocr_age", 22))
     gender = st.selectbox("Gender", ["male", "female", "other"], index=["male", "female", "other"].index(st.session_state.get("ocr_gender", "male")))
     caste = st.text_input("Caste", "OBC")
+    state = st.text_input("State / UT (optional)", "")
     nationality = st.text_input("Nationality", "Indian")
     education = st.text_input("Education", "B.Sc. Agriculture")
     occupation = st.text_input("Occupation", "Farmer")
@@ -434,7 +444,7 @@ with right:
     aadhaar = st.text_input("Aadhaar Number (optional)", value=st.session_state.get("ocr_aadhaar_num", ""))
     # show aadhaar-linked checkbox default from OCR detection (if file uploaded)
     aadhaar_linked = st.checkbox("Aadhaar Linked", value=st.session_state.get("ocr_aadhaar_num") is not None or auto_aadhaar_linked)
-    llm_choice = st.selectbox("Select LLM", ["gemini", "grok"])
+    llm_choice = st.selectbox("Select LLM", LLM_OPTIONS)
 
 st.markdown("---")
 query = st.text_area("💬 Describe your need or situation:", value=st.session_state.get("voice_query", "I need help for agriculture as I am a small farmer with family income 1,00,000."))
@@ -450,54 +460,117 @@ if st.button("🔍 Find Eligible Schemes"):
         st.session_state["current_user_name"] = name
         st.session_state["current_user_aadhaar"] = aadhaar
         
-        with st.spinner("Analyzing and reasoning eligibility..."):
-            client_profile = {
-                "name": name,
-                "age": age,
-                "gender": gender,
-                "caste": caste,
-                "nationality": nationality,
-                "education": education,
-                "occupation": occupation,
-                "income": income,
-                "aadhaar": aadhaar,
-                "aadhaar_linked": aadhaar_linked
-            }
+        client_profile = {
+            "name": name,
+            "age": age,
+            "gender": gender,
+            "caste": caste,
+            "state": state,
+            "nationality": nationality,
+            "education": education,
+            "occupation": occupation,
+            "income": income,
+            "aadhaar": aadhaar,
+            "aadhaar_linked": aadhaar_linked
+        }
 
+        budget = make_budget()
+        scores = None
+        with st.spinner("Finding relevant schemes..."):
             # Get top schemes based on query
-            top_schemes = get_top_schemes_from_query(query)
-            eligible_schemes, reasoning = filter_eligible_schemes(client_profile, top_schemes, eligibility_data, llm_choice)
+            if budget is not None:
+                # Budgeted mode needs relevance scores for ordering and the score threshold
+                scores = dict(matcher.top_schemes_with_scores(query))
+                top_schemes = list(scores)
+            else:
+                top_schemes = get_top_schemes_from_query(query)
+            # Typed pre-filter: only schemes not already ruled out go to the LLM
+            top_schemes = prefilter_schemes(client_profile, top_schemes)
+
+        run = {"query": query, "profile": client_profile, "candidates": top_schemes,
+               "reasoning": {}, "eligible": [], "finished": False, "cancelled": False,
+               "ledger": TokenLedger(provider=llm_choice)}
+        st.session_state["match_run"] = run
+
+        st.button("⏹ Cancel evaluation", on_click=cancel_match)
+        status = st.empty()
+        progress = st.progress(0.0, text=f"Evaluating {len(top_schemes)} schemes...")
+        # One placeholder per scheme in relevance order; each fills in as its verdict arrives
+        slots = {scheme: st.empty() for scheme in top_schemes}
+        for scheme in top_schemes:
+            slots[scheme].caption(f"⏳ {scheme}")
+        summary_slots = {}
+
+        for scheme, verdict in stream_eligibility(client_profile, top_schemes, llm_choice, budget, scores,
+                                             run["ledger"]):
+            run["reasoning"][scheme] = verdict
+            if is_eligible(verdict["reasoning"]):
+                run["eligible"].append(scheme)
+                with slots[scheme].container():
+                    st.subheader(f"📘 {scheme}")
+                    st.markdown(f"**Reasoning:** {verdict['reasoning']}")
+                    with st.expander("📄 Scheme Summary"):
+                        summary_slots[scheme] = st.empty()
+                        summary_slots[scheme].caption("Summary follows once all schemes are evaluated...")
+                status.info(f"✅ {len(run['eligible'])} eligible so far...")
+            elif verdict.get("error"):
+                slots[scheme].warning(f"⚠️ {scheme}: could not be evaluated – {verdict['reasoning']}")
+            else:
+                slots[scheme].empty()
+            progress.progress(len(run["reasoning"]) / len(top_schemes),
+                              text=f"Evaluated {len(run['reasoning'])} of {len(top_schemes)} schemes")
+
+        run["finished"] = True
+        progress.empty()
+        for scheme in top_schemes:
+            if scheme not in run["reasoning"]:
+                slots[scheme].empty()
+        if budget is not None:
+            run["evaluation"] = budget.report()
+            report = run["evaluation"]
+            stop = {"max_eligible": "enough eligible schemes found", "max_tokens": "token budget used up",
+                    "max_seconds": "time budget used up"}.get(report["stop_reason"], "all candidates evaluated")
+            st.caption(f"🎯 Budgeted mode: evaluated {report['evaluated']} of {len(top_schemes)} candidates "
+                       f"({stop}); skipped {report['skipped_low_score']} below the score threshold and "
+                       f"{report['skipped_budget']} after the budget stop · ~{report['tokens_used']} tokens · "
+                       f"{report['elapsed_seconds']}s")
 
         # Save to history
-        history_entry = {
-            "user_id": get_user_id(name, aadhaar),
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "query": query,
-            "profile": client_profile,
-            "eligible_schemes": eligible_schemes
-        }
+        history_entry = history_entry_for(run)
         save_user_history(history_entry)
+        eligible_schemes = history_entry["eligible_schemes"]
 
         if eligible_schemes:
-            st.success(f"✅ Found {len(eligible_schemes)} eligible scheme(s)! (Saved to history)")
+            status.success(f"✅ Found {len(eligible_schemes)} eligible scheme(s)! (Saved to history)")
+            llm = get_llm_instance(llm_choice)
             for scheme in eligible_schemes:
-                st.subheader(f"📘 {scheme}")
-                st.markdown(f"**Reasoning:** {reasoning[scheme]['reasoning']}")
-
-                with st.expander("📄 Scheme Summary"):
-                    context = retrieve_context(f"Summary of {scheme} scheme")
-                    llm = get_llm_instance(llm_choice)
-                    if llm is None:
-                        st.error("LLM not available for summarization")
-                    else:
-                        prompt = f"Summarize the {scheme} scheme in simple language:\n\n{context}"
-                        try:
-                            resp = llm.invoke(prompt)
-                            st.write(resp.content)
-                        except Exception as e:
-                            st.error(f"Error summarizing {scheme}: {e}")
+                if llm is None:
+                    summary_slots[scheme].error("LLM not available for summarization")
+                    continue
+                try:
+                    summary_slots[scheme].write(matcher.summarize(scheme, llm, ledger=run["ledger"]))
+                except Exception as e:
+                    summary_slots[scheme].error(f"Error summarizing {scheme}: {e}")
         else:
-            st.warning("No schemes match your eligibility and query.")
+            status.warning("No schemes match your eligibility and query.")
+
+        # Token totals including summaries (the history entry above only has the eligibility calls)
+        usage = run["ledger"].totals()
+        UsageLog().append(history_entry["user_id"], query, usage)
+        estimated = " (estimated)" if usage["estimated_calls"] else ""
+        hedged = f" ({usage['hedge_calls']} hedged)" if usage["hedge_calls"] else ""
+        st.caption(f"🧮 {usage['calls']} LLM calls{hedged} · {usage['prompt_tokens']:,} prompt + "
+                   f"{usage['completion_tokens']:,} completion tokens{estimated} · ≈ ${usage['cost_usd']:.4f}")
+
+elif st.session_state.get("match_run", {}).get("cancelled"):
+    # Shown once, on the rerun triggered by the cancel button
+    run = st.session_state.pop("match_run")
+    st.warning(f"⏹ Evaluation cancelled after {len(run['reasoning'])} of {len(run['candidates'])} schemes "
+               f"(partial results saved to history).")
+    for scheme in run["candidates"]:
+        if scheme in run["eligible"]:
+            st.subheader(f"📘 {scheme}")
+            st.markdown(f"**Reasoning:** {run['reasoning'][scheme]['reasoning']}")
 
 # Footer / notes
 st.markdown("---")
@@ -510,4 +583,24 @@ with st.sidebar.expander("⚙️ Advanced Settings"):
         if os.path.exists(DB_DIR):
             shutil.rmtree(DB_DIR)
         st.session_state.data_loaded = False
-        st.rerun()
\ No newline at end of file
+        st.rerun()
+    st.checkbox("🔍 Debug timings panel", key="debug_timings",
+                help="Show a per-stage timing breakdown of each rerun (LLM calls, retrieval, history, OCR)")
+    st.checkbox("⏱️ Profile reruns (sampling)", key="profile_reruns",
+                help="Sample each rerun's stack, attribute it to script sections and save flamegraph-compatible "
+                     "collapsed stacks under profiles/")
+
+if rerun_trace is not None:
+    tracing.finish_trace()
+    with st.sidebar.expander("🔍 Timing breakdown (this run)", expanded=True):
+        st.caption(f"Total {rerun_trace.total_seconds * 1000:.0f} ms")
+        st.dataframe(rerun_trace.breakdown(), hide_index=True)
+
+if rerun_profiler is not None:
+    rerun_profiler.stop()
+    profile_path = rerun_profiler.write()
+    with st.sidebar.expander("⏱️ Rerun profile", expanded=True):
+        st.caption(f"Wall {rerun_profiler.wall_seconds * 1000:.0f} ms · CPU {rerun_profiler.cpu_seconds * 1000:.0f} ms "
+                   f"· {rerun_profiler.samples} samples")
+        st.dataframe(rerun_profiler.section_breakdown(), hide_index=True)
+        st.caption(f"Collapsed stacks: {profile_path}")
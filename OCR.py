@@ -1,8 +1,11 @@
+import io
 import streamlit as st
 import pytesseract
 from PIL import Image
 import re
 
+from ocr_service import OcrService, format_timings
+
 # Optional: specify path to Tesseract (for Windows)
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
@@ -14,6 +17,10 @@ st.write("Upload a document image (Aadhaar, PAN, or Driving License) — "
 
 uploaded_file = st.file_uploader("Upload Document Image", type=["jpg", "jpeg", "png"])
 
+@st.cache_resource
+def get_ocr_service():
+    return OcrService(tesseract_cmd=pytesseract.pytesseract.tesseract_cmd)
+
 def detect_document_type(text):
     text = text.upper()
 
@@ -33,11 +40,14 @@ def detect_document_type(text):
         return "❓ Unknown Document Type"
 
 if uploaded_file is not None:
-    image = Image.open(uploaded_file)
+    image_bytes = uploaded_file.getvalue()
+    image = Image.open(io.BytesIO(image_bytes))
     st.image(image, caption="Uploaded Document", use_column_width=True)
 
     with st.spinner("Extracting text using OCR..."):
-        extracted_text = pytesseract.image_to_string(image)
+        ocr_result = get_ocr_service().ocr(image_bytes)
+        extracted_text = ocr_result["text"]
+    st.caption(f"⏱️ {format_timings(ocr_result['timings'])}")
 
     st.subheader("🧾 Extracted Text:")
     st.text_area("Extracted Text", extracted_text, height=200)
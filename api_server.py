@@ -0,0 +1,328 @@
+"""
+Headless HTTP API for scheme matching (for partner portals).
+
+    python api_server.py --port 8080 --workers 4
+
+Endpoints:
+    POST /v1/match      {"profile": {...}, "query": "...", "llm": "gemini", "top_k": 30}
+    POST /v1/summarize  {"scheme": "...", "llm": "gemini"}
+    POST /v1/ocr        raw image bytes (or multipart field "file"); ?mode=fields|text
+    GET  /healthz
+    GET  /metrics       Prometheus text (per-stage latency histograms of the answering worker)
+
+Every response carries a Server-Timing header with its per-stage breakdown;
+match and summarize responses also carry the request's token usage and cost.
+
+Each worker process loads its own SchemeMatcher, LLM clients, OCR pool and
+OCR cache once at startup. Workers bind the same port with SO_REUSEPORT, so
+the kernel spreads connections across them; run several hosts behind a load
+balancer to scale further.
+"""
+import argparse
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, UnidentifiedImageError
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+from eligibility_schema import parse_number
+from id_documents import complete_ocr_result
+from ocr_cache import OcrCache, make_key as make_ocr_cache_key
+from ocr_fields import run_field_ocr
+from ocr_service import OcrService, OcrBusyError, make_config, run_ocr
+from scheme_matcher import (SchemeMatcher, LLM_PROVIDERS, build_vectordb, open_vectordb, make_llm_router,
+                            profile_text, is_eligible)
+from token_accounting import TokenLedger
+import tracing
+
+
+# =========================
+# CONFIG
+# =========================
+REQUEST_TIMEOUT = float(os.getenv("SAHAYAK_REQUEST_TIMEOUT", "60"))
+LLM_THREADS = int(os.getenv("SAHAYAK_LLM_THREADS", "32"))  # concurrent LLM calls per worker
+OCR_WORKERS = int(os.getenv("SAHAYAK_OCR_WORKERS", "2"))
+OCR_CACHE_DIR = "ocr_cache"
+MAX_TOP_K = 50
+
+
+# =========================
+# PER-WORKER STATE
+# =========================
+async def _on_startup(app):
+    loop = asyncio.get_running_loop()
+    app["pool"] = ThreadPoolExecutor(max_workers=LLM_THREADS)
+    # Multi-worker servers build the store once in serve(); workers only open it
+    app["matcher"] = await loop.run_in_executor(app["pool"], lambda: SchemeMatcher.load(build=app["build_store"]))
+    app["llms"] = {}
+    app["ocr"] = OcrService(max_workers=OCR_WORKERS, config=make_config())
+    app["ocr_cache"] = OcrCache(spill_dir=OCR_CACHE_DIR)
+    app["started_at"] = time.time()
+    print(f"✅ Worker {os.getpid()} ready")
+
+
+async def _on_cleanup(app):
+    app["ocr"].shutdown()
+    app["pool"].shutdown(wait=False)
+
+
+def _llm(app, choice):
+    """One provider router (primary = choice) per worker, created on first use"""
+    if choice not in app["llms"]:
+        app["llms"][choice] = make_llm_router(choice)
+    return app["llms"][choice]
+
+
+def _run(app, fn, *args):
+    # run_in_executor does not carry context variables; copy them so spans join the request trace
+    return asyncio.get_running_loop().run_in_executor(app["pool"], contextvars.copy_context().run, fn, *args)
+
+
+def _error(status, message):
+    return web.json_response({"error": message}, status=status)
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="request body must be a JSON object")
+    return body
+
+
+def _llm_choice(body):
+    choice = str(body.get("llm", "gemini")).lower()
+    if choice not in LLM_PROVIDERS + ("fake",):
+        raise web.HTTPBadRequest(text=f"'llm' must be one of {', '.join(LLM_PROVIDERS + ('fake',))}")
+    return choice
+
+
+def _profile(body):
+    """Applicant profile with age/income as numbers (the pre-filter and prompt need them)"""
+    profile = body.get("profile") or {}
+    if not isinstance(profile, dict):
+        raise web.HTTPBadRequest(text="'profile' must be a JSON object")
+    profile = dict(profile)
+    for field in ("age", "income"):
+        if profile.get(field) in (None, ""):
+            profile.pop(field, None)
+            continue
+        value = parse_number(profile[field])
+        if value is None:
+            raise web.HTTPBadRequest(text=f"'profile.{field}' must be a number")
+        profile[field] = int(value) if field == "age" and value.is_integer() else value
+    return profile
+
+
+def _top_k(body):
+    try:
+        top_k = int(body.get("top_k", 30))
+    except (TypeError, ValueError):
+        raise web.HTTPBadRequest(text="'top_k' must be an integer")
+    if top_k < 1:
+        raise web.HTTPBadRequest(text="'top_k' must be at least 1")
+    return min(top_k, MAX_TOP_K)
+
+
+# =========================
+# HANDLERS
+# =========================
+if web is not None:
+    @web.middleware
+    async def trace_middleware(request, handler):
+        with tracing.trace(request.path) as request_trace:
+            response = await handler(request)
+        response.headers["Server-Timing"] = request_trace.server_timing()
+        return response
+
+
+async def metrics(request):
+    return web.Response(text=tracing.prometheus_text(), content_type="text/plain")
+
+
+async def health(request):
+    app = request.app
+    return web.json_response({
+        "status": "ok",
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - app["started_at"], 1),
+        "ocr_cache": app["ocr_cache"].stats(),
+        "llm": {choice: router.stats() for choice, router in app["llms"].items()}
+    })
+
+
+async def match(request):
+    body = await _json_body(request)
+    profile = _profile(body)
+    query = body.get("query") or ""
+    if not query:
+        return _error(400, "'query' is required")
+    top_k = _top_k(body)
+    choice = _llm_choice(body)
+    app = request.app
+    matcher = app["matcher"]
+    ledger = TokenLedger(provider=choice)
+    try:
+        llm = _llm(app, choice)
+    except RuntimeError as e:
+        return _error(503, str(e))
+
+    async def run():
+        candidates = await _run(app, matcher.top_schemes, query, top_k)
+        candidates = matcher.prefilter(profile, candidates)
+        person = profile_text(profile)
+        # Per-scheme LLM calls overlap on the worker's thread pool
+        verdicts = await asyncio.gather(*(_run(app, matcher.evaluate, llm, person, s, ledger) for s in candidates))
+        return [
+            {"scheme": scheme, "eligible": is_eligible(verdict["reasoning"]), "reasoning": verdict["reasoning"],
+             "error": bool(verdict.get("error"))}
+            for scheme, verdict in zip(candidates, verdicts) if verdict is not None
+        ]
+
+    start = time.perf_counter()
+    try:
+        results = await asyncio.wait_for(run(), timeout=REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        return _error(504, f"match did not finish within {REQUEST_TIMEOUT:.0f}s")
+    except ValueError as e:
+        return _error(400, str(e))
+    return web.json_response({
+        "eligible_schemes": [r["scheme"] for r in results if r["eligible"]],
+        "results": results,
+        "usage": ledger.totals(),
+        "elapsed_seconds": round(time.perf_counter() - start, 3)
+    })
+
+
+async def summarize(request):
+    body = await _json_body(request)
+    scheme = body.get("scheme")
+    if not scheme:
+        return _error(400, "'scheme' is required")
+    choice = _llm_choice(body)
+    app = request.app
+    ledger = TokenLedger(provider=choice)
+    try:
+        llm = _llm(app, choice)
+    except RuntimeError as e:
+        return _error(503, str(e))
+    try:
+        summary = await asyncio.wait_for(_run(app, app["matcher"].summarize, scheme, llm, ledger),
+                                         timeout=REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        return _error(504, f"summarize did not finish within {REQUEST_TIMEOUT:.0f}s")
+    except ValueError as e:
+        return _error(400, str(e))
+    return web.json_response({"scheme": scheme, "summary": summary, "usage": ledger.totals()})
+
+
+async def ocr(request):
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        part = await reader.next()
+        while part is not None and part.name != "file":
+            part = await reader.next()
+        if part is None:
+            return _error(400, "multipart body needs a 'file' field")
+        image_bytes = await part.read()
+    else:
+        image_bytes = await request.read()
+    if not image_bytes:
+        return _error(400, "empty image")
+
+    app = request.app
+    job = run_ocr if request.query.get("mode") == "text" else run_field_ocr
+    cache_key = make_ocr_cache_key(image_bytes, app["ocr"].config, job.__name__)
+    result = app["ocr_cache"].get(cache_key)
+    if result is None:
+        try:
+            result = await asyncio.wait_for(
+                _run(app, lambda: complete_ocr_result(app["ocr"].ocr(image_bytes, job=job, timeout=REQUEST_TIMEOUT))),
+                timeout=REQUEST_TIMEOUT)
+        except OcrBusyError as e:
+            return _error(503, str(e))
+        except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+            return _error(400, f"not a readable image: {e}")
+        except asyncio.TimeoutError:
+            return _error(504, f"OCR did not finish within {REQUEST_TIMEOUT:.0f}s")
+        app["ocr_cache"].put(cache_key, result)
+    return web.json_response(result)
+
+
+# =========================
+# APP / WORKERS
+# =========================
+def create_app(build_store=True):
+    if web is None:
+        raise ImportError("The API server requires aiohttp: pip install aiohttp")
+    tracing.enable()
+    app = web.Application(client_max_size=16 * 1024 * 1024, middlewares=[trace_middleware])
+    app["build_store"] = build_store
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+    app.router.add_get("/healthz", health)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_post("/v1/match", match)
+    app.router.add_post("/v1/summarize", summarize)
+    app.router.add_post("/v1/ocr", ocr)
+    return app
+
+
+def _serve_worker(host, port):
+    web.run_app(create_app(build_store=False), host=host, port=port, reuse_port=True, print=None)
+
+
+def _build_store():
+    if open_vectordb() is None:
+        print("🧱 Building the vector store before starting workers...")
+        build_vectordb()
+
+
+def serve(host="0.0.0.0", port=8080, workers=1):
+    """Run `workers` processes sharing one port (SO_REUSEPORT)"""
+    if workers <= 1:
+        web.run_app(create_app(), host=host, port=port)
+        return
+    # Build the vector store once, in its own process (so no embedding model is loaded in the parent
+    # before forking), rather than in every worker at once
+    builder = multiprocessing.Process(target=_build_store)
+    builder.start()
+    builder.join()
+    if builder.exitcode != 0:
+        raise SystemExit(f"Vector store build failed (exit code {builder.exitcode})")
+
+    # Not daemonic: each worker's OcrService owns a process pool, and daemonic processes cannot have children
+    processes = [multiprocessing.Process(target=_serve_worker, args=(host, port)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    print(f"🚀 Serving on http://{host}:{port} with {workers} workers")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SAHAYAK scheme-matching API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
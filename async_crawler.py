@@ -0,0 +1,369 @@
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import urljoin
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:
+    async_playwright = None
+
+from bs4 import BeautifulSoup
+
+from scrape_output import JsonlStreamWriter, stream_path, write_summary_csv, write_failed_csv
+from html_cache import HtmlCache
+from rate_limit import AdaptiveRateLimiter, backoff_delay
+
+
+# =========================
+# PARSE STAGE (process pool)
+# =========================
+_parse_scraper = None
+
+
+def _init_parse_worker():
+    global _parse_scraper
+    # Imported here so the event-loop process never pays for the parser setup
+    from FinalFullScrapping import UnifiedSchemeScraper
+    _parse_scraper = UnifiedSchemeScraper(html_cache_dir=None)
+
+
+def _parse_page(url, html, fetched_at):
+    """Worker: run UnifiedSchemeScraper's parse + format stages on one page"""
+    data = _parse_scraper.parse_scheme_html(html, url, fetched_at)
+    return _parse_scraper.format_for_ai_agent(data)
+
+
+def needs_browser(html, marker="eligibility"):
+    """True when the static HTML lacks the content we need and must be JS-rendered"""
+    return not html or marker not in html.lower()
+
+
+# =========================
+# BROWSER CONTEXT POOL
+# =========================
+class BrowserPool:
+    """
+    Small pool of headless Chromium contexts (Playwright) for pages whose
+    content only appears after client-side rendering. Everything else is
+    fetched over plain HTTP.
+    """
+
+    def __init__(self, size=4, user_agent=None):
+        self.size = size
+        self.user_agent = user_agent
+        self.launches = 0
+        self._playwright = None
+        self._browser = None
+        self._contexts = None
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        """Launch the browser once; concurrent callers wait for the first launch"""
+        async with self._start_lock:
+            if self._browser is not None:
+                return
+            if async_playwright is None:
+                raise ImportError("JS rendering requires Playwright: pip install playwright && playwright install chromium")
+            playwright = await async_playwright().start()
+            browser = await playwright.chromium.launch(headless=True)
+            self.launches += 1
+            contexts = asyncio.Queue()
+            for _ in range(self.size):
+                contexts.put_nowait(await browser.new_context(user_agent=self.user_agent))
+            # Published only when complete, so the unlocked `_browser is None` checks never see a half-built pool
+            self._playwright, self._contexts, self._browser = playwright, contexts, browser
+
+    async def render(self, url, wait_selector=None, timeout=30):
+        """Load a URL in a pooled context and return the rendered HTML"""
+        if self._browser is None:
+            await self.start()
+        context = await self._contexts.get()
+        page = await context.new_page()
+        try:
+            await page.goto(url, timeout=timeout * 1000)
+            if wait_selector:
+                await page.wait_for_selector(wait_selector, timeout=timeout * 1000)
+            else:
+                await page.wait_for_load_state("networkidle", timeout=timeout * 1000)
+            return await page.content()
+        finally:
+            await page.close()
+            self._contexts.put_nowait(context)
+
+    async def new_page(self):
+        """Open a page for multi-step interaction (e.g. clicking through pagination)"""
+        if self._browser is None:
+            await self.start()
+        context = await self._contexts.get()
+        page = await context.new_page()
+        return context, page
+
+    async def release(self, context, page):
+        await page.close()
+        self._contexts.put_nowait(context)
+
+    async def close(self):
+        async with self._start_lock:
+            if self._browser is not None:
+                await self._browser.close()
+                await self._playwright.stop()
+                self._browser = None
+
+
+# =========================
+# ASYNC CRAWL ENGINE
+# =========================
+class AsyncSchemeCrawler:
+    """
+    Event-loop crawler: keeps up to `concurrency` HTTP fetches in flight, falls
+    back to a small browser pool for JS-rendered pages, and feeds a bounded
+    parse queue served by a process pool running UnifiedSchemeScraper's
+    parse_scheme_html / format_for_ai_agent.
+
+    Fetch workers block on the parse queue when parsing falls behind, so memory
+    is bounded by concurrency + parse_queue_size pages.
+    """
+
+    def __init__(self, base_url="https://www.myscheme.gov.in", concurrency=200, browser_contexts=4,
+                 parse_workers=None, parse_queue_size=64, max_attempts=3, timeout=30,
+                 rate_limiter=None, html_cache_dir="html_cache"):
+        if aiohttp is None:
+            raise ImportError("The async crawler requires aiohttp: pip install aiohttp")
+        self.base_url = base_url
+        self.search_url = f"{base_url}/search"
+        self.concurrency = concurrency
+        self.parse_workers = parse_workers or os.cpu_count() or 2
+        self.parse_queue_size = parse_queue_size
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(initial_rate=5.0, max_rate=200.0,
+                                                                burst=concurrency, latency_target=5.0)
+        self.html_cache = HtmlCache(html_cache_dir) if html_cache_dir else None
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+        }
+        self.browser = BrowserPool(size=browser_contexts, user_agent=self.headers['User-Agent'])
+        self.stats = {'http_fetches': 0, 'browser_renders': 0, 'retries': 0, 'parsed': 0, 'failed': 0}
+
+    # ---------- fetching ----------
+    async def _fetch_http(self, session, url):
+        await asyncio.sleep(self.rate_limiter.reserve())
+        start = time.monotonic()
+        try:
+            async with session.get(url) as response:
+                html = await response.text()
+                ok = response.status < 400
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.rate_limiter.record(time.monotonic() - start, ok=False)
+            raise
+        # 429/5xx are the site telling us to slow down
+        self.rate_limiter.record(time.monotonic() - start, ok=ok)
+        if not ok:
+            raise RuntimeError(f"HTTP {response.status}")
+        self.stats['http_fetches'] += 1
+        return html
+
+    async def fetch_page(self, session, url):
+        """Fetch over HTTP; render in the browser pool only if the static HTML is incomplete"""
+        html = await self._fetch_http(session, url)
+        if needs_browser(html):
+            await asyncio.sleep(self.rate_limiter.reserve())
+            start = time.monotonic()
+            try:
+                html = await self.browser.render(url, timeout=self.timeout)
+            except Exception:
+                self.rate_limiter.record(time.monotonic() - start, ok=False)
+                raise
+            self.rate_limiter.record(time.monotonic() - start, ok=True)
+            self.stats['browser_renders'] += 1
+        return html
+
+    async def _fetch_worker(self, session, url_queue, parse_queue, failed_writer):
+        while True:
+            scheme_info, attempt = await url_queue.get()
+            try:
+                html = await self.fetch_page(session, scheme_info['url'])
+                fetched_at = datetime.now().isoformat()
+                if self.html_cache is not None:
+                    await asyncio.to_thread(self.html_cache.put, scheme_info['url'], html, fetched_at)
+                # Blocks when the parse stage is saturated (backpressure)
+                await parse_queue.put((scheme_info, html, fetched_at))
+                url_queue.task_done()
+            except Exception as e:
+                attempt += 1
+                if attempt < self.max_attempts:
+                    self.stats['retries'] += 1
+                    delay = backoff_delay(attempt)
+
+                    def requeue(item=(scheme_info, attempt)):
+                        url_queue.put_nowait(item)
+                        url_queue.task_done()
+
+                    # task_done only after re-queueing, so join() cannot finish early
+                    asyncio.get_running_loop().call_later(delay, requeue)
+                else:
+                    failed_writer.write({
+                        'name': scheme_info.get('name', ''),
+                        'url': scheme_info['url'],
+                        'error': str(e) or type(e).__name__,
+                        'attempts': attempt
+                    })
+                    self.stats['failed'] += 1
+                    url_queue.task_done()
+
+    # ---------- parsing ----------
+    async def _parse_worker(self, pool, parse_queue, writer, failed_writer):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheme_info, html, fetched_at = await parse_queue.get()
+            try:
+                record = await loop.run_in_executor(pool, _parse_page, scheme_info['url'], html, fetched_at)
+                writer.write(record)
+                self.stats['parsed'] += 1
+            except Exception as e:
+                failed_writer.write({
+                    'name': scheme_info.get('name', ''),
+                    'url': scheme_info['url'],
+                    'error': f"parse: {e}"
+                })
+                self.stats['failed'] += 1
+            finally:
+                parse_queue.task_done()
+
+    # ---------- listing ----------
+    async def collect_scheme_urls(self, max_pages=None):
+        """
+        Phase 1 over the browser pool: the search results are client-side
+        paginated, so one page walks the `scheme-name-N` cards and clicks the
+        next page number until there is none.
+        """
+        context, page = await self.browser.new_page()
+        all_urls, seen = [], set()
+        try:
+            await asyncio.sleep(self.rate_limiter.reserve())
+            await page.goto(self.search_url, timeout=self.timeout * 1000)
+            current_page = 1
+            while not (max_pages and current_page > max_pages):
+                try:
+                    await page.wait_for_selector("h2[id^='scheme-name-']", timeout=self.timeout * 1000)
+                except Exception:
+                    break
+                soup = BeautifulSoup(await page.content(), "html.parser")
+                for h2 in soup.find_all("h2", id=re.compile(r"^scheme-name-\d+$")):
+                    a = h2.find("a", href=True)
+                    if a:
+                        url = urljoin(self.base_url, a["href"])
+                        if url not in seen:
+                            seen.add(url)
+                            all_urls.append({'name': a.get_text(strip=True), 'url': url})
+                print(f"📄 Page {current_page}: {len(all_urls)} scheme URLs so far")
+
+                next_button = page.locator(
+                    f"ul.list-none li.h-8.w-8:not(.bg-green-700):text-is('{current_page + 1}')"
+                )
+                if await next_button.count() == 0:
+                    break
+                await asyncio.sleep(self.rate_limiter.reserve())
+                await next_button.first.click()
+                current_page += 1
+        finally:
+            await self.browser.release(context, page)
+        return all_urls
+
+    # ---------- orchestration ----------
+    async def crawl(self, scheme_urls, writer, failed_writer):
+        """Phase 2: fetch and parse every scheme with bounded concurrency"""
+        url_queue = asyncio.Queue()
+        for scheme_info in scheme_urls:
+            url_queue.put_nowait((scheme_info, 0))
+        parse_queue = asyncio.Queue(maxsize=self.parse_queue_size)
+
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        with ProcessPoolExecutor(max_workers=self.parse_workers, initializer=_init_parse_worker) as pool:
+            async with aiohttp.ClientSession(headers=self.headers, timeout=timeout, connector=connector) as session:
+                fetchers = [
+                    asyncio.create_task(self._fetch_worker(session, url_queue, parse_queue, failed_writer))
+                    for _ in range(min(self.concurrency, max(1, len(scheme_urls))))
+                ]
+                parsers = [
+                    asyncio.create_task(self._parse_worker(pool, parse_queue, writer, failed_writer))
+                    for _ in range(self.parse_workers)
+                ]
+                try:
+                    await url_queue.join()
+                    await parse_queue.join()
+                finally:
+                    for task in fetchers + parsers:
+                        task.cancel()
+                    await asyncio.gather(*fetchers, *parsers, return_exceptions=True)
+
+    async def run(self, scheme_urls=None, max_pages=None, max_schemes=None, compression=None):
+        """Full async scrape with the same outputs as run_complete_scrape"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        start = time.time()
+        try:
+            if scheme_urls is None:
+                scheme_urls = await self.collect_scheme_urls(max_pages=max_pages)
+            if max_schemes:
+                scheme_urls = scheme_urls[:max_schemes]
+            if not scheme_urls:
+                print("❌ No schemes found. Exiting.")
+                return None
+
+            schemes_stream = stream_path(f"all_schemes_{timestamp}.jsonl", compression)
+            failed_stream = f"failed_schemes_{timestamp}.jsonl"
+            print(f"🚀 Crawling {len(scheme_urls)} schemes ({self.concurrency} in flight, "
+                  f"{self.parse_workers} parse workers) → {schemes_stream}")
+
+            with JsonlStreamWriter(schemes_stream, compression) as writer, \
+                    JsonlStreamWriter(failed_stream) as failed_writer:
+                await self.crawl(scheme_urls, writer, failed_writer)
+        finally:
+            await self.browser.close()
+
+        write_summary_csv(schemes_stream, f"schemes_summary_{timestamp}.csv")
+        if self.stats['failed']:
+            write_failed_csv(failed_stream, f"failed_schemes_{timestamp}.csv")
+        else:
+            os.remove(failed_stream)
+
+        elapsed = time.time() - start
+        print(f"✅ Parsed {self.stats['parsed']} schemes, {self.stats['failed']} failed in {elapsed:.1f}s "
+              f"({self.stats['parsed'] / max(elapsed, 1e-9):.1f} schemes/s)")
+        print(f"📈 {self.stats} | rate limiter: {self.rate_limiter.stats()}")
+        return schemes_stream
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Async MyScheme crawler")
+    parser.add_argument("--urls", help="scheme_urls_*.json from a previous Phase 1 (skips listing)")
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--max-schemes", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--browser-contexts", type=int, default=4)
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default=None)
+    args = parser.parse_args()
+
+    urls = None
+    if args.urls:
+        with open(args.urls, "r", encoding="utf-8") as f:
+            urls = json.load(f)
+
+    crawler = AsyncSchemeCrawler(concurrency=args.concurrency, browser_contexts=args.browser_contexts)
+    asyncio.run(crawler.run(scheme_urls=urls, max_pages=args.max_pages,
+                            max_schemes=args.max_schemes, compression=args.compression))
@@ -0,0 +1,221 @@
+"""
+Headless batch OCR for bulk document intake.
+
+    python batch_ocr.py scans/ --out intake.jsonl --csv intake.csv --workers 4
+    python batch_ocr.py field_office_batch.zip --out intake.jsonl
+
+Walks a directory, .zip or .tar(.gz) of Aadhaar / PAN / DL images, runs OCR +
+document detection + field extraction across a process pool and streams one
+result per file. Completed files are recorded in a manifest, so re-running the
+same command resumes where it stopped.
+"""
+import argparse
+import csv
+import os
+import tarfile
+import time
+import zipfile
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pytesseract
+
+from id_documents import complete_ocr_result
+from ocr_fields import run_field_ocr
+from ocr_service import _init_worker, make_config, run_ocr
+from scrape_output import JsonlStreamWriter, iter_jsonl
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp")
+CSV_HEADER = ["file", "doc_type", "name", "dob", "gender", "document_number", "ocr_seconds", "total_seconds", "error"]
+
+
+# =========================
+# INPUT ENUMERATION
+# =========================
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def iter_documents(source):
+    """Yield (document_id, bytes_loader) for every image in a directory or archive"""
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, source), (lambda p=path: _read_file(p))
+    elif zipfile.is_zipfile(source):
+        # Archives stay open while the generator runs; close() it (or exhaust it) to release them
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield info.filename, (lambda n=info.filename: archive.read(n))
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield member.name, (lambda m=member: archive.extractfile(m).read())
+    else:
+        raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+
+# =========================
+# WORKER
+# =========================
+def process_document(document_id, image_bytes, mode, config):
+    """Worker: OCR one image and run the same detection/extraction as the UI"""
+    start = time.perf_counter()
+    job = run_field_ocr if mode == "fields" else run_ocr
+    try:
+        result = complete_ocr_result(job(image_bytes, config))
+        error = None
+    except Exception as e:
+        result = {"text": "", "doc_type": None, "fields": {}, "timings": {}}
+        error = f"{type(e).__name__}: {e}"
+    result["timings"]["total"] = time.perf_counter() - start
+    return {
+        "file": document_id,
+        "doc_type": result.get("doc_type"),
+        "fields": result.get("fields") or {},
+        "text": result.get("text", ""),
+        "timings": result["timings"],
+        "error": error
+    }
+
+
+def _failed_record(document_id, error):
+    return {"file": document_id, "doc_type": None, "fields": {}, "text": "", "timings": {}, "error": error}
+
+
+def _csv_row(record):
+    fields = record["fields"]
+    timings = record["timings"]
+    ocr_seconds = sum(v for k, v in timings.items() if k != "total")
+    return [
+        record["file"],
+        record["doc_type"],
+        fields.get("name"),
+        fields.get("dob"),
+        fields.get("gender"),
+        fields.get("aadhaar_number") or fields.get("pan_number") or fields.get("dl_number"),
+        round(ocr_seconds, 3),
+        round(timings.get("total", 0.0), 3),
+        record["error"] or ""
+    ]
+
+
+# =========================
+# BATCH RUN
+# =========================
+def load_manifest(path):
+    """IDs of documents already processed successfully"""
+    return {entry["file"] for entry in iter_jsonl(path)}
+
+
+def run_batch(source, out_path, csv_path=None, manifest_path=None, workers=None,
+              mode="fields", config=None, tesseract_cmd=None):
+    config = config or make_config()
+    manifest_path = manifest_path or f"{out_path}.manifest.jsonl"
+    done = load_manifest(manifest_path)
+    workers = workers or os.cpu_count() or 2
+    window = workers * 2  # bytes of at most this many images are held in memory
+
+    csv_file = None
+    if csv_path:
+        new_csv = not os.path.exists(csv_path)
+        csv_file = open(csv_path, "a", newline="", encoding="utf-8")
+        csv_writer = csv.writer(csv_file)
+        if new_csv:
+            csv_writer.writerow(CSV_HEADER)
+
+    processed = skipped = failed = 0
+    start = time.time()
+    print(f"📂 Batch OCR: {source} ({mode} mode, {workers} workers, {len(done)} already done)")
+
+    def make_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(tesseract_cmd or pytesseract.pytesseract.tesseract_cmd,))
+
+    def collect(futures):
+        """Write results; returns True if the pool died (a worker crashed, e.g. killed by the OOM killer)"""
+        nonlocal processed, failed
+        broken = False
+        for future in futures:
+            document_id = in_flight.pop(future)
+            try:
+                record = future.result()
+            except BrokenProcessPool:
+                # Every document in flight when a worker died fails; they are retried on resume
+                broken = True
+                record = _failed_record(document_id, "BrokenProcessPool: OCR worker process died")
+            results.write(record)
+            if csv_file:
+                csv_writer.writerow(_csv_row(record))
+                csv_file.flush()
+            if record["error"]:
+                failed += 1
+                print(f"   ❌ {record['file']}: {record['error']}")
+            else:
+                # Only successes go in the manifest, so failures are retried on resume
+                manifest.write({"file": record["file"]})
+                processed += 1
+                print(f"   ✅ {record['file']}: {record['doc_type']} ({record['timings']['total']:.2f}s)")
+        return broken
+
+    def restart(broken_pool):
+        """Fail whatever was in flight on a crashed pool and start a fresh one for the rest"""
+        collect(wait(in_flight)[0])
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+        print("   ⚠️ OCR worker crashed - restarting the worker pool")
+        return make_pool()
+
+    in_flight = {}  # future -> document id
+    pool = make_pool()
+    try:
+        with JsonlStreamWriter(out_path) as results, JsonlStreamWriter(manifest_path) as manifest, \
+                closing(iter_documents(source)) as documents:
+            for document_id, load in documents:
+                if document_id in done:
+                    skipped += 1
+                    continue
+                if len(in_flight) >= window:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    if collect(finished):
+                        pool = restart(pool)
+                image_bytes = load()
+                try:
+                    future = pool.submit(process_document, document_id, image_bytes, mode, config)
+                except BrokenProcessPool:
+                    pool = restart(pool)
+                    future = pool.submit(process_document, document_id, image_bytes, mode, config)
+                in_flight[future] = document_id
+            collect(wait(in_flight)[0])
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if csv_file:
+            csv_file.close()
+
+    elapsed = time.time() - start
+    print(f"\n📊 {processed} processed, {failed} failed, {skipped} skipped (already done) in {elapsed:.1f}s"
+          f" ({processed / max(elapsed, 1e-9):.2f} docs/s)")
+    return processed, failed, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch OCR for Aadhaar / PAN / DL scans")
+    parser.add_argument("source", help="Directory, .zip or .tar(.gz) of document images")
+    parser.add_argument("--out", default="ocr_results.jsonl", help="JSONL results file (appended)")
+    parser.add_argument("--csv", default=None, help="Optional CSV results file (appended)")
+    parser.add_argument("--manifest", default=None, help="Resume manifest (default: <out>.manifest.jsonl)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--mode", choices=["fields", "text"], default="fields",
+                        help="'fields' = field-targeted OCR (as in the app), 'text' = full-page OCR")
+    parser.add_argument("--target-dpi", type=int, default=300)
+    parser.add_argument("--tesseract-cmd", default=None)
+    args = parser.parse_args()
+
+    run_batch(args.source, args.out, csv_path=args.csv, manifest_path=args.manifest, workers=args.workers,
+              mode=args.mode, config=make_config(target_dpi=args.target_dpi), tesseract_cmd=args.tesseract_cmd)
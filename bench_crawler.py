@@ -0,0 +1,224 @@
+"""
+Crawler throughput benchmark against the local fixture site (mock_site.py).
+
+    python bench_crawler.py --schemes-limit 60 --max-pages 3 --latency fixed:0.2 --out bench/crawler.json
+    python bench_crawler.py --crawler async --schemes-limit 300      # Phase 2 of the async crawler
+
+Runs UnifiedSchemeScraper Phase 1 (search pagination) and Phase 2 (scheme
+pages) — or AsyncSchemeCrawler's Phase 2 — against a mock site on localhost,
+so scraper changes can be measured without touching myscheme.gov.in.
+
+Reports per phase: wall time, pages per second, CPU seconds per page (this
+process and its browser/driver children), browser launches and peak memory.
+Child-process memory is only included when psutil is installed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from mock_site import MockSite, JSON_PATH
+from rate_limit import AdaptiveRateLimiter
+from scrape_output import JsonlStreamWriter
+
+
+# =========================
+# RESOURCE SAMPLING
+# =========================
+def cpu_seconds():
+    """User+system CPU of this process and its reaped children"""
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class PeakMemory:
+    """Samples RSS of this process (plus live children, with psutil) and keeps the peak"""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        if psutil is not None:
+            process = psutil.Process()
+            total = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        if resource is not None:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self._sample())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._sample())
+        return False
+
+
+def measure(site, phase_fn, page_key):
+    """Run one phase; returns (result, metrics) with pages counted on the server side"""
+    pages_before = site.stats[page_key]
+    cpu_before = cpu_seconds()
+    start = time.perf_counter()
+    with PeakMemory() as memory:
+        result = phase_fn()
+    wall = time.perf_counter() - start
+    pages = site.stats[page_key] - pages_before
+    cpu = cpu_seconds() - cpu_before
+    return result, {
+        "pages": pages,
+        "wall_seconds": round(wall, 3),
+        "pages_per_second": round(pages / wall, 3) if wall else None,
+        "cpu_seconds": round(cpu, 3),
+        "cpu_seconds_per_page": round(cpu / pages, 4) if pages else None,
+        "peak_memory_mb": round(memory.peak_bytes / (1024 * 1024), 1),
+        "peak_memory_includes_children": psutil is not None,
+    }
+
+
+# =========================
+# CRAWLERS
+# =========================
+def bench_unified(site, args, out_dir):
+    from FinalFullScrapping import UnifiedSchemeScraper
+
+    limiter = AdaptiveRateLimiter(initial_rate=args.rate, max_rate=args.rate * 4, burst=1)
+    scraper = UnifiedSchemeScraper(html_cache_dir=None, rate_limiter=limiter, base_url=site.url)
+    launches = {"count": 0}
+    setup_driver = scraper.setup_driver
+
+    def counting_setup_driver():
+        launches["count"] += 1
+        return setup_driver()
+
+    scraper.setup_driver = counting_setup_driver
+    results = {}
+
+    urls, results["phase1"] = measure(site, lambda: scraper.scrape_all_scheme_urls(max_pages=args.max_pages),
+                                      "search_pages")
+    results["phase1"]["urls_found"] = len(urls)
+    results["phase1"]["browser_launches"] = launches["count"]
+
+    urls = urls[:args.max_schemes] if args.max_schemes else urls
+    launches["count"] = 0
+    stream = os.path.join(out_dir, "schemes.jsonl")
+    failed_stream = os.path.join(out_dir, "failed.jsonl")
+
+    def phase2():
+        with JsonlStreamWriter(stream) as writer, JsonlStreamWriter(failed_stream) as failed_writer:
+            return scraper.scrape_details_to_stream(urls, writer, failed_writer)
+
+    (succeeded, failed), results["phase2"] = measure(site, phase2, "scheme_pages")
+    results["phase2"].update({"succeeded": succeeded, "failed": failed, "browser_launches": launches["count"]})
+    return results
+
+
+def bench_async(site, args, out_dir):
+    from async_crawler import AsyncSchemeCrawler
+
+    crawler = AsyncSchemeCrawler(base_url=site.url, concurrency=args.concurrency, html_cache_dir=None,
+                                 rate_limiter=AdaptiveRateLimiter(initial_rate=args.rate, max_rate=args.rate * 4,
+                                                                  burst=args.concurrency))
+    # The fixture serves every page statically, so Phase 2 needs no browser; list URLs directly
+    urls = [{"name": name, "url": f"{site.url}/schemes/{slug}"} for slug, name in site.listing]
+    urls = urls[:args.max_schemes] if args.max_schemes else urls
+    stream = os.path.join(out_dir, "schemes.jsonl")
+    failed_stream = os.path.join(out_dir, "failed.jsonl")
+
+    def phase2():
+        async def run():
+            try:
+                with JsonlStreamWriter(stream) as writer, JsonlStreamWriter(failed_stream) as failed_writer:
+                    await crawler.crawl(urls, writer, failed_writer)
+            finally:
+                await crawler.browser.close()
+        asyncio.run(run())
+
+    _, metrics = measure(site, phase2, "scheme_pages")
+    metrics.update({"succeeded": crawler.stats["parsed"], "failed": crawler.stats["failed"],
+                    "browser_launches": crawler.browser.launches, "retries": crawler.stats["retries"]})
+    return {"phase2": metrics}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scheme crawlers against a local fixture site")
+    parser.add_argument("--crawler", choices=("unified", "async"), default="unified")
+    parser.add_argument("--schemes", default=JSON_PATH)
+    parser.add_argument("--html-cache", default=None, help="serve cached crawler HTML instead of schemes.json")
+    parser.add_argument("--schemes-limit", type=int, default=50, help="schemes served by the fixture site")
+    parser.add_argument("--max-pages", type=int, default=None, help="Phase 1 page limit")
+    parser.add_argument("--max-schemes", type=int, default=None, help="Phase 2 scheme limit")
+    parser.add_argument("--latency", default="fixed:0.1", help="site latency spec, e.g. lognormal:0.3:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--padding-kb", type=int, default=200, help="extra KB per scheme page")
+    parser.add_argument("--rate", type=float, default=20.0, help="initial crawler request rate (req/s)")
+    parser.add_argument("--concurrency", type=int, default=32, help="async crawler fetches in flight")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    args = parser.parse_args()
+
+    options = {"latency": args.latency, "error_rate": args.error_rate, "seed": args.seed}
+    if args.html_cache:
+        site = MockSite.from_html_cache(args.html_cache, limit=args.schemes_limit, **options)
+    else:
+        site = MockSite.from_json(args.schemes, limit=args.schemes_limit, padding_kb=args.padding_kb, **options)
+    site.start()
+    print(f"🌐 Fixture site with {len(site.pages)} schemes on {site.url} (latency {args.latency}, "
+          f"error rate {args.error_rate})")
+
+    try:
+        with tempfile.TemporaryDirectory() as out_dir:
+            bench = bench_unified if args.crawler == "unified" else bench_async
+            phases = bench(site, args, out_dir)
+    finally:
+        site.stop()
+
+    for phase, metrics in phases.items():
+        print(f"  {phase}: {metrics['pages']} pages in {metrics['wall_seconds']}s → "
+              f"{metrics['pages_per_second']} pages/s · {metrics['cpu_seconds_per_page']} CPU s/page · "
+              f"{metrics['browser_launches']} browser launches · peak {metrics['peak_memory_mb']} MB")
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "crawler": args.crawler,
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "site": dict(site.stats),
+        "phases": phases,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.out}")
@@ -0,0 +1,330 @@
+"""
+End-to-end benchmark of the query pipeline (offline, fake LLM).
+
+    python bench_pipeline.py --queries 200 --users 1,4,16 --out bench/pipeline.json
+    python bench_pipeline.py --compare bench/pipeline.json        # after a change
+
+Replays generated applicant profiles and queries through the same steps as
+the app: retrieval → typed pre-filter → streamed LLM eligibility verdicts →
+summaries of the eligible schemes. The LLM is fake_llm.FakeLLM, so verdicts
+are deterministic and only the latency model is random (seeded).
+
+Retrieval uses the Chroma store when rag_db/ exists and langchain is
+installed (--retriever chroma). Otherwise it uses a lexical retriever over the
+knowledge-graph attribute index and the compiled corpus (--retriever graph).
+Neither needs network access.
+
+Reports per-stage and end-to-end p50/p95/p99 latency, throughput for each
+concurrency level, the context-cache hit ratio per level (each level starts
+cold) and the memory high-water mark, and writes everything as JSON so runs from different commits can be compared.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from corpus import Corpus, ensure_corpus
+from fake_llm import FakeLLM
+from knowledge_graph import AttributeIndex, build_graph
+from scheme_matcher import (SchemeMatcher, Chroma, JSON_PATH, CORPUS_PATH, ELIGIBILITY_JSON_PATH, DB_DIR,
+                            load_eligibility_data, load_eligibility_table, open_vectordb, is_eligible)
+from token_accounting import TokenLedger
+
+
+# =========================
+# CONFIG
+# =========================
+DEFAULT_LATENCY = "lognormal:0.25:0.5"
+STAGES = ("retrieval", "prefilter", "evaluation", "summaries", "total")
+
+OCCUPATIONS = [
+    ("Farmer", "B.Sc. Agriculture", "I need help for agriculture as I am a small farmer with family income {income}."),
+    ("Student", "B.Tech", "Looking for a scholarship for my engineering studies, family income is {income}."),
+    ("Student", "Class 10", "I am a school student from a poor family and need financial help for education."),
+    ("Fisherman", "Class 8", "I am a fisherman and need support for boat and fishing equipment."),
+    ("Street Vendor", "Class 5", "I sell vegetables on a cart and need a small loan to grow my business."),
+    ("Unemployed", "Graduate", "I am looking for skill training and a job, my family earns {income} a year."),
+    ("Artisan", "Class 10", "I am a weaver and want a loan and marketing support for handloom products."),
+    ("Entrepreneur", "MBA", "I want to start a startup and need funding and a subsidy for my business."),
+    ("Homemaker", "Class 12", "I am a widow with two children and need a pension or financial assistance."),
+    ("Construction Worker", "Class 8", "I work on building sites and need insurance and housing support."),
+    ("Retired", "Graduate", "I am a senior citizen and need a pension and health insurance."),
+    ("Researcher", "PhD", "I am doing a PhD and am looking for a research fellowship."),
+]
+CASTES = ["General", "OBC", "SC", "ST", "EWS"]
+GENDERS = ["male", "female"]
+INCOMES = [50000, 100000, 150000, 250000, 400000, 800000, 1500000]
+
+
+# =========================
+# WORKLOAD
+# =========================
+def generate_workload(n, seed=0):
+    """n (profile, query) pairs; a few queries repeat verbatim, as popular queries do in production"""
+    rng = random.Random(seed)
+    workload = []
+    for i in range(n):
+        occupation, education, template = rng.choice(OCCUPATIONS)
+        age = 70 if occupation == "Retired" else rng.randint(16 if "Class" in education else 20, 60)
+        income = rng.choice(INCOMES)
+        profile = {
+            "name": f"Bench User {i}",
+            "age": age,
+            "gender": rng.choice(GENDERS) if occupation != "Homemaker" else "female",
+            "nationality": "Indian",
+            "caste": rng.choice(CASTES),
+            "education": education,
+            "occupation": occupation,
+            "income": income,
+            "aadhaar_linked": rng.random() < 0.8,
+        }
+        workload.append((profile, template.format(income=f"{income:,}")))
+    return workload
+
+
+def load_workload(path):
+    """JSONL of {"profile": {...}, "query": "..."} (e.g. exported from user_history.json)"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [(item["profile"], item["query"]) for item in map(json.loads, f) if item.get("query")]
+
+
+# =========================
+# OFFLINE RETRIEVER
+# =========================
+class _Doc:
+    def __init__(self, page_content, scheme):
+        self.page_content = page_content
+        self.metadata = {"scheme": scheme}
+
+
+class GraphRetriever:
+    """
+    The subset of the Chroma interface SchemeMatcher uses, answered from the
+    knowledge-graph attribute index (term matches) and the corpus text.
+    """
+
+    def __init__(self, json_path=JSON_PATH, corpus_path=CORPUS_PATH, chunk_size=800):
+        with open(json_path, "r", encoding="utf-8") as f:
+            self.index = AttributeIndex.from_graph(build_graph(json.load(f)))
+        self.chunks = {}
+        with Corpus(ensure_corpus(json_path, corpus_path)) as corpus:
+            for name, text in corpus.iter_documents():
+                self.chunks[name] = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+    def _ranked(self, query, k):
+        ranked = self.index.rank_schemes(query)
+        best = ranked[0][1] if ranked else 1
+        docs = []
+        for scheme, count in ranked:
+            for chunk in self.chunks.get(scheme, []):
+                docs.append((_Doc(chunk, scheme), count / best))
+                if len(docs) >= k:
+                    return docs
+        return docs
+
+    def similarity_search_with_relevance_scores(self, query, k=4):
+        return self._ranked(query, k)
+
+    def as_retriever(self, search_kwargs=None):
+        retriever = self
+        k = (search_kwargs or {}).get("k", 4)
+
+        class _Retriever:
+            def get_relevant_documents(self, query):
+                return [doc for doc, _ in retriever._ranked(query, k)]
+
+        return _Retriever()
+
+
+# =========================
+# MEASUREMENT
+# =========================
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values)
+    return {
+        "count": len(values),
+        "mean": round(float(arr.mean()), 4),
+        "p50": round(float(np.percentile(arr, 50)), 4),
+        "p95": round(float(np.percentile(arr, 95)), 4),
+        "p99": round(float(np.percentile(arr, 99)), 4),
+        "max": round(float(arr.max()), 4),
+    }
+
+
+def max_rss_mb():
+    """Process memory high-water mark (ru_maxrss is KB on Linux, bytes on macOS)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+
+
+def run_query(matcher, llm, profile, query, top_k=30, llm_parallel=4, summaries=3):
+    """One app-equivalent query; returns {stage: seconds} plus counts"""
+    timings = {}
+    ledger = TokenLedger()
+    start = time.perf_counter()
+    scores = dict(matcher.top_schemes_with_scores(query, top_k=top_k))
+    timings["retrieval"] = time.perf_counter() - start
+
+    mark = time.perf_counter()
+    candidates = matcher.prefilter(profile, list(scores))
+    timings["prefilter"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    eligible, errors, evaluated = [], 0, 0
+    for scheme, verdict in matcher.iter_verdicts(profile, candidates, llm, max_parallel=llm_parallel, scores=scores,
+                                                  ledger=ledger):
+        evaluated += 1
+        if verdict.get("error"):
+            errors += 1
+        elif is_eligible(verdict["reasoning"]):
+            eligible.append(scheme)
+    timings["evaluation"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    for scheme in eligible[:summaries]:
+        try:
+            matcher.summarize(scheme, llm, ledger=ledger)
+        except Exception:
+            errors += 1
+    timings["summaries"] = time.perf_counter() - mark
+    timings["total"] = time.perf_counter() - start
+    return {"timings": timings, "candidates": len(scores), "evaluated": evaluated,
+            "eligible": len(eligible), "errors": errors, "tokens": ledger.totals()["total_tokens"]}
+
+
+def run_level(matcher, llm, workload, users, **query_options):
+    """Replay the workload with `users` concurrent sessions"""
+    results, lock = [], threading.Lock()
+
+    def session(item):
+        result = run_query(matcher, llm, *item, **query_options)
+        with lock:
+            results.append(result)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(session, workload))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "users": users,
+        "queries": len(results),
+        "seconds": round(elapsed, 3),
+        "throughput_qps": round(len(results) / elapsed, 3) if elapsed else None,
+        "stages": {stage: percentiles([r["timings"][stage] for r in results]) for stage in STAGES},
+        "mean_candidates": round(float(np.mean([r["candidates"] for r in results])), 1),
+        "mean_evaluated": round(float(np.mean([r["evaluated"] for r in results])), 1),
+        "mean_eligible": round(float(np.mean([r["eligible"] for r in results])), 1),
+        "mean_tokens": round(float(np.mean([r["tokens"] for r in results])), 1),
+        "errors": sum(r["errors"] for r in results),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Print p95/throughput changes per concurrency level between two result files"""
+    before = {level["users"]: level for level in previous["levels"]}
+    print(f"\n📊 {previous.get('commit')} → {current.get('commit')}")
+    for level in current["levels"]:
+        old = before.get(level["users"])
+        if old is None:
+            continue
+        print(f"  users={level['users']}: throughput {old['throughput_qps']} → {level['throughput_qps']} q/s")
+        for stage in STAGES:
+            a, b = old["stages"][stage].get("p95"), level["stages"][stage].get("p95")
+            if a and b:
+                print(f"    {stage:<11} p95 {a:.3f}s → {b:.3f}s ({(b - a) / a * 100:+.1f}%)")
+
+
+def run_benchmark(args):
+    baseline_rss = max_rss_mb()
+    retriever = args.retriever
+    if retriever == "auto":
+        has_store = Chroma is not None and os.path.exists(os.path.join(DB_DIR, "chroma.sqlite3"))
+        retriever = "chroma" if has_store else "graph"
+    vectordb = open_vectordb(DB_DIR) if retriever == "chroma" else GraphRetriever(args.schemes)
+    matcher = SchemeMatcher(vectordb, load_eligibility_data(args.eligibility),
+                            load_eligibility_table(args.eligibility))
+    llm = FakeLLM(args.eligibility, latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    workload = load_workload(args.workload) if args.workload else generate_workload(args.queries, args.seed)
+    loaded_rss = max_rss_mb()
+    print(f"🧪 {len(workload)} queries · retriever={retriever} · fake LLM latency {args.latency}, "
+          f"error rate {args.error_rate}")
+
+    levels = []
+    for users in args.users:
+        # Every level starts with a cold context cache, so hit ratios are comparable across levels
+        matcher.clear_context_cache()
+        level = run_level(matcher, llm, workload, users, top_k=args.top_k, llm_parallel=args.llm_parallel,
+                          summaries=args.summaries)
+        level["context_cache"] = matcher.cache_stats()
+        levels.append(level)
+        total = level["stages"]["total"]
+        print(f"  👥 {users:>3} users: {level['throughput_qps']:.2f} q/s · p50 {total['p50']:.2f}s "
+              f"p95 {total['p95']:.2f}s p99 {total['p99']:.2f}s · ~{level['mean_tokens']:.0f} tokens/query · "
+              f"{level['errors']} errors · context cache hit ratio {level['context_cache']['hit_ratio']}")
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"queries": len(workload), "retriever": retriever, "latency": args.latency,
+                   "error_rate": args.error_rate, "seed": args.seed, "top_k": args.top_k,
+                   "llm_parallel": args.llm_parallel, "summaries": args.summaries},
+        "levels": levels,
+        "memory": {"baseline_max_rss_mb": baseline_rss, "after_load_max_rss_mb": loaded_rss,
+                   "max_rss_mb": max_rss_mb()},
+        "llm": llm.stats(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the query pipeline")
+    parser.add_argument("--schemes", default=JSON_PATH)
+    parser.add_argument("--eligibility", default=ELIGIBILITY_JSON_PATH)
+    parser.add_argument("--workload", help="JSONL of {profile, query}; default: generated")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--users", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--retriever", choices=("auto", "chroma", "graph"), default="auto")
+    parser.add_argument("--latency", default=DEFAULT_LATENCY, help="fake LLM latency spec (latency.parse_latency)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top-k", type=int, default=30)
+    parser.add_argument("--llm-parallel", type=int, default=4)
+    parser.add_argument("--summaries", type=int, default=3, help="eligible schemes summarised per query")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--compare", default=None, help="previous results JSON to compare against")
+    args = parser.parse_args()
+    args.users = [int(u) for u in args.users.split(",") if u]
+
+    results = run_benchmark(args)
+    print(f"🧠 max RSS {results['memory']['max_rss_mb']} MB")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), results)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.out}")
@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import zlib
+
+
+# =========================
+# COMPILED SCHEME CORPUS
+# =========================
+# One SQLite file, one row per scheme:
+#   name      scheme name (indexed, for random access)
+#   source    scheme URL
+#   doc_text  zlib-compressed retrieval text load_data embeds (precomputed at compile time)
+#   record    zlib-compressed JSON of the full knowledge_base_entry
+# Building the vector store only reads doc_text; the bulky sections
+# (additional_details, contact, ...) stay compressed until someone asks for them.
+CORPUS_PATH = "schemes.db"
+RETRIEVAL_SECTIONS = ("key_information", "all_extracted_sections")
+
+_SCHEMA = """
+CREATE TABLE schemes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    source TEXT,
+    doc_text BLOB NOT NULL,
+    record BLOB NOT NULL
+);
+CREATE INDEX schemes_name ON schemes(name);
+CREATE INDEX schemes_source ON schemes(source);
+"""
+
+
+def document_text(kb):
+    """Retrieval text for one scheme: name, summary and the flattened key sections"""
+    text_parts = [f"Scheme: {kb.get('scheme', '')}", f"Summary: {kb.get('summary', '')}"]
+    for section in RETRIEVAL_SECTIONS:
+        section_data = kb.get(section, {})
+        if isinstance(section_data, dict):
+            for key, value in section_data.items():
+                if isinstance(value, list):
+                    text_parts.extend(value)
+                elif isinstance(value, str):
+                    text_parts.append(value)
+    return "\n".join(text_parts).strip()
+
+
+def compile_corpus(records, path=CORPUS_PATH):
+    """
+    Write formatted scheme records ({'knowledge_base_entry': ...}, as in
+    schemes.json or the scrape stream) to a new corpus file. `records` may be
+    any iterable, so a JSONL stream is compiled without loading it whole.
+    The finished file replaces `path` atomically.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    count = 0
+    try:
+        conn.executescript(_SCHEMA)
+        rows = []
+        for record in records:
+            kb = record.get("knowledge_base_entry")
+            if not kb:
+                continue
+            payload = json.dumps(kb, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            doc_text = zlib.compress(document_text(kb).encode("utf-8"), 6)
+            rows.append((kb.get("scheme", "Unknown"), kb.get("source"), doc_text, zlib.compress(payload, 6)))
+            if len(rows) >= 500:
+                conn.executemany("INSERT INTO schemes (name, source, doc_text, record) VALUES (?, ?, ?, ?)", rows)
+                count += len(rows)
+                rows = []
+        conn.executemany("INSERT INTO schemes (name, source, doc_text, record) VALUES (?, ?, ?, ?)", rows)
+        count += len(rows)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return count
+
+
+def compile_json(json_path, path=CORPUS_PATH):
+    with open(json_path, "r", encoding="utf-8") as f:
+        return compile_corpus(json.load(f), path)
+
+
+def ensure_corpus(json_path, path=CORPUS_PATH):
+    """Recompile from schemes.json when the corpus is missing or older; returns the path"""
+    if not os.path.exists(path) or (os.path.exists(json_path) and
+                                    os.path.getmtime(path) < os.path.getmtime(json_path)):
+        compile_json(json_path, path)
+    return path
+
+
+class Corpus:
+    """Read side: random access by name/URL and streaming iteration"""
+
+    def __init__(self, path=CORPUS_PATH):
+        self.path = path
+        # Read-only; check_same_thread off so one handle can be shared by Streamlit threads
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM schemes").fetchone()[0]
+
+    @staticmethod
+    def _decode(blob):
+        return json.loads(zlib.decompress(blob))
+
+    def get(self, name):
+        """knowledge_base_entry of the named scheme, or None"""
+        row = self.conn.execute("SELECT record FROM schemes WHERE name = ? ORDER BY id LIMIT 1", (name,)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def get_by_source(self, url):
+        row = self.conn.execute("SELECT record FROM schemes WHERE source = ? ORDER BY id LIMIT 1", (url,)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def names(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM schemes ORDER BY id")]
+
+    def iter_documents(self):
+        """(name, doc_text) in corpus order, streamed from the cursor"""
+        for name, blob in self.conn.execute("SELECT name, doc_text FROM schemes ORDER BY id"):
+            doc_text = zlib.decompress(blob).decode("utf-8")
+            if doc_text:
+                yield name, doc_text
+
+    def iter_records(self):
+        """Full knowledge_base_entry dicts, streamed"""
+        for (blob,) in self.conn.execute("SELECT record FROM schemes ORDER BY id"):
+            yield self._decode(blob)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile schemes.json (or a scrape JSONL stream) into the corpus")
+    parser.add_argument("source", nargs="?", default="schemes.json")
+    parser.add_argument("--out", default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    if args.source.endswith(".json"):
+        count = compile_json(args.source, args.out)
+    else:
+        from scrape_output import iter_jsonl
+        count = compile_corpus(iter_jsonl(args.source), args.out)
+    print(f"✅ Compiled {count} schemes into {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB)")
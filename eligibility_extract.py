@@ -0,0 +1,252 @@
+"""
+Eligibility key-value extraction (builds eligibility_summary-2.json).
+
+    python eligibility_extract.py schemes.json --out eligibility_summary-2.json --workers 4
+
+Each scheme's eligibility points are summarised by the LLM into short JSON
+key-value pairs. Results are cached by a hash of the points (plus model and
+prompt version), so after a weekly crawl only schemes whose eligibility text
+changed are sent to the LLM again.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    from groq import Groq
+except ImportError:
+    Groq = None
+
+from eligibility_schema import save_table
+from rate_limit import AdaptiveRateLimiter, backoff_delay
+from scrape_output import write_json_atomic
+
+
+# =========================
+# CONFIG
+# =========================
+MODEL = "llama-3.3-70b-versatile"
+PROMPT_VERSION = 1  # bump when the prompt changes so cached summaries are regenerated
+CACHE_PATH = "eligibility_cache.json"
+OUTPUT_PATH = "eligibility_summary-2.json"
+ERROR_RESULT = {"Error": "LLM processing failed"}
+
+
+# =========================
+# ELIGIBILITY POINTS
+# =========================
+def eligibility_text(kb):
+    """Eligibility criteria from key_information, falling back to the extracted section"""
+    key_info = kb.get("key_information", {}).get("eligibility_criteria", [])
+    extracted_info = kb.get("all_extracted_sections", {}).get("Eligibility", [])
+    eligibility = key_info if len(key_info) > 0 else extracted_info
+    if isinstance(eligibility, list):
+        return "\n".join(eligibility)
+    return str(eligibility)
+
+
+def extract_eligibility_points(scheme_text):
+    """Extract numbered or bulleted eligibility points."""
+    points = re.findall(r"[\d\-\•]+\.\s*(.*)", scheme_text)
+    clean_points = [p.strip() for p in points if len(p.strip()) > 2]
+    if not clean_points and len(scheme_text.strip()) > 3:
+        clean_points = [line.strip() for line in scheme_text.split("\n") if len(line.strip()) > 3]
+    return clean_points
+
+
+def points_key(points, scheme_name, model=MODEL):
+    """Cache key: hash of the scheme name, its points, the model and the prompt version"""
+    payload = json.dumps({"scheme": scheme_name, "points": points, "model": model,
+                          "prompt_version": PROMPT_VERSION}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# =========================
+# LLM CALL
+# =========================
+def build_prompt(points, scheme_name):
+    joined_points = "\n".join([f"- {p}" for p in points])
+    return f"""
+You are a data structuring assistant.
+Summarize the following eligibility criteria for the scheme "{scheme_name}"
+into concise JSON key-value pairs with one-word or short-phrase keys.
+
+Example format:
+{{
+  "Nationality": "Indian",
+  "Income_Limit": "₹4.5 lakh",
+  "Course": "Regular degree"
+}}
+
+Eligibility criteria:
+{joined_points}
+
+Now output only JSON (no extra text).
+"""
+
+
+def parse_reply(reply):
+    """First JSON object in the reply; ValueError if there is none"""
+    match = re.search(r"\{.*\}", reply, re.DOTALL)
+    if not match:
+        raise ValueError("no JSON object in LLM reply")
+    return json.loads(match.group(0))
+
+
+def generate_semantic_pairs(client, points, scheme_name, model=MODEL):
+    """One LLM call; raises on API errors and unparseable replies so the caller can retry"""
+    response = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": build_prompt(points, scheme_name)}],
+        temperature=0.2,
+        max_tokens=300
+    )
+    return parse_reply(response.choices[0].message.content.strip())
+
+
+# =========================
+# CACHE
+# =========================
+class EligibilityCache:
+    """points hash -> extracted pairs, persisted as one JSON file (atomic writes)"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, key):
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key, pairs):
+        with self._lock:
+            self.entries[key] = pairs
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            write_json_atomic(self.path, self.entries)
+
+    def prune(self, live_keys):
+        """Drop entries for points that no longer occur in any scheme"""
+        with self._lock:
+            self.entries = {k: v for k, v in self.entries.items() if k in live_keys}
+
+
+# =========================
+# PIPELINE
+# =========================
+def _extract_with_retries(client, points, scheme_name, limiter, model, max_attempts):
+    for attempt in range(1, max_attempts + 1):
+        limiter.acquire()
+        start = time.time()
+        try:
+            pairs = generate_semantic_pairs(client, points, scheme_name, model)
+            limiter.record(time.time() - start, ok=True)
+            return pairs
+        except Exception as e:
+            limiter.record(time.time() - start, ok=False)
+            if attempt == max_attempts:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"   🔁 {scheme_name}: {type(e).__name__}: {e} (retry {attempt}/{max_attempts - 1} in {delay:.1f}s)")
+            time.sleep(delay)
+
+
+def extract_all(data, client, output_path=OUTPUT_PATH, cache_path=CACHE_PATH, workers=4,
+                rate_limiter=None, max_attempts=3, model=MODEL, save_every=20):
+    """
+    Build the eligibility summary for every scheme in `data` (schemes.json
+    entries) and write it atomically to output_path. Only cache misses reach
+    the LLM, at most `workers` at a time and paced by the rate limiter.
+    Schemes that still fail after max_attempts get ERROR_RESULT and are not
+    cached, so the next run retries them.
+    """
+    cache = EligibilityCache(cache_path)
+    limiter = rate_limiter or AdaptiveRateLimiter(initial_rate=1.0, max_rate=10.0, burst=workers,
+                                                  latency_target=30.0)
+
+    results = [None] * len(data)
+    pending = []
+    live_keys = set()
+    for i, entry in enumerate(data):
+        kb = entry.get("knowledge_base_entry", {})
+        scheme = kb.get("scheme", "Unknown Scheme")
+        points = extract_eligibility_points(eligibility_text(kb))
+        if not points:
+            results[i] = {"scheme_name": scheme, "eligibility": {}}
+            continue
+        key = points_key(points, scheme, model)
+        live_keys.add(key)
+        cached = cache.get(key)
+        if cached is not None:
+            results[i] = {"scheme_name": scheme, "eligibility": cached}
+        else:
+            pending.append((i, scheme, points, key))
+
+    print(f"🧾 {len(data)} schemes: {len(data) - len(pending)} cached/empty, {len(pending)} to extract")
+    start = time.time()
+    failed = 0
+    if pending:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_extract_with_retries, client, points, scheme, limiter, model, max_attempts):
+                    (i, scheme, key)
+                for i, scheme, points, key in pending
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i, scheme, key = futures[future]
+                try:
+                    pairs = future.result()
+                    cache.put(key, pairs)
+                except Exception as e:
+                    print(f"⚠️ LLM Error for {scheme}: {e}")
+                    pairs = dict(ERROR_RESULT)
+                    failed += 1
+                results[i] = {"scheme_name": scheme, "eligibility": pairs}
+                if done % save_every == 0:
+                    # Keep progress if the run is interrupted
+                    cache.save()
+                    print(f"   ✅ {done}/{len(pending)} extracted ({limiter.rate:.2f} req/s)")
+
+    cache.prune(live_keys)
+    cache.save()
+    write_json_atomic(output_path, results)
+    # Keep the typed npz table (used by the app's pre-filter) in step with the JSON
+    save_table(output_path)
+    print(f"✅ Semantic eligibility summaries saved to: {output_path}")
+    print(f"Total schemes processed: {len(results)} ({len(pending) - failed} extracted, {failed} failed) "
+          f"in {time.time() - start:.1f}s")
+    return results
+
+
+def make_groq_client(api_key=None):
+    if Groq is None:
+        raise ImportError("groq is required for eligibility extraction (pip install groq)")
+    return Groq(api_key=api_key or os.getenv("GROQ_API_KEY"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract eligibility key-value pairs with the LLM")
+    parser.add_argument("schemes_json", nargs="?", default="schemes.json")
+    parser.add_argument("--out", default=OUTPUT_PATH)
+    parser.add_argument("--cache", default=CACHE_PATH)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--model", default=MODEL)
+    args = parser.parse_args()
+
+    with open(args.schemes_json, "r", encoding="utf-8") as f:
+        schemes = json.load(f)
+    extract_all(schemes, make_groq_client(), output_path=args.out, cache_path=args.cache,
+                workers=args.workers, max_attempts=args.max_attempts, model=args.model)
@@ -0,0 +1,416 @@
+import json
+import math
+import os
+import re
+
+import numpy as np
+
+
+# =========================
+# CANONICAL KEY VOCABULARY
+# =========================
+# LLM-extracted keys vary freely (BankAccount / Bank_Account, Income_Limit /
+# Income, Residence / Domicile / State ...). Keys are lowercased and stripped
+# to [a-z0-9] and then mapped through these aliases; anything unknown is kept
+# under "other" so no information is lost.
+CANONICAL_KEYS = {
+    "state": ["state", "residence", "residency", "resident", "domicile", "nativity", "permanentresident",
+              "statedomicile", "stateofresidence"],
+    "nationality": ["nationality", "citizenship", "citizen"],
+    "age": ["age", "agelimit", "agerange", "agegroup", "agecriteria", "minimumage", "maximumage",
+            "minage", "maxage"],
+    "income": ["income", "incomelimit", "annualincome", "familyincome", "householdincome", "parentalincome",
+               "incomecriteria", "incomeceiling", "maxincome", "maximumincome"],
+    "gender": ["gender", "sex"],
+    "category": ["category", "categories", "caste", "castecategory", "socialcategory", "community", "religion"],
+    "occupation": ["occupation", "profession", "employment", "employmentstatus", "sector", "job", "work"],
+    "education": ["education", "educationalqualification", "qualification", "course", "degree", "class",
+                  "standard", "study", "academic"],
+    "marks": ["marks", "minimummarks", "percentage", "score", "grades", "academicperformance"],
+    "disability": ["disability", "disabilitypercentage", "handicap", "disabled"],
+    "bank_account": ["bankaccount", "bank", "account"],
+    "land": ["land", "landholding", "landownership", "landsize"],
+    "family": ["family", "familylimit", "household", "familysize"],
+    "status": ["status", "socialstatus", "economicstatus", "bpl"],
+    "applicant": ["applicant", "applicanttype", "beneficiary", "eligible", "eligibility", "alternative"],
+    "exclusion": ["exclusion", "exclusions", "noteligible", "ineligible"],
+    "error": ["error", "parsed"],
+}
+KEY_VOCAB = list(CANONICAL_KEYS) + ["other"]
+_ALIASES = {alias: key for key, aliases in CANONICAL_KEYS.items() for alias in aliases}
+# Longer aliases also match as prefixes (IncomeLimitPerAnnum -> income)
+_PREFIX_ALIASES = sorted((a for a in _ALIASES if len(a) >= 5), key=len, reverse=True)
+
+GENDER_ANY, GENDER_FEMALE, GENDER_MALE = 0, 1, 2
+
+CATEGORY_BITS = {"sc": 1, "st": 2, "obc": 4, "ews": 8, "minority": 16}
+_CATEGORY_PATTERNS = [
+    ("sc", re.compile(r"\bsc\b|scheduled castes?")),
+    ("st", re.compile(r"\bst\b|scheduled tribes?")),
+    ("obc", re.compile(r"\bobc\b|other backward")),
+    ("ews", re.compile(r"\bews\b|economically weaker")),
+    ("minority", re.compile(r"\bminorit")),
+]
+_OPEN_CATEGORY_RE = re.compile(r"\b(any|all|general|others?|open|none)\b")
+
+STATES = {
+    "andhra pradesh": ["andhra pradesh"], "arunachal pradesh": ["arunachal"], "assam": ["assam"],
+    "bihar": ["bihar"], "chhattisgarh": ["chhattisgarh"], "goa": ["goa"], "gujarat": ["gujarat"],
+    "haryana": ["haryana"], "himachal pradesh": ["himachal"], "jharkhand": ["jharkhand"],
+    "karnataka": ["karnataka"], "kerala": ["kerala"], "madhya pradesh": ["madhya pradesh"],
+    "maharashtra": ["maharashtra"], "manipur": ["manipur"], "meghalaya": ["meghalaya"],
+    "mizoram": ["mizoram"], "nagaland": ["nagaland"], "odisha": ["odisha", "orissa"],
+    "punjab": ["punjab"], "rajasthan": ["rajasthan"], "sikkim": ["sikkim"], "tamil nadu": ["tamil nadu"],
+    "telangana": ["telangana"], "tripura": ["tripura"], "uttar pradesh": ["uttar pradesh"],
+    "uttarakhand": ["uttarakhand", "uttaranchal"], "west bengal": ["west bengal"],
+    "andaman and nicobar islands": ["andaman"], "chandigarh": ["chandigarh"],
+    "dadra and nagar haveli and daman and diu": ["dadra", "daman"], "delhi": ["delhi", "nct"],
+    "jammu and kashmir": ["jammu", "kashmir", "j&k"], "ladakh": ["ladakh"],
+    "lakshadweep": ["lakshadweep"], "puducherry": ["puducherry", "pondicherry"],
+}
+STATE_VOCAB = sorted(STATES)
+_STATE_PATTERNS = [(STATE_VOCAB.index(state), re.compile(r"(?<![a-z])(" + "|".join(map(re.escape, aliases)) + r")(?![a-z])"))
+                   for state, aliases in STATES.items()]
+
+
+def canonical_key(key):
+    """Map a raw extracted key onto KEY_VOCAB"""
+    norm = re.sub(r"[^a-z0-9]", "", key.lower())
+    if norm in _ALIASES:
+        return _ALIASES[norm]
+    for alias in _PREFIX_ALIASES:
+        if norm.startswith(alias):
+            return _ALIASES[alias]
+    return "other"
+
+
+def _text(value):
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return ", ".join(f"{k}: {v}" for k, v in value.items())
+    return str(value)
+
+
+# =========================
+# VALUE PARSERS
+# =========================
+_AMOUNT_RE = re.compile(r"(?:₹|rs\.?|inr)?\s*(\d[\d,]*(?:\.\d+)?)\s*(lakhs?|lacs?|crores?|cr\b|thousand|k\b)?")
+_UNITS = {"lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5, "crore": 1e7, "crores": 1e7, "cr": 1e7,
+          "thousand": 1e3, "k": 1e3}
+_NO_LIMIT_RE = re.compile(r"\bno (upper )?limit\b|\bno income\b|\bany\b|\bnot applicable\b")
+
+
+def parse_rupees(text):
+    """
+    Income ceiling in rupees per year: "₹4.5 lakh" → 450000, "₹8,00,000" →
+    800000, "₹8,000/- per month" → 96000. Returns None when there is no limit
+    or nothing recognisable; with several amounts the largest is taken, so a
+    misparse can only loosen the ceiling.
+    """
+    t = text.lower()
+    if _NO_LIMIT_RE.search(t):
+        return None
+    monthly = bool(re.search(r"per month|/month|monthly|p\.m\.", t))
+    amounts = []
+    for number, unit in _AMOUNT_RE.findall(t):
+        value = float(number.replace(",", ""))
+        if unit:
+            value *= _UNITS[unit]
+        elif value < 1000 and not re.search(r"₹|rs\.?|inr", t):
+            continue  # bare small numbers are counts ("2 children"), not money
+        amounts.append(value)
+    if not amounts:
+        return None
+    return max(amounts) * (12 if monthly else 1)
+
+
+_RANGE_RE = re.compile(r"(\d{1,3})\s*(?:-|–|to)\s*(\d{1,3})")
+_MIN_RE = re.compile(r"(?:above|over|more than|minimum|at least|min\.?|not less than)\s*(\d{1,3})"
+                     r"|(\d{1,3})\s*(?:\+|years? (?:and|or) above|(?:and|or) above|or more|years? or older)")
+_MAX_RE = re.compile(r"(?:below|under|up ?to|less than|maximum|max\.?|not exceeding|not more than)\s*(\d{1,3})")
+_BARE_RE = re.compile(r"^\s*(\d{1,3})\s*(?:years?|yrs?)?\s*$")
+
+
+def parse_age_range(text, raw_key=""):
+    """(age_min, age_max) in years, None for an open end"""
+    t = text.lower()
+    match = _RANGE_RE.search(t)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2))
+        if low <= high <= 120:
+            return low, high
+    age_min = age_max = None
+    match = _MIN_RE.search(t)
+    if match:
+        age_min = int(match.group(1) or match.group(2))
+    match = _MAX_RE.search(t)
+    if match:
+        age_max = int(match.group(1))
+    if age_min is None and age_max is None:
+        # A bare number only means something when the key says which end it is
+        match = _BARE_RE.match(t)
+        norm = re.sub(r"[^a-z]", "", raw_key.lower())
+        if match and ("limit" in norm or "max" in norm):
+            age_max = int(match.group(1))
+        elif match and "min" in norm:
+            age_min = int(match.group(1))
+    if age_min is not None and age_min > 120:
+        age_min = None
+    if age_max is not None and age_max > 120:
+        age_max = None
+    return age_min, age_max
+
+
+def parse_gender(text):
+    """GENDER_FEMALE / GENDER_MALE when the scheme is restricted to one, else GENDER_ANY"""
+    t = text.lower()
+    female = re.search(r"\b(female|females|woman|women|girls?|widows?|mothers?|daughters?)\b", t)
+    male = re.search(r"\b(male|males|man|men|boys?)\b", t)
+    if female and not male:
+        return GENDER_FEMALE
+    if male and not female:
+        return GENDER_MALE
+    return GENDER_ANY
+
+
+def parse_categories(text):
+    """Bitmask of reserved categories the value names (0 if none are named)"""
+    t = text.lower()
+    mask = 0
+    for tag, pattern in _CATEGORY_PATTERNS:
+        if pattern.search(t):
+            mask |= CATEGORY_BITS[tag]
+    return mask
+
+
+def parse_states(text):
+    """State/UT codes (indexes into STATE_VOCAB) mentioned in the value"""
+    t = text.lower()
+    return [code for code, pattern in _STATE_PATTERNS if pattern.search(t)]
+
+
+def parse_percent(text):
+    """Smallest percentage in the value (e.g. minimum marks), or None"""
+    values = [float(v) for v in re.findall(r"(\d{1,3}(?:\.\d+)?)\s*%", text)]
+    return min(values) if values else None
+
+
+# =========================
+# CANONICALIZATION
+# =========================
+def canonicalize(eligibility):
+    """
+    One scheme's raw extracted pairs → (canonical pairs, typed fields).
+    Canonical pairs are [(canonical_key, original_key, value_text)].
+    """
+    pairs = [(canonical_key(k), k, _text(v)) for k, v in eligibility.items()]
+    fields = {
+        "valid": not any(key == "error" for key, _, _ in pairs),
+        "age_min": None, "age_max": None, "income_max": None,
+        "gender": GENDER_ANY, "category_mask": 0, "states": [],
+        "indian_only": False, "requires_bpl": False,
+        "requires_disability": False, "marks_min": None,
+    }
+    for key, raw_key, value in pairs:
+        lower = value.lower()
+        if key == "age":
+            age_min, age_max = parse_age_range(value, raw_key)
+            fields["age_min"] = age_min if fields["age_min"] is None else fields["age_min"]
+            fields["age_max"] = age_max if fields["age_max"] is None else fields["age_max"]
+        elif key == "income":
+            amount = parse_rupees(value)
+            if amount is not None:
+                fields["income_max"] = max(fields["income_max"] or 0, amount)
+        elif key == "gender":
+            fields["gender"] = parse_gender(value)
+        elif key == "category":
+            # Only a strictly reserved list ("SC/ST") is a restriction; "Any", "General/SC/ST" are not
+            if not _OPEN_CATEGORY_RE.search(lower):
+                fields["category_mask"] |= parse_categories(value)
+        elif key == "state":
+            fields["states"].extend(s for s in parse_states(value) if s not in fields["states"])
+        elif key == "nationality":
+            fields["indian_only"] = "indian" in lower
+        elif key == "marks":
+            fields["marks_min"] = parse_percent(value)
+        elif key == "disability":
+            fields["requires_disability"] = not re.search(r"\b(no|not|none|any|n/a)\b", lower)
+        if key in ("income", "status", "family", "category") and re.search(r"\bbpl\b|below poverty", lower):
+            fields["requires_bpl"] = True
+    return pairs, fields
+
+
+# =========================
+# COLUMNAR TABLE (npz)
+# =========================
+def table_path(json_path):
+    """eligibility_summary-2.json → eligibility_summary-2.npz"""
+    return os.path.splitext(json_path)[0] + ".npz"
+
+
+def parse_number(value):
+    """Profile number from an int/float or text like "22" or "1,00,000"; None when it won't parse"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return None if math.isnan(value) else float(value)
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def _nan(value):
+    return np.nan if value is None else value
+
+
+def compile_table(eligibility_json):
+    """Column arrays for a list of {scheme_name, eligibility} records"""
+    names, rows, kv_keys, kv_raw, kv_values = [], [], [], [], []
+    kv_indptr, state_indptr, state_codes = [0], [0], []
+    for item in eligibility_json:
+        pairs, fields = canonicalize(item.get("eligibility") or {})
+        names.append(item["scheme_name"])
+        rows.append(fields)
+        for key, raw_key, value in pairs:
+            kv_keys.append(KEY_VOCAB.index(key))
+            kv_raw.append(raw_key)
+            kv_values.append(value)
+        kv_indptr.append(len(kv_keys))
+        state_codes.extend(fields["states"])
+        state_indptr.append(len(state_codes))
+
+    return {
+        "scheme_names": np.array(names, dtype=str),
+        "valid": np.array([r["valid"] for r in rows], dtype=bool),
+        "age_min": np.array([_nan(r["age_min"]) for r in rows], dtype=np.float32),
+        "age_max": np.array([_nan(r["age_max"]) for r in rows], dtype=np.float32),
+        "income_max": np.array([_nan(r["income_max"]) for r in rows], dtype=np.float64),
+        "gender": np.array([r["gender"] for r in rows], dtype=np.uint8),
+        "category_mask": np.array([r["category_mask"] for r in rows], dtype=np.uint8),
+        "indian_only": np.array([r["indian_only"] for r in rows], dtype=bool),
+        "requires_bpl": np.array([r["requires_bpl"] for r in rows], dtype=bool),
+        "requires_disability": np.array([r["requires_disability"] for r in rows], dtype=bool),
+        "marks_min": np.array([_nan(r["marks_min"]) for r in rows], dtype=np.float32),
+        "state_indptr": np.array(state_indptr, dtype=np.int32),
+        "state_codes": np.array(state_codes, dtype=np.uint8),
+        "state_vocab": np.array(STATE_VOCAB, dtype=str),
+        "kv_indptr": np.array(kv_indptr, dtype=np.int32),
+        "kv_keys": np.array(kv_keys, dtype=np.uint8),
+        "kv_raw_keys": np.array(kv_raw, dtype=str),
+        "kv_values": np.array(kv_values, dtype=str),
+        "key_vocab": np.array(KEY_VOCAB, dtype=str),
+    }
+
+
+def save_table(json_path, out_path=None):
+    """Compile the eligibility JSON into the npz next to it; returns the table"""
+    with open(json_path, "r", encoding="utf-8") as f:
+        eligibility_json = json.load(f)
+    columns = compile_table(eligibility_json)
+    out_path = out_path or table_path(json_path)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **columns)
+    os.replace(tmp_path, out_path)
+    return EligibilityTable(columns)
+
+
+def load_table(json_path):
+    """Load the npz (recompiling first if it is missing or older than the JSON)"""
+    path = table_path(json_path)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(json_path):
+        return save_table(json_path, path)
+    with np.load(path) as npz:
+        return EligibilityTable({name: npz[name] for name in npz.files})
+
+
+class EligibilityTable:
+    """Typed eligibility columns, one row per scheme, with vectorised pre-filtering"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.scheme_names = columns["scheme_names"]
+        self.row_of = {name: i for i, name in enumerate(self.scheme_names.tolist())}
+        self.key_vocab = columns["key_vocab"].tolist()
+        self.state_vocab = columns["state_vocab"].tolist()
+        counts = np.diff(columns["state_indptr"])
+        self._state_rows = np.repeat(np.arange(len(self.scheme_names)), counts)
+
+    def __len__(self):
+        return len(self.scheme_names)
+
+    def pairs(self, scheme):
+        """Canonical (key, original key, value) triples for one scheme"""
+        i = self.row_of.get(scheme)
+        if i is None:
+            return []
+        start, end = self.columns["kv_indptr"][i], self.columns["kv_indptr"][i + 1]
+        return [(self.key_vocab[k], raw, value) for k, raw, value in zip(
+            self.columns["kv_keys"][start:end].tolist(),
+            self.columns["kv_raw_keys"][start:end].tolist(),
+            self.columns["kv_values"][start:end].tolist())]
+
+    def schemes_in_state(self, state):
+        """Schemes restricted to the given state/UT"""
+        if state not in self.state_vocab:
+            return []
+        rows = self._state_rows[self.columns["state_codes"] == self.state_vocab.index(state)]
+        return self.scheme_names[rows].tolist()
+
+    def possibly_eligible(self, profile):
+        """
+        Boolean row mask. A scheme is excluded only when a typed field rules the
+        profile out beyond doubt (age outside the range, income above the
+        ceiling, wrong gender, another state, strictly reserved category);
+        anything unparsed or unknown keeps the scheme for the LLM to judge.
+        """
+        c = self.columns
+        keep = np.ones(len(self), dtype=bool)
+
+        age = parse_number(profile.get("age"))
+        if age is not None:
+            keep &= ~(c["age_min"] > age) & ~(c["age_max"] < age)
+
+        income = parse_number(profile.get("income"))
+        if income is not None:
+            keep &= ~(c["income_max"] < income)
+
+        gender = str(profile.get("gender") or "").lower()
+        if gender == "male":
+            keep &= c["gender"] != GENDER_FEMALE
+        elif gender == "female":
+            keep &= c["gender"] != GENDER_MALE
+
+        nationality = str(profile.get("nationality") or "").strip().lower()
+        if nationality and nationality != "indian":
+            keep &= ~c["indian_only"]
+
+        states = parse_states(str(profile.get("state") or ""))
+        if len(states) == 1:
+            restricted = np.diff(c["state_indptr"]) > 0
+            in_state = np.zeros(len(self), dtype=bool)
+            in_state[self._state_rows[c["state_codes"] == states[0]]] = True
+            keep &= ~restricted | in_state
+
+        client_mask = parse_categories(str(profile.get("caste") or ""))
+        if client_mask or re.search(r"\bgeneral\b", str(profile.get("caste") or "").lower()):
+            keep &= (c["category_mask"] == 0) | ((c["category_mask"] & client_mask) != 0)
+
+        return keep
+
+    def prefilter(self, profile, schemes):
+        """Subset of `schemes` (order kept) that the typed fields do not rule out"""
+        keep = self.possibly_eligible(profile)
+        return [s for s in schemes if s not in self.row_of or keep[self.row_of[s]]]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile eligibility JSON into the typed npz table")
+    parser.add_argument("eligibility_json", nargs="?", default="eligibility_summary-2.json")
+    args = parser.parse_args()
+
+    table = save_table(args.eligibility_json)
+    print(f"✅ {len(table)} schemes compiled to {table_path(args.eligibility_json)}")
@@ -0,0 +1,295 @@
+"""
+Fake LLM backend for load, regression and chaos testing (no network, no keys).
+
+    python fake_llm.py --port 8799 --latency lognormal:0.8:0.5 --error-rate 0.05
+
+In process, FakeLLM is a drop-in for the LangChain chat models (.invoke(prompt)
+returns an object with .content and .usage_metadata). The app and the API
+server use it for the "fake" LLM choice:
+
+    SAHAYAK_FAKE_LLM=1                          offer "fake" in the app's LLM menu
+    SAHAYAK_FAKE_LLM_LATENCY=lognormal:0.8:0.5  latency spec (see latency.parse_latency)
+    SAHAYAK_FAKE_LLM_ERROR_RATE=0.05            fraction of calls that raise
+    SAHAYAK_FAKE_LLM_STALL_RATE=0.01            fraction of calls that hang
+    SAHAYAK_FAKE_LLM_SEED=42                    reproducible latency/error draws
+    SAHAYAK_FAKE_LLM_URL=http://127.0.0.1:8799  use a running server instead
+
+As a server it exposes an OpenAI-compatible POST /v1/chat/completions, so the
+Groq/OpenAI SDKs (e.g. eligibility_extract with base_url) can be pointed at it.
+
+Verdicts are deterministic: the scheme is recognised from the "Scheme Name:"
+line of the eligibility prompt (or, failing that, from criteria text unique
+to one scheme) and the applicant is judged with the compiled eligibility
+table (the same typed rules as the pre-filter), so the same profile always
+gets the same answer regardless of latency or error settings.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eligibility_schema import load_table
+from latency import parse_latency
+from token_accounting import estimate_tokens
+
+
+# =========================
+# CONFIG
+# =========================
+ELIGIBILITY_JSON_PATH = "eligibility_summary-2.json"
+DEFAULT_LATENCY = "lognormal:0.8:0.5"
+DEFAULT_PORT = 8799
+MODEL_NAME = "sahayak-fake-llm"
+
+
+class FakeLLMError(RuntimeError):
+    """Injected failure (stands in for a provider 5xx / rate-limit error)"""
+
+
+# =========================
+# PROMPT PARSING
+# =========================
+_ELIGIBILITY_RE = re.compile(
+    r"Person Profile:\s*(?P<person>.*?)\s*Scheme Eligibility Requirements:\s*(?P<criteria>.*?)\s*Answer:\s*$",
+    re.DOTALL)
+_SCHEME_NAME_RE = re.compile(r"^\s*Scheme Name:[ \t]*(?P<scheme>[^\n]*?)\s*$", re.MULTILINE)
+_SUMMARY_RE = re.compile(r"^Summarize the (?P<scheme>.*?) scheme in simple language:\s*(?P<context>.*)$", re.DOTALL)
+_EXTRACTION_RE = re.compile(r'Summarize the following eligibility criteria for the scheme "(?P<scheme>.*?)"'
+                            r'.*?Eligibility criteria:\s*(?P<points>.*?)\s*Now output only JSON', re.DOTALL)
+
+
+def criteria_text(criteria):
+    """Same join as scheme_matcher.eligibility_prompt, used to recognise the scheme in prompts without its name"""
+    return ". ".join([f"{k}: {v}" for k, v in criteria.items()])
+
+
+def parse_person(person):
+    """Profile dict back from scheme_matcher.profile_text"""
+    profile = {}
+    match = re.search(r"is a (\d+)-year-old (\w+) (\w*) ?citizen", person)
+    if match:
+        profile["age"] = int(match.group(1))
+        profile["gender"] = match.group(2)
+        profile["nationality"] = match.group(3)
+    match = re.search(r"belong to the (.*?) category", person)
+    if match:
+        profile["caste"] = match.group(1)
+    match = re.search(r"annual income is ([\d.]+) rupees", person)
+    if match:
+        profile["income"] = float(match.group(1))
+    return profile
+
+
+# =========================
+# FAKE MODEL
+# =========================
+class FakeResponse:
+    """Shape of a LangChain AIMessage as far as the app uses it"""
+
+    def __init__(self, content, prompt):
+        self.content = content
+        input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(content)
+        self.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                               "total_tokens": input_tokens + output_tokens}
+
+
+class FakeLLM:
+    """
+    In-process fake chat model. latency/error_rate/stall_rate shape *when* and
+    *whether* a call returns; the content only depends on the prompt.
+    """
+
+    def __init__(self, eligibility_json_path=ELIGIBILITY_JSON_PATH, latency=DEFAULT_LATENCY, error_rate=0.0,
+                 stall_rate=0.0, stall_seconds=120.0, seed=None):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+        with open(eligibility_json_path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        # Several schemes can share a criteria text, so it only identifies a scheme if it maps to one name
+        self._schemes_by_criteria = {}
+        for e in entries:
+            if e.get("eligibility"):
+                names = self._schemes_by_criteria.setdefault(criteria_text(e["eligibility"]).strip(), [])
+                if e["scheme_name"] not in names:
+                    names.append(e["scheme_name"])
+        self.table = load_table(eligibility_json_path)
+
+    def _draw(self):
+        with self._lock:
+            self.calls += 1
+            return self.sample_latency(self._rng), self._rng.random(), self._rng.random()
+
+    def invoke(self, prompt):
+        prompt = getattr(prompt, "content", prompt)
+        latency, stall_draw, error_draw = self._draw()
+        if stall_draw < self.stall_rate:
+            time.sleep(self.stall_seconds)
+        time.sleep(latency)
+        if error_draw < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            raise FakeLLMError("injected fake LLM failure")
+        return FakeResponse(self.reply(prompt), prompt)
+
+    def reply(self, prompt):
+        """Deterministic answer text for a prompt"""
+        match = _ELIGIBILITY_RE.search(prompt)
+        if match:
+            name = _SCHEME_NAME_RE.search(prompt[:match.start()])
+            return self._eligibility_reply(match.group("person"), match.group("criteria"),
+                                           name.group("scheme") if name else None)
+        match = _SUMMARY_RE.search(prompt.strip())
+        if match:
+            return self._summary_reply(match.group("scheme"), match.group("context"))
+        match = _EXTRACTION_RE.search(prompt)
+        if match:
+            points = [p[2:].strip() for p in match.group("points").splitlines() if p.startswith("- ")]
+            return json.dumps({f"Criterion_{i}": p[:60] for i, p in enumerate(points, 1)}, ensure_ascii=False)
+        return "This is a fake LLM response."
+
+    def _eligibility_reply(self, person, criteria, scheme=None):
+        if scheme is None:
+            names = self._schemes_by_criteria.get(criteria.strip(), [])
+            scheme = names[0] if len(names) == 1 else None
+        profile = parse_person(person)
+        row = self.table.row_of.get(scheme) if scheme else None
+        if row is None:
+            # Not in the compiled table: nothing rules the person out
+            return "The scheme's criteria could not be checked against the rules table.\nEligible: Yes"
+        if self.table.possibly_eligible(profile)[row]:
+            return f"The profile meets the typed requirements of {scheme}.\nEligible: Yes"
+        return f"The profile falls outside the age, income, gender or category limits of {scheme}.\nEligible: No"
+
+    def _summary_reply(self, scheme, context):
+        sentences = re.split(r"(?<=[.!?])\s+", context.strip())
+        body = " ".join(sentences[:3]) if context.strip() else "No details were found."
+        return f"{scheme} in brief: {body}"
+
+    def stats(self):
+        return {"calls": self.calls, "errors": self.errors}
+
+
+class FakeLLMClient:
+    """.invoke() against a running fake_llm server (tests the HTTP hop too)"""
+
+    def __init__(self, url, timeout=300.0):
+        self.url = url.rstrip("/") + "/v1/chat/completions"
+        self.timeout = timeout
+
+    def invoke(self, prompt):
+        prompt = getattr(prompt, "content", prompt)
+        body = json.dumps({"model": MODEL_NAME, "messages": [{"role": "user", "content": prompt}]}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise FakeLLMError(f"fake LLM server returned {e.code}")
+        return FakeResponse(payload["choices"][0]["message"]["content"], prompt)
+
+
+def make_fake_llm():
+    """Fake model configured from the SAHAYAK_FAKE_LLM_* environment variables"""
+    url = os.getenv("SAHAYAK_FAKE_LLM_URL")
+    if url:
+        return FakeLLMClient(url)
+    seed = os.getenv("SAHAYAK_FAKE_LLM_SEED")
+    return FakeLLM(
+        latency=os.getenv("SAHAYAK_FAKE_LLM_LATENCY", DEFAULT_LATENCY),
+        error_rate=float(os.getenv("SAHAYAK_FAKE_LLM_ERROR_RATE", "0")),
+        stall_rate=float(os.getenv("SAHAYAK_FAKE_LLM_STALL_RATE", "0")),
+        seed=int(seed) if seed else None,
+    )
+
+
+# =========================
+# HTTP SERVER
+# =========================
+def make_handler(llm):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/healthz":
+                self._send(200, {"status": "ok", **llm.stats()})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/v1/chat/completions", "/openai/v1/chat/completions"):
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+            except ValueError:
+                self._send(400, {"error": "request body must be JSON"})
+                return
+            try:
+                response = llm.invoke(prompt)
+            except FakeLLMError as e:
+                self._send(503, {"error": {"message": str(e), "type": "fake_error"}})
+                return
+            usage = response.usage_metadata
+            self._send(200, {
+                "id": f"fake-{llm.calls}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", MODEL_NAME),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": response.content},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": usage["input_tokens"], "completion_tokens": usage["output_tokens"],
+                          "total_tokens": usage["total_tokens"]},
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(llm, host="127.0.0.1", port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), make_handler(llm))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the fake LLM as an OpenAI-compatible HTTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--eligibility", default=ELIGIBILITY_JSON_PATH)
+    parser.add_argument("--latency", default=DEFAULT_LATENCY)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    fake = FakeLLM(args.eligibility, latency=args.latency, error_rate=args.error_rate,
+                   stall_rate=args.stall_rate, seed=args.seed)
+    server = serve(fake, args.host, args.port)
+    print(f"🤖 Fake LLM on http://{args.host}:{args.port}/v1/chat/completions (latency {args.latency}, "
+          f"error rate {args.error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
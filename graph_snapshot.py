@@ -0,0 +1,282 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+
+# =========================
+# COMPACT GRAPH SNAPSHOT
+# =========================
+# On-disk layout (one directory):
+#   meta.json            type table + counts
+#   strings.bin          UTF-8 node names, concatenated (interned: one copy each)
+#   string_offsets.npy   int64[n + 1] byte offsets into strings.bin
+#   name_order.npy       int32[n] node ids sorted by name (binary-search lookup)
+#   node_type.npy        uint8[n] type code per node
+#   out_indptr.npy / out_indices.npy / out_edge_type.npy   forward CSR
+#   in_indptr.npy  / in_indices.npy  / in_edge_type.npy    reverse CSR
+# Every array is loaded with mmap, so opening a snapshot costs a few syscalls
+# and pages are only read when a query touches them.
+SNAPSHOT_DIR = "kg_snapshot"
+SCHEME_TYPE = "scheme"
+ARRAYS = ("string_offsets", "name_order", "node_type",
+          "out_indptr", "out_indices", "out_edge_type",
+          "in_indptr", "in_indices", "in_edge_type")
+
+
+def _csr(num_nodes, src, dst, etype):
+    """CSR adjacency (indptr, indices, edge types) grouped by src"""
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32), etype[order].astype(np.uint8)
+
+
+class GraphSnapshot:
+    """
+    Array-backed scheme → attribute graph with the networkx queries the
+    retrieval code uses: nodes(data=True), successors, predecessors and
+    per-node type. Node names are interned in a single string table.
+    """
+
+    def __init__(self, types, strings, string_offsets, name_order, node_type,
+                 out_indptr, out_indices, out_edge_type, in_indptr, in_indices, in_edge_type):
+        self.types = list(types)
+        self.strings = strings
+        self.string_offsets = string_offsets
+        self.name_order = name_order
+        self.node_type = node_type
+        self.out_indptr, self.out_indices, self.out_edge_type = out_indptr, out_indices, out_edge_type
+        self.in_indptr, self.in_indices, self.in_edge_type = in_indptr, in_indices, in_edge_type
+
+    # ---------- construction ----------
+    @classmethod
+    def from_edges(cls, names, node_types, edges):
+        """
+        Build from parallel lists: names[i] / node_types[i] (type string) and
+        edges as (src_id, dst_id, relation) tuples. Non-scheme nodes that no
+        edge points at are dropped, so the table never accumulates garbage.
+        """
+        types = [SCHEME_TYPE] + sorted({t for t in node_types if t != SCHEME_TYPE} |
+                                       {rel for _, _, rel in edges})
+        type_code = {t: i for i, t in enumerate(types)}
+
+        referenced = {dst for _, dst, _ in edges}
+        keep = [i for i, t in enumerate(node_types) if t == SCHEME_TYPE or i in referenced]
+        remap = {old: new for new, old in enumerate(keep)}
+        names = [names[i] for i in keep]
+        codes = np.array([type_code[node_types[i]] for i in keep], dtype=np.uint8)
+
+        encoded = [n.encode("utf-8") for n in names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        strings = b"".join(encoded)
+        name_order = np.array(sorted(range(len(names)), key=lambda i: encoded[i]), dtype=np.int32)
+
+        src = np.array([remap[s] for s, _, _ in edges], dtype=np.int64)
+        dst = np.array([remap[d] for _, d, _ in edges], dtype=np.int64)
+        etype = np.array([type_code[r] for _, _, r in edges], dtype=np.uint8)
+        out_csr = _csr(len(names), src, dst, etype)
+        in_csr = _csr(len(names), dst, src, etype)
+        return cls(types, strings, offsets, name_order, codes, *out_csr, *in_csr)
+
+    @classmethod
+    def from_graph(cls, G):
+        """Snapshot a networkx DiGraph built by knowledge_graph.build_graph"""
+        ids = {}
+        names, node_types = [], []
+        for node, attrs in G.nodes(data=True):
+            ids[node] = len(names)
+            names.append(node)
+            node_types.append(attrs.get("type", SCHEME_TYPE))
+        edges = [(ids[u], ids[v], attrs.get("relation", node_types[ids[v]]))
+                 for u, v, attrs in G.edges(data=True)]
+        return cls.from_edges(names, node_types, edges)
+
+    # ---------- persistence ----------
+    def save(self, path=SNAPSHOT_DIR):
+        """Write the snapshot directory; the previous snapshot is swapped out atomically-ish"""
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        with open(os.path.join(tmp_path, "strings.bin"), "wb") as f:
+            f.write(bytes(self.strings))
+        for name in ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(getattr(self, name)))
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "types": self.types,
+                "num_nodes": self.number_of_nodes(),
+                "num_edges": self.number_of_edges()
+            }, f, ensure_ascii=False, indent=2)
+
+        old_path = f"{path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_DIR):
+        """Open a snapshot with every array memory-mapped"""
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        strings_path = os.path.join(path, "strings.bin")
+        if os.path.getsize(strings_path):
+            strings = np.memmap(strings_path, dtype=np.uint8, mode="r")
+        else:
+            strings = np.zeros(0, dtype=np.uint8)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        return cls(meta["types"], strings, **arrays)
+
+    # ---------- queries ----------
+    def number_of_nodes(self):
+        return len(self.node_type)
+
+    def number_of_edges(self):
+        return len(self.out_indices)
+
+    def name(self, node_id):
+        start, end = self.string_offsets[node_id], self.string_offsets[node_id + 1]
+        return bytes(self.strings[start:end]).decode("utf-8")
+
+    def node_id(self, name):
+        """Binary search over the name-sorted permutation; None if absent"""
+        target = name.encode("utf-8")
+        lo, hi = 0, len(self.name_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            node = int(self.name_order[mid])
+            start, end = self.string_offsets[node], self.string_offsets[node + 1]
+            if bytes(self.strings[start:end]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.name_order):
+            node = int(self.name_order[lo])
+            if self.name(node) == name:
+                return node
+        return None
+
+    def type_of(self, node_id):
+        return self.types[self.node_type[node_id]]
+
+    def successor_ids(self, node_id):
+        return self.out_indices[self.out_indptr[node_id]:self.out_indptr[node_id + 1]]
+
+    def predecessor_ids(self, node_id):
+        return self.in_indices[self.in_indptr[node_id]:self.in_indptr[node_id + 1]]
+
+    def successors(self, name):
+        node = self.node_id(name)
+        return [] if node is None else [self.name(int(i)) for i in self.successor_ids(node)]
+
+    def predecessors(self, name):
+        node = self.node_id(name)
+        return [] if node is None else [self.name(int(i)) for i in self.predecessor_ids(node)]
+
+    def nodes(self, data=False):
+        for node in range(self.number_of_nodes()):
+            name = self.name(node)
+            yield (name, {"type": self.type_of(node)}) if data else name
+
+    def scheme_ids(self):
+        return np.flatnonzero(np.asarray(self.node_type) == 0)
+
+    def edges(self):
+        """All edges as (src_id, dst_id, relation) tuples"""
+        src = np.repeat(np.arange(self.number_of_nodes()), np.diff(np.asarray(self.out_indptr)))
+        for s, d, t in zip(src.tolist(), np.asarray(self.out_indices).tolist(),
+                           np.asarray(self.out_edge_type).tolist()):
+            yield s, d, self.types[t]
+
+
+# =========================
+# INCREMENTAL REBUILD
+# =========================
+def scheme_edges(record):
+    """(attribute, relation) pairs for one formatted scheme, as build_graph creates them"""
+    pairs = []
+    for key, val in record.get("key_information", {}).items():
+        values = val if isinstance(val, list) else [val] if isinstance(val, str) else []
+        for v in values:
+            node_name = v.strip()
+            if node_name:
+                pairs.append((node_name, key))
+    return pairs
+
+
+def apply_scheme_updates(snapshot, records, removed_schemes=()):
+    """
+    Return a new snapshot with the given schemes replaced. Edges of untouched
+    schemes are copied straight from the existing arrays; only the changed
+    records are re-parsed. `records` are formatted scheme dicts (the change
+    feed's 'record' values); `removed_schemes` are names to drop entirely.
+
+    Applied to an empty snapshot this yields the same graph as
+    from_graph(build_graph(records)): records sharing a scheme name merge
+    into one node, and a repeated (scheme, attribute) edge is kept once with
+    the last relation, as networkx add_edge does.
+    """
+    kbs = [r["knowledge_base_entry"] for r in records]
+    changed = {kb.get("scheme", "Unknown") for kb in kbs}
+    dropped = set(removed_schemes) | changed
+
+    names = [snapshot.name(i) for i in range(snapshot.number_of_nodes())]
+    node_types = [snapshot.type_of(i) for i in range(snapshot.number_of_nodes())]
+    ids = {name: i for i, name in enumerate(names)}
+    dropped_ids = {ids[n] for n in dropped if n in ids}
+    # (src, dst) -> relation; dict assignment gives add_edge's "last relation wins"
+    edges = {(src, dst): rel for src, dst, rel in snapshot.edges() if src not in dropped_ids}
+
+    def intern(name, node_type):
+        if name not in ids:
+            ids[name] = len(names)
+            names.append(name)
+            node_types.append(node_type)
+        else:
+            # Same rule as networkx add_node: the latest type wins
+            node_types[ids[name]] = node_type
+        return ids[name]
+
+    for scheme in removed_schemes:
+        if scheme in ids and scheme not in changed:
+            # Demote so from_edges drops it with the other unreferenced nodes
+            node_types[ids[scheme]] = "removed"
+    # In record order, like build_graph, so node types resolve the same way
+    for kb in kbs:
+        scheme_id = intern(kb.get("scheme", "Unknown"), SCHEME_TYPE)
+        for attribute, relation in scheme_edges(kb):
+            edges[(scheme_id, intern(attribute, relation))] = relation
+
+    return GraphSnapshot.from_edges(names, node_types, [(src, dst, rel) for (src, dst), rel in edges.items()])
+
+
+def update_snapshot(path, records, removed_schemes=()):
+    """Apply scheme updates to the snapshot at `path` (building a fresh one if absent)"""
+    if os.path.exists(os.path.join(path, "meta.json")):
+        snapshot = GraphSnapshot.load(path)
+    else:
+        snapshot = GraphSnapshot.from_edges([], [], [])
+    updated = apply_scheme_updates(snapshot, records, removed_schemes)
+    updated.save(path)
+    return updated
+
+
+if __name__ == "__main__":
+    import argparse
+    from knowledge_graph import build_graph
+
+    parser = argparse.ArgumentParser(description="Compile schemes.json into a knowledge graph snapshot")
+    parser.add_argument("schemes_json", nargs="?", default="schemes.json")
+    parser.add_argument("--out", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    with open(args.schemes_json, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    snapshot = GraphSnapshot.from_graph(build_graph(data))
+    snapshot.save(args.out)
+    print(f"🕸 Saved snapshot with {snapshot.number_of_nodes()} nodes and "
+          f"{snapshot.number_of_edges()} edges to {args.out}")
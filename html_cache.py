@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import os
+from datetime import datetime
+
+from scrape_output import JsonlStreamWriter, iter_jsonl
+
+
+# =========================
+# CONTENT-ADDRESSED HTML CACHE
+# =========================
+class HtmlCache:
+    """
+    Raw-HTML store for fetched scheme pages.
+
+    Page bodies are stored once per distinct content (sha256 of the HTML),
+    gzip-compressed under objects/<2-char prefix>/<sha>.html.gz. An append-only
+    index.jsonl maps (url, fetched_at) to the content hash, so every fetch is
+    recorded while identical re-fetches cost no extra disk.
+    """
+
+    def __init__(self, cache_dir="html_cache"):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_path = os.path.join(cache_dir, "index.jsonl")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    def _object_path(self, sha):
+        return os.path.join(self.objects_dir, sha[:2], f"{sha}.html.gz")
+
+    def put(self, url, html, fetched_at=None):
+        """Store a fetched page and record it in the index; returns the index entry"""
+        raw = html.encode("utf-8")
+        sha = hashlib.sha256(raw).hexdigest()
+        path = self._object_path(sha)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp name first so a crash never leaves a truncated object
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(gzip.compress(raw, compresslevel=6))
+            os.replace(tmp_path, path)
+
+        entry = {
+            'url': url,
+            'fetched_at': fetched_at or datetime.now().isoformat(),
+            'sha256': sha,
+            'size': len(raw)
+        }
+        with JsonlStreamWriter(self.index_path) as index:
+            index.write(entry)
+        return entry
+
+    def get(self, sha):
+        """Return the cached HTML for a content hash, or None if it is missing"""
+        path = self._object_path(sha)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+
+    def entries(self):
+        """Yield every recorded fetch, oldest first"""
+        return iter_jsonl(self.index_path)
+
+    def latest_entries(self):
+        """Return the most recent fetch of each URL"""
+        latest = {}
+        for entry in self.entries():
+            current = latest.get(entry['url'])
+            if current is None or entry['fetched_at'] >= current['fetched_at']:
+                latest[entry['url']] = entry
+        return list(latest.values())
+
+    def latest_for(self, url):
+        """Return the most recent fetch of a single URL, or None"""
+        found = None
+        for entry in self.entries():
+            if entry['url'] == url and (found is None or entry['fetched_at'] >= found['fetched_at']):
+                found = entry
+        return found
@@ -0,0 +1,67 @@
+import re
+
+
+# =========================
+# OCR + Aadhaar auto-fill helpers
+# =========================
+# Shared by the Streamlit app, the field-targeted OCR path and batch intake so
+# every entry point classifies and extracts documents identically.
+AADHAAR_NUMBER_RE = re.compile(r"\b\d{4}\s\d{4}\s\d{4}\b")
+PAN_NUMBER_RE = re.compile(r"[A-Z]{5}[0-9]{4}[A-Z]{1}")
+DL_NUMBER_RE = re.compile(r"\bDL[-\s]*\d+")
+DOB_RE = re.compile(r"\b\d{2}[/-]\d{2}[/-]\d{4}\b")
+NAME_RE = re.compile(r"[A-Z][a-z]+(?:\s[A-Z][a-z]+)+")
+
+
+def detect_document_type(text):
+    """Detect document type from OCR text"""
+    t = text.upper()
+    if AADHAAR_NUMBER_RE.search(t) or "AADHAAR" in t or "UNIQUE IDENTIFICATION" in t:
+        return "Aadhaar"
+    if PAN_NUMBER_RE.search(t) or "INCOME TAX" in t or "PERMANENT ACCOUNT NUMBER" in t:
+        return "PAN"
+    if DL_NUMBER_RE.search(t) or "DRIVING LICENCE" in t or "TRANSPORT" in t:
+        return "Driving License"
+    return "Unknown"
+
+
+def parse_gender(text):
+    """Gender from OCR text; FEMALE is checked first because it contains MALE"""
+    t = text.upper()
+    if "FEMALE" in t:
+        return "female"
+    if "MALE" in t:
+        return "male"
+    return None
+
+
+def extract_aadhaar_details(text):
+    """Extract personal details from Aadhaar card text"""
+    details = {"name": None, "dob": None, "gender": None, "aadhaar_number": None}
+    # Aadhaar number pattern
+    match = AADHAAR_NUMBER_RE.search(text)
+    if match:
+        details["aadhaar_number"] = match.group(0).replace(" ", "")
+    # DOB patterns (dd/mm/yyyy or dd-mm-yyyy)
+    dob = DOB_RE.search(text)
+    if dob:
+        details["dob"] = dob.group(0)
+    # Gender
+    details["gender"] = parse_gender(text)
+    # Name (heuristic: two capitalized words)
+    name = NAME_RE.search(text)
+    if name:
+        details["name"] = name.group(0)
+    return details
+
+
+def complete_ocr_result(result):
+    """
+    Fill in doc_type and fields on an OCR result the same way for every entry
+    point (UI, batch intake), so results match whichever path produced them.
+    """
+    if not result.get("doc_type"):
+        result["doc_type"] = detect_document_type(result["text"])
+    if not result.get("fields") and result["doc_type"] == "Aadhaar":
+        result["fields"] = extract_aadhaar_details(result["text"])
+    return result
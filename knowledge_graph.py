@@ -0,0 +1,210 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+import networkx as nx
+
+
+# =========================
+# BUILD KNOWLEDGE GRAPH
+# =========================
+def build_graph(data):
+    """Scheme → attribute DiGraph: one node per eligibility/benefit/document/step string"""
+    G = nx.DiGraph()
+
+    for entry in data:
+        kb = entry["knowledge_base_entry"]
+        scheme = kb.get("scheme", "Unknown")
+        G.add_node(scheme, type="scheme")
+
+        key_info = kb.get("key_information", {})
+        for key, val in key_info.items():
+            if isinstance(val, list):
+                for v in val:
+                    node_name = v.strip()
+                    if node_name:
+                        G.add_node(node_name, type=key)
+                        G.add_edge(scheme, node_name, relation=key)
+            elif isinstance(val, str):
+                node_name = val.strip()
+                if node_name:
+                    G.add_node(node_name, type=key)
+                    G.add_edge(scheme, node_name, relation=key)
+
+    return G
+
+
+# =========================
+# TERM NORMALIZATION
+# =========================
+STOPWORDS = {
+    "a", "an", "the", "i", "am", "is", "are", "was", "be", "of", "for", "and", "or", "to", "in",
+    "on", "at", "by", "as", "my", "me", "we", "our", "you", "your", "it", "its", "this", "that",
+    "with", "from", "need", "want", "help", "should", "can", "will", "have", "has", "who", "which",
+    "any", "all", "not", "no", "do", "does", "so", "if", "under", "per", "etc",
+}
+MIN_PREFIX_LEN = 4
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_terms(text):
+    """
+    Lowercase, drop dots inside abbreviations (B.Tech → btech, Rs. → rs) and
+    split on everything else; stopwords are removed.
+    """
+    return [t for t in _TOKEN_RE.findall(text.lower().replace(".", "")) if t not in STOPWORDS]
+
+
+# =========================
+# INVERTED ATTRIBUTE INDEX
+# =========================
+class AttributeIndex:
+    """
+    Token-level inverted index: term → attribute nodes → schemes.
+
+    Built once alongside the graph. A query costs one dict lookup per query
+    term (plus a bisect over the sorted vocabulary for prefix matches such as
+    "scholar" → "scholarship"), independent of the number of graph nodes.
+    """
+
+    def __init__(self):
+        self.schemes = []            # scheme id -> name
+        self.attributes = []         # attribute id -> node name
+        self.attribute_types = []    # attribute id -> relation (eligibility_criteria, benefits, ...)
+        self.attribute_schemes = []  # attribute id -> tuple of scheme ids
+        self.postings = {}           # term -> tuple of attribute ids
+        self.vocabulary = []         # sorted terms, for prefix lookups
+
+    @classmethod
+    def from_graph(cls, G):
+        if hasattr(G, "in_indptr"):
+            return cls._from_snapshot(G)
+        index = cls()
+        scheme_ids = {}
+        for node, attrs in G.nodes(data=True):
+            if attrs.get("type") == "scheme":
+                scheme_ids[node] = len(index.schemes)
+                index.schemes.append(node)
+
+        postings = defaultdict(set)
+        for node, attrs in G.nodes(data=True):
+            schemes = tuple(sorted(
+                scheme_ids[pred] for pred in G.predecessors(node) if pred in scheme_ids
+            ))
+            if not schemes:
+                continue
+            attribute_id = len(index.attributes)
+            index.attributes.append(node)
+            index.attribute_types.append(attrs.get("type"))
+            index.attribute_schemes.append(schemes)
+            for term in set(normalize_terms(node)):
+                postings[term].add(attribute_id)
+
+        index.postings = {term: tuple(sorted(ids)) for term, ids in postings.items()}
+        index.vocabulary = sorted(index.postings)
+        return index
+
+    @classmethod
+    def _from_snapshot(cls, snapshot):
+        """
+        Same index as from_graph, built in one pass over a GraphSnapshot's
+        reverse CSR with integer ids; each node name is decoded once, and
+        only for schemes and attributes that make it into the index.
+        """
+        index = cls()
+        strings = bytes(snapshot.strings)
+        offsets = snapshot.string_offsets.tolist()
+        node_type = snapshot.node_type.tolist()
+        in_indptr = snapshot.in_indptr.tolist()
+        in_indices = snapshot.in_indices.tolist()
+
+        def name(node):
+            return strings[offsets[node]:offsets[node + 1]].decode("utf-8")
+
+        scheme_ids = {}
+        for node, code in enumerate(node_type):
+            if code == 0:
+                scheme_ids[node] = len(index.schemes)
+                index.schemes.append(name(node))
+
+        postings = defaultdict(set)
+        for node, code in enumerate(node_type):
+            start, end = in_indptr[node], in_indptr[node + 1]
+            if start == end:
+                continue
+            schemes = tuple(sorted(
+                scheme_ids[pred] for pred in in_indices[start:end] if pred in scheme_ids
+            ))
+            if not schemes:
+                continue
+            attribute = name(node)
+            attribute_id = len(index.attributes)
+            index.attributes.append(attribute)
+            index.attribute_types.append(snapshot.types[code])
+            index.attribute_schemes.append(schemes)
+            for term in set(normalize_terms(attribute)):
+                postings[term].add(attribute_id)
+
+        index.postings = {term: tuple(sorted(ids)) for term, ids in postings.items()}
+        index.vocabulary = sorted(index.postings)
+        return index
+
+    def _expand(self, term):
+        """The term itself plus, for longer terms, every vocabulary term it prefixes"""
+        if len(term) < MIN_PREFIX_LEN:
+            return [term] if term in self.postings else []
+        matches = []
+        i = bisect_left(self.vocabulary, term)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            matches.append(self.vocabulary[i])
+            i += 1
+        return matches
+
+    def matching_attributes(self, query):
+        """Attribute ids matching any query term"""
+        matched = set()
+        for term in set(normalize_terms(query)):
+            for expanded in self._expand(term):
+                matched.update(self.postings[expanded])
+        return matched
+
+    def rank_schemes(self, query, top_k=None):
+        """[(scheme, matched_attribute_count)] ordered by matches, most first"""
+        counts = defaultdict(int)
+        for attribute_id in self.matching_attributes(query):
+            for scheme_id in self.attribute_schemes[attribute_id]:
+                counts[scheme_id] += 1
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], self.schemes[item[0]]))
+        if top_k:
+            ranked = ranked[:top_k]
+        return [(self.schemes[scheme_id], count) for scheme_id, count in ranked]
+
+
+def query_graph(index, query, top_k=None):
+    """Return schemes connected to attribute nodes matching the query, best match first"""
+    return [scheme for scheme, _ in index.rank_schemes(query, top_k)]
+
+
+# =========================
+# GRAPH-CONSTRAINED RETRIEVAL
+# =========================
+MAX_GRAPH_CANDIDATES = 25
+
+
+def graph_candidates(index, query, max_candidates=MAX_GRAPH_CANDIDATES):
+    """Best-matching scheme names for the query, capped so the vector filter stays selective"""
+    return query_graph(index, query, top_k=max_candidates)
+
+
+def graph_filtered_search(vectordb, query, candidates, k=10):
+    """
+    Vector search restricted to chunks whose `scheme` metadata is one of the
+    graph candidates (a Chroma metadata filter, applied inside the index), so
+    only those schemes' chunks are scored.
+    """
+    candidates = list(candidates)
+    if len(candidates) == 1:
+        where = {"scheme": candidates[0]}
+    else:
+        where = {"scheme": {"$in": candidates}}
+    return vectordb.similarity_search(query, k=k, filter=where)
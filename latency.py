@@ -0,0 +1,29 @@
+"""
+Latency specs shared by the offline stand-ins (fake_llm, mock_site): a short
+string such as "lognormal:0.8:0.5" turned into a sampler of delays in seconds.
+"""
+import math
+
+
+def parse_latency(spec):
+    """
+    Latency sampler from a spec string (seconds):
+      "0" / "none"              no delay
+      "fixed:0.2"               always 0.2
+      "uniform:0.1:0.5"         uniform between 0.1 and 0.5
+      "lognormal:0.8:0.5"       lognormal with median 0.8 and sigma 0.5 (long tail, like real APIs)
+    Returns a function rng -> seconds.
+    """
+    spec = str(spec or "0").strip().lower()
+    if spec in ("0", "none", ""):
+        return lambda rng: 0.0
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(":") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Bad latency spec: {spec!r}")
@@ -0,0 +1,249 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import tracing
+
+
+# =========================
+# CIRCUIT BREAKER
+# =========================
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures; while open the provider
+    is skipped. After reset_timeout seconds one trial request is let through
+    (half-open): success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+# =========================
+# PROVIDER
+# =========================
+class Provider:
+    """One LLM backend (anything with .invoke(prompt)) plus its breaker, concurrency cap and latency window"""
+
+    def __init__(self, name, llm, max_concurrency=8, breaker=None, latency_window=200):
+        self.name = name
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def record(self, latency, ok):
+        with self._lock:
+            self.calls += 1
+            if ok:
+                self._latencies.append(latency)
+            else:
+                self.failures += 1
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def p95(self, min_samples=20):
+        """95th percentile of recent successful latencies, or None until enough samples"""
+        with self._lock:
+            if len(self._latencies) < min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def stats(self):
+        p95 = self.p95()
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'hedges': self.hedges,
+            'wins': self.wins,
+            'breaker': self.breaker.state,
+            'p95_seconds': round(p95, 3) if p95 is not None else None,
+        }
+
+
+class NoProviderAvailable(RuntimeError):
+    """Every provider is failing, circuit-broken or saturated"""
+
+
+def _report_loser(future, provider_name, on_response):
+    if not future.cancelled() and future.exception() is None:
+        on_response(provider_name, future.result(), False)
+
+
+# =========================
+# ROUTER
+# =========================
+class LLMRouter:
+    """
+    Drop-in replacement for a LangChain chat model (.invoke(prompt)) that
+    spreads each call over several providers, in priority order:
+
+      - failover:  if the provider handling a call fails, the next provider
+                   is tried until one succeeds or none are left
+      - hedging:   if the call has not returned after the provider's p95
+                   latency (default_hedge_delay until enough samples), a
+                   duplicate goes to the next provider; first answer wins
+      - breakers:  providers with repeated failures are skipped for a while
+      - caps:      at most max_concurrency calls per provider; a saturated
+                   primary sheds load to the next provider
+
+    Losing hedged calls cannot be interrupted; their results are discarded,
+    but still reported to invoke()'s on_response callback (they cost tokens).
+    """
+
+    def __init__(self, providers, hedge=True, default_hedge_delay=8.0, min_hedge_delay=1.0, timeout=90.0):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.hedge = hedge
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=sum(p.max_concurrency for p in providers))
+
+    def _call(self, provider, prompt):
+        start = time.monotonic()
+        try:
+            with tracing.span("llm.provider", provider=provider.name):
+                result = provider.llm.invoke(prompt)
+        except Exception:
+            provider.record(time.monotonic() - start, ok=False)
+            raise
+        finally:
+            provider.slots.release()
+        provider.record(time.monotonic() - start, ok=True)
+        return result
+
+    def _launch(self, prompt, tried, pending, deadline, block):
+        """Start the call on the first untried provider that is healthy and has a free slot"""
+        candidates = [p for p in self.providers if p not in tried]
+        for provider in candidates:
+            if provider.slots.acquire(blocking=False):
+                if provider.breaker.allow():
+                    tried.append(provider)
+                    pending[tracing.submit(self._pool, self._call, provider, prompt)] = provider
+                    return provider
+                provider.slots.release()
+        if block:
+            # Everyone healthy is saturated: queue on the first healthy provider
+            for provider in candidates:
+                if provider.breaker.state == "open":
+                    continue
+                if not provider.slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                    return None
+                if provider.breaker.allow():
+                    tried.append(provider)
+                    pending[tracing.submit(self._pool, self._call, provider, prompt)] = provider
+                    return provider
+                provider.slots.release()
+        return None
+
+    def _hedge_delay(self, provider):
+        p95 = provider.p95()
+        return max(self.min_hedge_delay, p95 if p95 is not None else self.default_hedge_delay)
+
+    def invoke(self, prompt, on_response=None):
+        """
+        Answer from the first provider to succeed. on_response(provider_name,
+        response, won) is called for the winning response and, as they finish,
+        for every losing hedged call that also succeeded.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        tried, pending = [], {}
+        last_error = None
+        first = self._launch(prompt, tried, pending, deadline, block=True)
+        if first is None:
+            raise NoProviderAvailable("no LLM provider available (all failing or saturated)")
+        hedge_at = start + self._hedge_delay(first)
+        hedged = False
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                raise TimeoutError(f"LLM call did not finish within {self.timeout:.0f}s")
+            can_hedge = self.hedge and not hedged and len(tried) < len(self.providers)
+            wait_until = min(deadline, hedge_at) if can_hedge else deadline
+            done, _ = wait(pending, timeout=max(0.0, wait_until - now), return_when=FIRST_COMPLETED)
+
+            if not done:
+                if can_hedge and time.monotonic() >= hedge_at:
+                    hedged = True
+                    provider = self._launch(prompt, tried, pending, deadline, block=False)
+                    if provider is not None:
+                        provider.hedges += 1
+                        tracing.inc("llm_hedges_total", provider=provider.name)
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                provider.wins += 1
+                if on_response is not None:
+                    on_response(provider.name, result, True)
+                    for loser, loser_provider in pending.items():
+                        loser.add_done_callback(
+                            lambda f, name=loser_provider.name: _report_loser(f, name, on_response))
+                return result
+
+            if not pending:
+                # Failover: every call so far failed
+                if self._launch(prompt, tried, pending, deadline, block=True) is None:
+                    break
+
+        if last_error is not None:
+            raise last_error
+        raise NoProviderAvailable("no LLM provider available (all failing or saturated)")
+
+    def stats(self):
+        return {p.name: p.stats() for p in self.providers}
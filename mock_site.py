@@ -0,0 +1,232 @@
+"""
+Local stand-in for myscheme.gov.in, for crawler benchmarks and tests.
+
+    python mock_site.py --port 8900 --latency lognormal:0.3:0.5 --error-rate 0.02
+    python mock_site.py --html-cache html_cache      # serve previously fetched pages
+
+Serves:
+    /search?page=N     search results: 10 `h2#scheme-name-N` cards per page and
+                       the `ul.list-none > li.h-8.w-8` pagination the crawlers
+                       click through (current page marked bg-green-700, next
+                       arrow as an svg.ml-2, absent on the last page)
+    /schemes/<slug>    one scheme page, rendered from schemes.json (or the
+                       latest cached HTML with --html-cache)
+
+Every response waits for a latency drawn from the configured distribution
+(latency.parse_latency specs) and fails with 503 at the configured error
+rate, so rate limiting and retries behave as they do against the real site.
+"""
+import argparse
+import html
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from latency import parse_latency
+
+
+# =========================
+# CONFIG
+# =========================
+JSON_PATH = "schemes.json"
+PAGE_SIZE = 10
+DEFAULT_PORT = 8900
+
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "scheme"
+
+
+# =========================
+# PAGE RENDERING
+# =========================
+def render_scheme_page(kb, padding_kb=0):
+    """Scheme page with the headings/lists/meta tags parse_scheme_html looks for"""
+    name = html.escape(kb.get("scheme", "Unknown Scheme"))
+    summary = html.escape(kb.get("summary") or "")
+    sections = kb.get("all_extracted_sections") or {}
+    if not sections:
+        titles = {"eligibility_criteria": "Eligibility", "benefits": "Benefits",
+                  "required_documents": "Documents Required", "application_steps": "Application Process"}
+        sections = {titles.get(k, k): v for k, v in (kb.get("key_information") or {}).items()}
+
+    parts = [f"<section><h3>{html.escape(title)}</h3><ul>"
+             + "".join(f"<li>{html.escape(str(item))}</li>" for item in items)
+             + "</ul></section>"
+             for title, items in sections.items() if isinstance(items, list) and items]
+    contact = kb.get("contact") or {}
+    contact_text = " ".join(contact.get("emails", []) + contact.get("phones", []) + contact.get("websites", []))
+    # Real pages ship a large Next.js payload; padding reproduces that parse/transfer cost
+    padding = f"<script>/*{'x' * (padding_kb * 1024)}*/</script>" if padding_kb else ""
+    return (f"<!DOCTYPE html><html><head><title>{name}</title>"
+            f'<meta name="description" content="{summary}"></head><body>'
+            f'<main><h1>{name}</h1><div class="scheme-content-description"><p>{summary}</p></div>'
+            f"{''.join(parts)}<footer><p>Contact: {html.escape(contact_text)}</p></footer></main>"
+            f"{padding}</body></html>")
+
+
+def render_search_page(schemes, page, page_size=PAGE_SIZE):
+    """One page of search results plus the pagination bar"""
+    pages = max(1, math.ceil(len(schemes) / page_size))
+    page = min(max(1, page), pages)
+    start = (page - 1) * page_size
+    cards = "".join(
+        f'<div class="card"><h2 id="scheme-name-{i}"><a href="/schemes/{slug}">{html.escape(name)}</a></h2></div>'
+        for i, (slug, name) in enumerate(schemes[start:start + page_size], start + 1))
+
+    buttons = []
+    for number in range(max(1, page - 4), min(pages, page + 4) + 1):
+        active = " bg-green-700 text-white" if number == page else ""
+        buttons.append(f'<li class="h-8 w-8 rounded{active}" '
+                       f"onclick=\"location.href='/search?page={number}'\">{number}</li>")
+    if page < pages:
+        buttons.append(f'<li class="h-8 w-8 rounded" onclick="location.href=\'/search?page={page + 1}\'">'
+                       f'<svg class="ml-2" width="8" height="8"><path d="M0 0L8 4L0 8z"/></svg></li>')
+    return (f"<!DOCTYPE html><html><head><title>Search | myScheme</title></head><body>"
+            f'<div id="results">{cards}</div><ul class="list-none flex">{"".join(buttons)}</ul></body></html>')
+
+
+# =========================
+# SITE
+# =========================
+class MockSite:
+    """Threaded HTTP server over an in-memory set of scheme pages"""
+
+    def __init__(self, pages, latency="0", error_rate=0.0, page_size=PAGE_SIZE, seed=None):
+        # pages: {slug: (name, html)}
+        self.pages = pages
+        self.listing = [(slug, name) for slug, (name, _) in pages.items()]
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"search_pages": 0, "scheme_pages": 0, "errors": 0, "not_found": 0, "bad_requests": 0, "bytes": 0}
+        self.server = None
+        self.url = None
+
+    @classmethod
+    def from_json(cls, json_path=JSON_PATH, limit=None, padding_kb=0, **options):
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        pages = {}
+        for entry in data[:limit] if limit else data:
+            kb = entry.get("knowledge_base_entry") or {}
+            name = kb.get("scheme", "Unknown Scheme")
+            slug = slugify(name)
+            while slug in pages:
+                slug += "-x"
+            pages[slug] = (name, render_scheme_page(kb, padding_kb))
+        return cls(pages, **options)
+
+    @classmethod
+    def from_html_cache(cls, cache_dir, limit=None, **options):
+        """Latest cached HTML of every scheme page fetched by the real crawler"""
+        from html_cache import HtmlCache
+        cache = HtmlCache(cache_dir)
+        pages = {}
+        for entry in sorted(cache.latest_entries(), key=lambda e: e["url"])[:limit]:
+            page_html = cache.get(entry["sha256"])
+            if page_html is None:
+                continue
+            slug = urlparse(entry["url"]).path.rstrip("/").rsplit("/", 1)[-1] or "scheme"
+            match = re.search(r"<h1[^>]*>(.*?)</h1>", page_html, re.DOTALL)
+            name = re.sub(r"<[^>]+>", "", match.group(1)).strip() if match else slug
+            pages[slug] = (html.unescape(name), page_html)
+        return cls(pages, **options)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _draw(self):
+        with self._lock:
+            return self.sample_latency(self._rng), self._rng.random()
+
+    def handle(self, path):
+        """(status, html) for a request path, after the simulated latency"""
+        latency, error_draw = self._draw()
+        time.sleep(latency)
+        if error_draw < self.error_rate:
+            self._count("errors")
+            return 503, "<html><body>Service Unavailable</body></html>"
+        parsed = urlparse(path)
+        if parsed.path.rstrip("/") in ("", "/search"):
+            try:
+                page = int((parse_qs(parsed.query).get("page") or ["1"])[0])
+            except ValueError:
+                self._count("bad_requests")
+                return 400, "<html><body>Bad Request: page must be an integer</body></html>"
+            self._count("search_pages")
+            return 200, render_search_page(self.listing, page, self.page_size)
+        if parsed.path.startswith("/schemes/"):
+            entry = self.pages.get(parsed.path[len("/schemes/"):].rstrip("/"))
+            if entry is not None:
+                self._count("scheme_pages")
+                return 200, entry[1]
+        self._count("not_found")
+        return 404, "<html><body>Not Found</body></html>"
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serve from a daemon thread; port 0 picks a free port. Returns the base URL."""
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, body = site.handle(self.path)
+                data = body.encode("utf-8")
+                site._count("bytes", len(data))
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="mock-site", daemon=True).start()
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        return self.url
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local myscheme.gov.in fixture site")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--schemes", default=JSON_PATH)
+    parser.add_argument("--html-cache", default=None, help="serve cached crawler HTML instead of schemes.json")
+    parser.add_argument("--limit", type=int, default=None, help="number of schemes to serve")
+    parser.add_argument("--latency", default="0", help="per-request latency spec, e.g. lognormal:0.3:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--padding-kb", type=int, default=0, help="extra KB per scheme page (JS payload stand-in)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    options = {"latency": args.latency, "error_rate": args.error_rate, "seed": args.seed}
+    if args.html_cache:
+        site = MockSite.from_html_cache(args.html_cache, limit=args.limit, **options)
+    else:
+        site = MockSite.from_json(args.schemes, limit=args.limit, padding_kb=args.padding_kb, **options)
+    url = site.start(args.host, args.port)
+    print(f"🌐 Mock scheme site with {len(site.pages)} schemes on {url}/search")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        site.stop()
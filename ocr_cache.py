@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+DISK_TTL_SECONDS = 24 * 60 * 60  # cached results hold Aadhaar numbers, names and DOBs; keep them a day at most
+
+
+# =========================
+# OCR RESULT CACHE
+# =========================
+def make_key(image_bytes, config, job_name="run_ocr"):
+    """Cache key: hash of the image bytes plus the preprocessing config and OCR mode"""
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+    config_hash = hashlib.sha256(
+        json.dumps({"config": config, "job": job_name}, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+    return f"{image_hash}-{config_hash}"
+
+
+class OcrCache:
+    """
+    Two-tier cache of OCR results (raw text, detected type, extracted fields).
+
+    The hot tier is an in-process LRU bounded by max_memory_bytes. Every entry
+    is also written to spill_dir, itself bounded by max_disk_bytes (oldest
+    files pruned first), so results survive evictions and server restarts.
+
+    Results contain personal data, so the spill directory and files are
+    owner-only (0700/0600), and entries in both tiers expire disk_ttl_seconds
+    after the result was first written.
+    """
+
+    def __init__(self, spill_dir="ocr_cache", max_memory_bytes=32 * 1024 * 1024,
+                 max_disk_bytes=256 * 1024 * 1024, disk_ttl_seconds=DISK_TTL_SECONDS):
+        self.spill_dir = spill_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._puts = 0
+        if spill_dir:
+            os.makedirs(spill_dir, mode=0o700, exist_ok=True)
+            os.chmod(spill_dir, 0o700)
+            # Drop entries that expired while the process was down
+            self._prune_disk()
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.json")
+
+    def _expired(self, mtime, now=None):
+        return self.disk_ttl_seconds is not None and (now or time.time()) - mtime > self.disk_ttl_seconds
+
+    def _remember(self, key, payload, written_at):
+        """Insert into the memory tier and evict least-recently-used entries"""
+        if key in self._entries:
+            self._memory_bytes -= len(self._entries.pop(key)[1])
+        self._entries[key] = (written_at, payload)
+        self._memory_bytes += len(payload)
+        while self._memory_bytes > self.max_memory_bytes and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key):
+        """Return the cached result dict, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                self._memory_bytes -= len(self._entries.pop(key)[1])
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(entry[1])
+
+        if self.spill_dir:
+            path = self._spill_path(key)
+            try:
+                written_at = os.stat(path).st_mtime
+                if self._expired(written_at):
+                    os.remove(path)
+                    raise FileNotFoundError(path)
+                with open(path, "rb") as f:
+                    payload = f.read()
+                result = json.loads(payload)
+            except (OSError, ValueError):
+                result = None
+            if result is not None:
+                # Not touched: mtime is the write time the TTL counts from
+                with self._lock:
+                    self._remember(key, payload, written_at)
+                    self.disk_hits += 1
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._remember(key, payload, time.time())
+        if self.spill_dir:
+            path = self._spill_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            self._puts += 1
+            # Scanning the spill directory is O(files), so only prune periodically
+            if self._puts % 50 == 0:
+                self._prune_disk()
+
+    def _prune_disk(self):
+        """Remove expired spill files, then the oldest ones until under max_disk_bytes"""
+        files = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(self.spill_dir):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                if self._expired(stat.st_mtime, now):
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_disk_bytes:
+            return
+        for _, size, path in sorted(files):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'memory_bytes': self._memory_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.disk_hits) / lookups, 3) if lookups else None
+            }
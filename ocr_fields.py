@@ -0,0 +1,155 @@
+import io
+import re
+import time
+
+import pytesseract
+from PIL import Image
+
+from id_documents import (
+    detect_document_type, extract_aadhaar_details, parse_gender,
+    AADHAAR_NUMBER_RE, PAN_NUMBER_RE, DOB_RE, NAME_RE
+)
+from ocr_service import DEFAULT_PREPROCESS, preprocess_image, to_grayscale, downscale
+
+
+# =========================
+# CARD LAYOUTS
+# =========================
+# Field boxes are fractions of the card (x0, y0, x1, y1) for the standard
+# front-side layouts, assuming the card fills the photo after deskew.
+# psm 7 = single text line; whitelists stop tesseract from "reading" photo
+# texture as letters and make each crop cheap to recognise.
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz ."
+DIGITS = "0123456789"
+
+CARD_LAYOUTS = {
+    "Aadhaar": {
+        "name": {"box": (0.28, 0.22, 0.98, 0.38), "psm": 7, "whitelist": LETTERS},
+        "dob": {"box": (0.28, 0.36, 0.98, 0.50), "psm": 7, "whitelist": DIGITS + "/-:DOBYearofBirth "},
+        "gender": {"box": (0.28, 0.48, 0.98, 0.62), "psm": 7, "whitelist": "MALEFmalef/ "},
+        "aadhaar_number": {"box": (0.15, 0.72, 0.85, 0.90), "psm": 7, "whitelist": DIGITS + " "},
+    },
+    "PAN": {
+        "name": {"box": (0.02, 0.28, 0.72, 0.40), "psm": 7, "whitelist": LETTERS},
+        "dob": {"box": (0.02, 0.50, 0.60, 0.64), "psm": 7, "whitelist": DIGITS + "/-"},
+        "pan_number": {"box": (0.02, 0.64, 0.60, 0.80), "psm": 7,
+                       "whitelist": "ABCDEFGHIJKLMNOPQRSTUVWXYZ" + DIGITS},
+    },
+    "Driving License": {
+        "dl_number": {"box": (0.02, 0.14, 0.75, 0.28), "psm": 7,
+                      "whitelist": "ABCDEFGHIJKLMNOPQRSTUVWXYZ" + DIGITS + " -"},
+        "name": {"box": (0.25, 0.30, 0.98, 0.44), "psm": 7, "whitelist": LETTERS + ":"},
+        "dob": {"box": (0.25, 0.44, 0.98, 0.58), "psm": 7, "whitelist": DIGITS + "/-:DOB "},
+    },
+}
+
+# Validators turn a crop's raw text into a clean value (None if it doesn't look right)
+DL_FIELD_RE = re.compile(r"[A-Z]{2}[-\s]?\d{2}[-\s]?\d{4,11}")
+
+
+def _match(regex, transform=lambda s: s):
+    def validate(text):
+        m = regex.search(text)
+        return transform(m.group(0)) if m else None
+    return validate
+
+
+FIELD_VALIDATORS = {
+    "name": _match(NAME_RE),
+    "dob": _match(DOB_RE),
+    "gender": parse_gender,
+    "aadhaar_number": _match(AADHAAR_NUMBER_RE, lambda s: s.replace(" ", "")),
+    "pan_number": _match(PAN_NUMBER_RE),
+    "dl_number": _match(DL_FIELD_RE),
+}
+
+# Low-resolution pass used only to classify the document
+CLASSIFY_DPI = 120
+
+
+# =========================
+# FIELD OCR
+# =========================
+def crop_field(image, box, margin=0.01):
+    """Crop a fractional box (with a small margin) out of the card image"""
+    w, h = image.size
+    x0, y0, x1, y1 = box
+    return image.crop((
+        int(max(0.0, x0 - margin) * w), int(max(0.0, y0 - margin) * h),
+        int(min(1.0, x1 + margin) * w), int(min(1.0, y1 + margin) * h)
+    ))
+
+
+def ocr_field(image, spec):
+    config = f"--oem 1 --psm {spec['psm']}"
+    if spec.get("whitelist"):
+        config += f" -c tessedit_char_whitelist={spec['whitelist']!r}"
+    return pytesseract.image_to_string(image, config=config).strip()
+
+
+def run_field_ocr(image_bytes, config=None):
+    """
+    Worker entry point for field-targeted OCR. A fast low-resolution pass
+    classifies the document; then only the known field regions of that card
+    type are OCR'd at full resolution. Fields whose crop fails validation fall
+    back to the regex extraction over the classification text. Documents
+    with no known layout get the full-page, full-resolution OCR of run_ocr.
+    """
+    config = config or DEFAULT_PREPROCESS
+    timings = {}
+
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(image_bytes))
+    image.load()
+    original_size = image.size
+    timings["decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    gray = to_grayscale(image)
+    low_res = downscale(gray, CLASSIFY_DPI, config["document_width_in"])
+    text = pytesseract.image_to_string(low_res, config="--oem 1 --psm 11")
+    doc_type = detect_document_type(text)
+    timings["classify"] = time.perf_counter() - start
+
+    result = {
+        "text": text,
+        "doc_type": doc_type,
+        "fields": {},
+        "field_sources": {},
+        "timings": timings,
+        "original_size": original_size,
+        "processed_size": low_res.size
+    }
+    layout = CARD_LAYOUTS.get(doc_type)
+    card, stage_timings = preprocess_image(gray, config)
+    timings.update(stage_timings)
+    result["processed_size"] = card.size
+
+    if layout is None:
+        # Unknown or unrecognised document: the low-res classification text is too poor to return
+        start = time.perf_counter()
+        result["text"] = pytesseract.image_to_string(card, config=config.get("tesseract_config", ""))
+        result["doc_type"] = detect_document_type(result["text"])
+        timings["tesseract"] = time.perf_counter() - start
+        return result
+
+    # Regex extraction over the classification text is the fallback for each field
+    fallback = extract_aadhaar_details(text) if doc_type == "Aadhaar" else {}
+    if doc_type == "PAN":
+        fallback["pan_number"] = FIELD_VALIDATORS["pan_number"](text.upper())
+    elif doc_type == "Driving License":
+        fallback["dl_number"] = FIELD_VALIDATORS["dl_number"](text.upper())
+
+    start = time.perf_counter()
+    for field, spec in layout.items():
+        raw = ocr_field(crop_field(card, spec["box"]), spec)
+        value = FIELD_VALIDATORS[field](raw)
+        if value is not None:
+            result["fields"][field] = value
+            result["field_sources"][field] = "roi"
+        else:
+            result["fields"][field] = fallback.get(field)
+            result["field_sources"][field] = "fallback" if fallback.get(field) else None
+    timings["fields"] = time.perf_counter() - start
+
+    return result
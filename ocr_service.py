@@ -0,0 +1,230 @@
+import io
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytesseract
+from PIL import Image, ImageOps
+
+import tracing
+
+
+# =========================
+# CONFIG
+# =========================
+# ID cards (Aadhaar, PAN, DL) are ISO/IEC 7810 ID-1: 85.6 mm ≈ 3.37 in wide.
+# Downscaling to target_dpi over that width makes OCR cost depend on the
+# configured resolution instead of the camera's.
+DEFAULT_PREPROCESS = {
+    "target_dpi": 300,
+    "document_width_in": 3.37,
+    "deskew": True,
+    "max_skew_deg": 10,
+    "binarize": True,
+    "tesseract_config": "--oem 1 --psm 3",
+}
+
+
+def make_config(**overrides):
+    """Return a full preprocessing config with the given overrides applied"""
+    config = dict(DEFAULT_PREPROCESS)
+    config.update(overrides)
+    return config
+
+
+# =========================
+# PREPROCESSING PIPELINE
+# =========================
+def to_grayscale(image):
+    """Apply EXIF orientation (phone photos) and drop colour"""
+    return ImageOps.exif_transpose(image).convert("L")
+
+
+def downscale(image, target_dpi, document_width_in):
+    """Shrink so the document spans target_dpi pixels per inch; never upscales"""
+    target_width = int(target_dpi * document_width_in)
+    # Photos are usually landscape cards; normalise on the longer side
+    long_side = max(image.size)
+    if long_side <= target_width:
+        return image
+    scale = target_width / long_side
+    new_size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+    return image.resize(new_size, Image.LANCZOS)
+
+
+def otsu_threshold(image):
+    """Otsu's threshold from the 256-bin grayscale histogram"""
+    hist = image.histogram()[:256]
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = weight_bg = 0
+    best_t, best_var = 127, -1.0
+    for t in range(256):
+        weight_bg += hist[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * hist[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best_var:
+            best_var, best_t = between, t
+    return best_t
+
+
+def binarize(image):
+    threshold = otsu_threshold(image)
+    return image.point(lambda p: 255 if p > threshold else 0, mode="1").convert("L")
+
+
+def estimate_skew(image, max_skew_deg=10):
+    """
+    Projection-profile skew estimate on a small thumbnail: text lines give the
+    sharpest row-sum profile when they are horizontal.
+    """
+    thumb = image.copy()
+    thumb.thumbnail((400, 400))
+    threshold = otsu_threshold(thumb)
+    ink = thumb.point(lambda p: 255 if p <= threshold else 0)
+
+    def score(angle):
+        rotated = np.asarray(ink.rotate(angle, resample=Image.NEAREST, fillcolor=0), dtype=np.float32)
+        return float(np.var(rotated.sum(axis=1)))
+
+    coarse = max(range(-max_skew_deg, max_skew_deg + 1), key=score)
+    fine = [coarse + step / 4 for step in range(-4, 5)]
+    return max(fine, key=score)
+
+
+def deskew(image, max_skew_deg=10):
+    angle = estimate_skew(image, max_skew_deg)
+    if abs(angle) < 0.25:
+        return image
+    return image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+
+def preprocess_image(image, config=None):
+    """Run the preprocessing pipeline; returns (image, {stage: seconds})"""
+    config = config or DEFAULT_PREPROCESS
+    timings = {}
+
+    start = time.perf_counter()
+    image = to_grayscale(image)
+    timings["grayscale"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    image = downscale(image, config["target_dpi"], config["document_width_in"])
+    timings["downscale"] = time.perf_counter() - start
+
+    if config.get("deskew"):
+        start = time.perf_counter()
+        image = deskew(image, config["max_skew_deg"])
+        timings["deskew"] = time.perf_counter() - start
+
+    if config.get("binarize"):
+        start = time.perf_counter()
+        image = binarize(image)
+        timings["binarize"] = time.perf_counter() - start
+
+    return image, timings
+
+
+# =========================
+# WORKER PROCESS
+# =========================
+def _init_worker(tesseract_cmd):
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def run_ocr(image_bytes, config=None):
+    """Worker entry point: decode, preprocess and OCR one image"""
+    config = config or DEFAULT_PREPROCESS
+    timings = {}
+
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(image_bytes))
+    image.load()
+    original_size = image.size
+    timings["decode"] = time.perf_counter() - start
+
+    image, stage_timings = preprocess_image(image, config)
+    timings.update(stage_timings)
+
+    start = time.perf_counter()
+    text = pytesseract.image_to_string(image, config=config.get("tesseract_config", ""))
+    timings["tesseract"] = time.perf_counter() - start
+
+    return {
+        "text": text,
+        "timings": timings,
+        "original_size": original_size,
+        "processed_size": image.size
+    }
+
+
+# =========================
+# SERVICE
+# =========================
+class OcrBusyError(RuntimeError):
+    """Raised when the OCR queue is full"""
+
+
+class OcrService:
+    """
+    Bounded process pool for tesseract jobs. At most max_pending jobs may be
+    queued or running; further submissions wait up to queue_timeout seconds and
+    then raise OcrBusyError instead of piling up work.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, tesseract_cmd=None, config=None, queue_timeout=5):
+        self.config = config or make_config()
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(tesseract_cmd or pytesseract.pytesseract.tesseract_cmd,)
+        )
+
+    def submit(self, image_bytes, config=None, job=run_ocr):
+        """
+        Queue an OCR job; returns a Future resolving to the job's result dict.
+        `job` is a module-level worker function such as run_ocr (full page) or
+        ocr_fields.run_field_ocr (field-targeted).
+        """
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise OcrBusyError("OCR queue is full - try again shortly")
+        submitted = time.perf_counter()
+        future = self._pool.submit(job, image_bytes, config or self.config)
+        future.submitted_at = submitted
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def ocr(self, image_bytes, config=None, timeout=60, job=run_ocr):
+        """Run OCR off the calling thread and wait for the result (with total/queue timing)"""
+        with tracing.span("ocr", job=job.__name__):
+            future = self.submit(image_bytes, config, job)
+            result = future.result(timeout=timeout)
+        total = time.perf_counter() - future.submitted_at
+        result["timings"]["total"] = total
+        result["timings"]["queue_wait"] = max(0.0, total - sum(
+            v for k, v in result["timings"].items() if k not in ("total", "queue_wait")
+        ))
+        # Stages ran in the worker process; report them as already-measured spans
+        for stage, seconds in result["timings"].items():
+            if stage != "total":
+                tracing.record(f"ocr.{stage}", seconds)
+        return result
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def format_timings(timings):
+    """One-line stage breakdown for display, e.g. 'decode 12ms · tesseract 840ms'"""
+    return " · ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in timings.items())
@@ -0,0 +1,151 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+
+
+# =========================
+# ADAPTIVE TOKEN BUCKET
+# =========================
+class AdaptiveRateLimiter:
+    """
+    Token-bucket limiter shared by every crawler fetch, with AIMD rate control.
+
+    Each successful fetch faster than latency_target raises the rate by
+    additive_increase; an error, or a fetch slower than the target, multiplies
+    it by decrease_factor (at most once per cooldown, so one burst of failures
+    does not collapse the rate to the floor). The crawler therefore settles at
+    the highest request rate the site tolerates.
+
+    reserve() is non-blocking and returns how long the caller must wait, so the
+    same limiter works for threads (acquire) and asyncio (await asyncio.sleep).
+    """
+
+    def __init__(self, initial_rate=0.5, min_rate=0.05, max_rate=5.0, burst=1,
+                 additive_increase=0.05, decrease_factor=0.5, latency_target=10.0):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+        self.ewma_latency = None
+        self.successes = 0
+        self.errors = 0
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def reserve(self):
+        """Take one token and return the number of seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            # Token debt is paid back at the current rate
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, latency, ok=True):
+        """Feed back the outcome of one request and adapt the rate"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if latency is not None:
+                if self.ewma_latency is None:
+                    self.ewma_latency = latency
+                else:
+                    self.ewma_latency = 0.8 * self.ewma_latency + 0.2 * latency
+
+            slow = latency is not None and latency > self.latency_target
+            if ok:
+                self.successes += 1
+            else:
+                self.errors += 1
+
+            if ok and not slow:
+                self.rate = min(self.max_rate, self.rate + self.additive_increase)
+            elif now - self._last_decrease >= 1.0 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self._last_decrease = now
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate': round(self.rate, 3),
+                'ewma_latency': round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+                'successes': self.successes,
+                'errors': self.errors
+            }
+
+
+# =========================
+# RETRY SCHEDULING
+# =========================
+def backoff_delay(attempt, base=2.0, cap=300.0):
+    """Exponential backoff with full jitter for the given (1-based) attempt number"""
+    ceiling = min(cap, base * (2 ** (attempt - 1)))
+    return random.uniform(base / 2, max(base / 2, ceiling))
+
+
+class RetryQueue:
+    """
+    Time-ordered queue of failed work items waiting for another attempt.
+    push() schedules an item after an exponentially growing, jittered delay and
+    returns False once max_attempts is used up, so the caller can record it as
+    a permanent failure.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=2.0, max_delay=300.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def push(self, item, attempt, error=None):
+        """Schedule a retry after `attempt` failed tries; False if the item is exhausted"""
+        if attempt >= self.max_attempts:
+            return False
+        ready_at = time.monotonic() + backoff_delay(attempt, self.base_delay, self.max_delay)
+        with self._lock:
+            heapq.heappush(self._heap, (ready_at, next(self._counter), item, attempt, error))
+        return True
+
+    def pop_ready(self):
+        """Return (item, attempts_so_far) for the next due retry, or None if nothing is due"""
+        with self._lock:
+            if self._heap and self._heap[0][0] <= time.monotonic():
+                _, _, item, attempt, _ = heapq.heappop(self._heap)
+                return item, attempt
+        return None
+
+    def next_ready_in(self):
+        """Seconds until the earliest retry is due (0 if one is due now, None if empty)"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
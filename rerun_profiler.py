@@ -0,0 +1,200 @@
+"""
+Opt-in sampling profiler for Streamlit reruns.
+
+Streamlit re-executes the whole app script on every interaction. While a
+RerunProfiler is running, a background thread samples the script thread's
+stack every `interval` seconds (sys._current_frames, no tracing hooks, so the
+script runs at full speed) and attributes each sample to the script section
+(`# ====` banner) that the top-level statement being executed belongs to.
+
+Each rerun yields:
+  - wall and CPU time of the script thread
+  - samples per section (→ estimated ms per section)
+  - collapsed stacks ("rerun;[section];fn (file:line);... count"), written
+    to profiles/ for flamegraph.pl, speedscope or inferno
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# =========================
+# CONFIG
+# =========================
+PROFILE_DIR = "profiles"
+DEFAULT_INTERVAL = 0.005
+MAX_DURATION = 300.0  # stop sampling a rerun that never finished (e.g. interrupted by a new rerun)
+_BANNER = "# ========================="
+
+_active = {}  # script thread id -> running RerunProfiler
+_sections_cache = {}
+
+
+# =========================
+# SCRIPT SECTIONS
+# =========================
+def script_sections(path):
+    """[(first line, title)] from the `# ====` / `# Title` / `# ====` banners of a script"""
+    mtime = os.path.getmtime(path)
+    cached = _sections_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    sections = [(1, "setup")]
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    i = 0
+    while i < len(lines) - 1:
+        title = lines[i + 1].strip()
+        if lines[i].strip() == _BANNER and title.startswith("#") and title != _BANNER:
+            sections.append((i + 1, title.lstrip("#").strip()))
+            i += 3  # title and closing banner
+        else:
+            i += 1
+    _sections_cache[path] = (mtime, sections)
+    return sections
+
+
+def section_for(sections, lineno):
+    title = sections[0][1]
+    for start, name in sections:
+        if start > lineno:
+            break
+        title = name
+    return title
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+# =========================
+# PROFILER
+# =========================
+class RerunProfiler:
+    """Samples one thread's stack from a daemon thread between start() and stop()"""
+
+    def __init__(self, script_path, interval=DEFAULT_INTERVAL, max_duration=MAX_DURATION):
+        self.script_path = os.path.abspath(script_path)
+        self.interval = interval
+        self.max_duration = max_duration
+        self.sections = script_sections(self.script_path)
+        self.stacks = Counter()
+        self.section_samples = Counter()
+        self.samples = 0
+        self.thread_id = None
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        """Call from the script thread at the top of the rerun"""
+        stop_active()
+        self.thread_id = threading.get_ident()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self._sampler = threading.Thread(target=self._run, name="rerun-profiler", daemon=True)
+        _active[self.thread_id] = self
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        """Call from the script thread at the end of the rerun"""
+        if self.wall_seconds is None and threading.get_ident() == self.thread_id:
+            self.wall_seconds = time.perf_counter() - self._wall_start
+            self.cpu_seconds = time.thread_time() - self._cpu_start
+        self._stop.set()
+        if self._sampler is not None and self._sampler is not threading.current_thread():
+            self._sampler.join()
+        _active.pop(self.thread_id, None)
+        return self
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_duration
+        while not self._stop.wait(self.interval):
+            if time.monotonic() > deadline:
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._record(frame)
+        _active.pop(self.thread_id, None)
+
+    def _record(self, frame):
+        chain = []
+        while frame is not None:
+            chain.append(frame)
+            frame = frame.f_back
+        chain.reverse()  # root first
+        # Keep everything from the script's module frame down; Streamlit's runner frames are noise
+        for i, f in enumerate(chain):
+            if f.f_code.co_filename == self.script_path and f.f_code.co_name == "<module>":
+                section = section_for(self.sections, f.f_lineno)
+                labels = ["rerun", f"[{section}]"] + [_frame_label(g.f_code) for g in chain[i + 1:]]
+                break
+        else:
+            section = "(outside script)"
+            labels = ["rerun", f"[{section}]"]
+        self.stacks[";".join(labels)] += 1
+        self.section_samples[section] += 1
+        self.samples += 1
+
+    def section_breakdown(self):
+        """Rows of section, samples, share and estimated ms (sample share × wall time)"""
+        wall_ms = (self.wall_seconds or 0) * 1000
+        rows = []
+        for section, count in self.section_samples.most_common():
+            share = count / self.samples if self.samples else 0
+            rows.append({"section": section, "samples": count, "share": round(share, 3),
+                         "est_ms": round(share * wall_ms, 1)})
+        return rows
+
+    def collapsed(self):
+        """Brendan Gregg collapsed-stack text"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write(self, profile_dir=PROFILE_DIR):
+        """Write this rerun's collapsed stacks to profile_dir; returns the file path"""
+        os.makedirs(profile_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S") + f"_{int(time.time() * 1000) % 1000:03d}"
+        path = os.path.join(profile_dir, f"rerun_{stamp}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        return path
+
+
+def stop_active(thread_id=None):
+    """Stop a profiler left running on this thread by an interrupted rerun"""
+    profiler = _active.get(thread_id or threading.get_ident())
+    if profiler is not None:
+        profiler.stop()
+
+
+def merge_profiles(paths):
+    """Sum several .folded files (e.g. every rerun of a session) into one collapsed-stack text"""
+    stacks = Counter()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Merge rerun profiles into one collapsed-stack file")
+    parser.add_argument("profiles", nargs="*", help="default: every profiles/*.folded")
+    parser.add_argument("--out", default=os.path.join(PROFILE_DIR, "merged.folded"))
+    args = parser.parse_args()
+
+    paths = args.profiles or sorted(p for p in glob.glob(os.path.join(PROFILE_DIR, "*.folded"))
+                                    if not p.endswith("merged.folded"))
+    merged = merge_profiles(paths)
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write(merged)
+    print(f"✅ Merged {len(paths)} profiles into {args.out} (flamegraph.pl {args.out} > rerun.svg)")
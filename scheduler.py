@@ -0,0 +1,365 @@
+import hashlib
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from corpus import CORPUS_PATH, compile_corpus
+from graph_snapshot import SNAPSHOT_DIR, update_snapshot
+from scrape_output import JsonlStreamWriter, iter_jsonl, write_json_atomic
+
+
+# =========================
+# CONFIG
+# =========================
+STATE_PATH = "scheduler_state.json"
+LOCK_PATH = "scheduler.lock"
+CHANGE_FEED_PATH = "change_feed.jsonl"
+SCHEMES_JSON_PATH = "schemes.json"
+GRAPH_SNAPSHOT_PATH = SNAPSHOT_DIR
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# Per-scheme recrawl interval adapts between these bounds: halves when the page
+# changed since the last crawl, doubles when it did not.
+MIN_RECRAWL_INTERVAL = 1 * DAY
+MAX_RECRAWL_INTERVAL = 28 * DAY
+DEFAULT_RECRAWL_INTERVAL = 7 * DAY
+
+# A scheme whose crawl failed is retried after FAILURE_BACKOFF, doubling per
+# consecutive failure up to MAX_RECRAWL_INTERVAL
+FAILURE_BACKOFF = 1 * HOUR
+
+HISTORY_LIMIT = 20
+
+
+# =========================
+# SINGLE-INSTANCE LOCK
+# =========================
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class SingleInstanceLock:
+    """
+    Lock file holding the owner's PID. Created with O_EXCL so two schedulers
+    can never both acquire it; a lock left behind by a dead process is reclaimed.
+    """
+
+    def __init__(self, path=LOCK_PATH):
+        self.path = path
+        self.acquired = False
+
+    def acquire(self):
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    with open(self.path, "r") as f:
+                        pid = int(f.read().strip() or 0)
+                except (OSError, ValueError):
+                    pid = 0
+                if pid and _pid_alive(pid):
+                    return False
+                # Stale lock from a crashed run
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            self.acquired = True
+            return True
+        return False
+
+    def release(self):
+        if self.acquired:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.acquired = False
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RuntimeError(f"Another scheduler instance holds {self.path}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+# =========================
+# HELPERS
+# =========================
+def scheme_content_hash(record):
+    """Hash of a formatted scheme, ignoring the crawl timestamp"""
+    kb = dict(record.get('knowledge_base_entry', {}))
+    kb.pop('last_updated', None)
+    payload = json.dumps(kb, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _now():
+    return datetime.now()
+
+
+def _iso(dt):
+    return dt.isoformat(timespec="seconds")
+
+
+def _parse(ts):
+    return datetime.fromisoformat(ts) if ts else None
+
+
+# =========================
+# SCHEDULER
+# =========================
+class CrawlScheduler:
+    """
+    Cron-style scheduler for the crawler with persisted state.
+
+    Jobs (each with its own interval and jitter):
+      - listing_refresh: Phase 1 URL collection; new schemes become due at once
+      - detail_recrawl:  recrawls the most overdue schemes in small batches;
+                         schemes that changed recently are revisited more often
+      - index_rebuild:   folds the change feed into schemes.json, recompiles
+                         the scheme corpus and patches the knowledge graph
+                         snapshot for the changed schemes
+
+    Next-run times, per-scheme crawl state and run durations are stored in
+    scheduler_state.json, so a restart picks up exactly where it left off.
+    """
+
+    def __init__(self, scraper, state_path=STATE_PATH, lock_path=LOCK_PATH,
+                 change_feed_path=CHANGE_FEED_PATH, schemes_json_path=SCHEMES_JSON_PATH,
+                 graph_snapshot_path=GRAPH_SNAPSHOT_PATH, corpus_path=CORPUS_PATH, max_pages=None,
+                 recrawl_batch=25):
+        self.scraper = scraper
+        self.state_path = state_path
+        self.lock = SingleInstanceLock(lock_path)
+        self.change_feed_path = change_feed_path
+        self.schemes_json_path = schemes_json_path
+        self.graph_snapshot_path = graph_snapshot_path
+        self.corpus_path = corpus_path
+        self.max_pages = max_pages
+        self.recrawl_batch = recrawl_batch
+
+        # name -> (function, interval seconds, jitter seconds); order is run priority
+        self.jobs = {
+            'listing_refresh': (self.run_listing_refresh, 1 * DAY, 2 * HOUR),
+            'detail_recrawl': (self.run_detail_recrawl, 1 * HOUR, 10 * 60),
+            'index_rebuild': (self.run_index_rebuild, 1 * DAY, 1 * HOUR),
+        }
+        self.state = self.load_state()
+
+    # ---------- state ----------
+    def load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        else:
+            state = {}
+        state.setdefault('jobs', {})
+        state.setdefault('schemes', {})
+        state.setdefault('change_feed_offset', 0)
+        for name in self.jobs:
+            # Unknown jobs run immediately on first start
+            state['jobs'].setdefault(name, {'next_run': _iso(_now()), 'history': []})
+        return state
+
+    def save_state(self):
+        write_json_atomic(self.state_path, self.state)
+
+    def _schedule_next(self, name):
+        _, interval, jitter = self.jobs[name]
+        delay = interval + random.uniform(-jitter, jitter)
+        self.state['jobs'][name]['next_run'] = _iso(_now() + timedelta(seconds=delay))
+
+    # ---------- jobs ----------
+    def run_listing_refresh(self):
+        """Collect scheme URLs; new schemes get a due-now crawl entry"""
+        urls = self.scraper.scrape_all_scheme_urls(max_pages=self.max_pages)
+        if not urls:
+            raise RuntimeError("listing refresh found no schemes")
+        schemes = self.state['schemes']
+        added = 0
+        for scheme in urls:
+            if scheme['url'] not in schemes:
+                schemes[scheme['url']] = {
+                    'name': scheme['name'],
+                    'hash': None,
+                    'last_crawled': None,
+                    'last_changed': None,
+                    'interval': DEFAULT_RECRAWL_INTERVAL
+                }
+                added += 1
+        return f"{len(urls)} listed, {added} new"
+
+    def due_schemes(self, now=None):
+        """
+        Schemes whose recrawl is due, most overdue (relative to their interval)
+        first. Schemes retrying after failed crawls come after every other due
+        scheme, and only once their backoff has passed.
+        """
+        now = now or _now()
+        due = []
+        for url, info in self.state['schemes'].items():
+            next_attempt = _parse(info.get('next_attempt'))
+            if next_attempt is not None and next_attempt > now:
+                continue
+            healthy = not info.get('failures')
+            last = _parse(info.get('last_crawled'))
+            if last is None:
+                due.append((healthy, float("inf"), url))
+                continue
+            overdue = (now - last).total_seconds() / info.get('interval', DEFAULT_RECRAWL_INTERVAL)
+            if overdue >= 1:
+                due.append((healthy, overdue, url))
+        due.sort(reverse=True)
+        return [url for _, _, url in due]
+
+    def _record_failure(self, info, now):
+        info['failures'] = info.get('failures', 0) + 1
+        backoff = min(MAX_RECRAWL_INTERVAL, FAILURE_BACKOFF * 2 ** (info['failures'] - 1))
+        info['next_attempt'] = _iso(now + timedelta(seconds=backoff))
+
+    def run_detail_recrawl(self):
+        """Recrawl a batch of due schemes and append changed ones to the change feed"""
+        batch = self.due_schemes()[:self.recrawl_batch]
+        changed = failed = 0
+        with JsonlStreamWriter(self.change_feed_path) as feed:
+            for url in batch:
+                info = self.state['schemes'][url]
+                data = self.scraper.scrape_scheme_details(url)
+                now = _now()
+                if 'error' in data:
+                    failed += 1
+                    # Retry with backoff rather than waiting a full interval (or blocking every batch)
+                    self._record_failure(info, now)
+                    self.save_state()
+                    continue
+
+                record = self.scraper.format_for_ai_agent(data)
+                digest = scheme_content_hash(record)
+                if digest != info.get('hash'):
+                    if info.get('hash') is not None:
+                        info['interval'] = max(MIN_RECRAWL_INTERVAL, info['interval'] / 2)
+                    info['last_changed'] = _iso(now)
+                    info['hash'] = digest
+                    feed.write({'url': url, 'changed_at': _iso(now), 'record': record})
+                    changed += 1
+                else:
+                    info['interval'] = min(MAX_RECRAWL_INTERVAL, info['interval'] * 2)
+                info['last_crawled'] = _iso(now)
+                info.pop('failures', None)
+                info.pop('next_attempt', None)
+                # Persist per scheme so an interrupted batch is not recrawled
+                self.save_state()
+        return f"{len(batch)} crawled, {changed} changed, {failed} failed"
+
+    def run_index_rebuild(self):
+        """Fold new change-feed entries into schemes.json (atomic replace) and the graph snapshot"""
+        offset = self.state['change_feed_offset']
+        updates = {}
+        seen = 0
+        for seen, entry in enumerate(iter_jsonl(self.change_feed_path), 1):
+            if seen > offset:
+                updates[entry['url']] = entry['record']
+        if not updates:
+            return "no changes"
+
+        if os.path.exists(self.schemes_json_path):
+            with open(self.schemes_json_path, "r", encoding="utf-8") as f:
+                schemes = json.load(f)
+        else:
+            schemes = []
+
+        changed = list(updates.values())
+        renamed = []
+        merged = []
+        for entry in schemes:
+            kb = entry.get('knowledge_base_entry', {})
+            update = updates.pop(kb.get('source'), None)
+            if update is not None and update['knowledge_base_entry'].get('scheme') != kb.get('scheme'):
+                renamed.append(kb.get('scheme', "Unknown"))
+            merged.append(update or entry)
+        merged.extend(updates.values())
+
+        write_json_atomic(self.schemes_json_path, merged)
+        if self.corpus_path:
+            compile_corpus(merged, self.corpus_path)
+        if self.graph_snapshot_path:
+            if os.path.exists(self.graph_snapshot_path):
+                # The snapshot replaces schemes by name, so pass every record sharing a touched name
+                # (several pages can carry one name) and only remove names no record uses any more
+                touched = {r['knowledge_base_entry'].get('scheme', "Unknown") for r in changed} | set(renamed)
+                changed = [e for e in merged if e.get('knowledge_base_entry', {}).get('scheme', "Unknown") in touched]
+                still_used = {e['knowledge_base_entry'].get('scheme', "Unknown") for e in changed}
+                renamed = [name for name in renamed if name not in still_used]
+                update_snapshot(self.graph_snapshot_path, changed, removed_schemes=renamed)
+            else:
+                # First run: compile the whole merged file rather than just the delta
+                update_snapshot(self.graph_snapshot_path, merged)
+        self.state['change_feed_offset'] = seen
+        return f"{len(merged)} schemes written, {len(changed)} patched into the graph snapshot"
+
+    # ---------- loop ----------
+    def run_due_jobs(self):
+        """Run every job whose next_run has passed, in priority order"""
+        for name, (job, _, _) in self.jobs.items():
+            job_state = self.state['jobs'][name]
+            if _parse(job_state['next_run']) > _now():
+                continue
+
+            started = _now()
+            print(f"\n🚀 [{_iso(started)}] Running {name}")
+            start = time.monotonic()
+            try:
+                result = job()
+                status = "ok"
+                print(f"✅ {name}: {result}")
+            except Exception as e:
+                result = str(e)
+                status = "error"
+                print(f"❌ {name} failed: {e}")
+            duration = round(time.monotonic() - start, 2)
+
+            job_state['last_run'] = _iso(started)
+            job_state['last_duration'] = duration
+            job_state['last_status'] = status
+            job_state['history'] = (job_state.get('history', []) + [{
+                'started': _iso(started), 'duration': duration, 'status': status, 'result': result
+            }])[-HISTORY_LIMIT:]
+            self._schedule_next(name)
+            self.save_state()
+
+    def seconds_until_next(self):
+        next_runs = [_parse(j['next_run']) for j in self.state['jobs'].values()]
+        return max(0.0, (min(next_runs) - _now()).total_seconds())
+
+    def run_forever(self, max_sleep=15 * 60):
+        """Run jobs as they fall due; holds the single-instance lock for the whole run"""
+        with self.lock:
+            print("==============================================")
+            print("📅 CRAWL SCHEDULER STARTED")
+            for name, job_state in self.state['jobs'].items():
+                print(f"   {name}: next run {job_state['next_run']}")
+            print("==============================================\n")
+            while True:
+                self.run_due_jobs()
+                wait = min(max_sleep, self.seconds_until_next())
+                print(f"⏳ Sleeping {wait / 60:.1f} min until next check")
+                time.sleep(wait)
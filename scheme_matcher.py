@@ -0,0 +1,456 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+try:
+    from langchain.vectorstores import Chroma
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain.embeddings import HuggingFaceEmbeddings
+    from langchain.schema import Document
+except ImportError:
+    # Only needed for the vector store; the fake LLM and benchmarks run without it
+    Chroma = RecursiveCharacterTextSplitter = HuggingFaceEmbeddings = Document = None
+
+try:
+    from langchain_groq import ChatGroq
+except ImportError:
+    ChatGroq = None
+
+try:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+except ImportError:
+    ChatGoogleGenerativeAI = None
+
+from corpus import Corpus, ensure_corpus
+from eligibility_schema import load_table as load_eligibility_table
+import tracing
+from fake_llm import make_fake_llm
+from llm_router import LLMRouter, Provider
+from token_accounting import SUMMARY_CONTEXT_TOKENS, estimate_tokens, fit_context, response_usage
+
+
+# =========================
+# CONFIG
+# =========================
+JSON_PATH = "schemes.json"
+CORPUS_PATH = "schemes.db"
+ELIGIBILITY_JSON_PATH = "eligibility_summary-2.json"
+DB_DIR = "rag_db"
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GEMINI_MODEL = "gemini-2.0-flash-001"
+LLM_PROVIDERS = ("gemini", "grok")  # real backends; "fake" (fake_llm) is for tests and benchmarks
+PROVIDER_CONCURRENCY = 8
+CONTEXT_CACHE_SIZE = 256  # retrieved contexts kept per matcher (summary contexts repeat across users)
+
+
+# =========================
+# DATA LOADING
+# =========================
+def load_eligibility_data(path=ELIGIBILITY_JSON_PATH):
+    """{scheme_name: eligibility pairs}"""
+    with open(path, "r", encoding="utf-8") as f:
+        eligibility_json = json.load(f)
+    return {item["scheme_name"]: item["eligibility"] for item in eligibility_json}
+
+
+def _require_langchain():
+    if Chroma is None:
+        raise ImportError("langchain (with chromadb and sentence-transformers) is required for the vector store")
+
+
+def open_vectordb(db_dir=DB_DIR, embed_model=EMBED_MODEL):
+    """Open the persisted Chroma store, or None if it has not been built"""
+    if not os.path.exists(os.path.join(db_dir, "chroma.sqlite3")):
+        return None
+    _require_langchain()
+    embeddings = HuggingFaceEmbeddings(model_name=embed_model)
+    return Chroma(persist_directory=db_dir, embedding_function=embeddings)
+
+
+def build_vectordb(json_path=JSON_PATH, corpus_path=CORPUS_PATH, db_dir=DB_DIR, embed_model=EMBED_MODEL):
+    """Embed every scheme document into a new Chroma store; returns (vectordb, num_docs)"""
+    _require_langchain()
+    # Documents stream from the compiled corpus: only the precomputed retrieval text is read
+    with Corpus(ensure_corpus(json_path, corpus_path)) as corpus:
+        docs = [Document(page_content=text, metadata={"scheme": name}) for name, text in corpus.iter_documents()]
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
+    chunks = splitter.split_documents(docs)
+
+    embeddings = HuggingFaceEmbeddings(model_name=embed_model)
+    vectordb = Chroma.from_documents(chunks, embedding=embeddings, persist_directory=db_dir)
+    vectordb.persist()
+    return vectordb, len(docs)
+
+
+# =========================
+# LLM
+# =========================
+def make_llm(llm_choice, groq_key=None, gemini_key=None):
+    """Chat model for "grok" (Groq), "gemini" or "fake" (offline stand-in); raises if it cannot be initialised"""
+    if llm_choice.lower() == "grok":
+        if ChatGroq is None:
+            raise ImportError("langchain_groq is required for the Groq LLM")
+        return ChatGroq(model=GROQ_MODEL, temperature=0, api_key=groq_key or os.getenv("GROQ_API_KEY"))
+    if llm_choice.lower() == "gemini":
+        if ChatGoogleGenerativeAI is None:
+            raise ImportError("langchain_google_genai is required for the Gemini LLM")
+        if gemini_key:
+            return ChatGoogleGenerativeAI(model=GEMINI_MODEL, temperature=0, google_api_key=gemini_key)
+        return ChatGoogleGenerativeAI(model=GEMINI_MODEL, temperature=0)
+    if llm_choice.lower() == "fake":
+        return make_fake_llm()
+    raise ValueError(f"Unknown LLM choice: {llm_choice}")
+
+
+def make_llm_router(primary, groq_key=None, gemini_key=None, max_concurrency=PROVIDER_CONCURRENCY, **router_options):
+    """
+    LLMRouter with `primary` first and every other provider that can be
+    initialised as failover/hedge targets. Raises if none can be initialised.
+    The fake backend is never mixed with real providers.
+    """
+    if primary.lower() not in LLM_PROVIDERS:
+        order = [primary.lower()]
+    else:
+        order = [primary.lower()] + [p for p in LLM_PROVIDERS if p != primary.lower()]
+    providers, errors = [], []
+    for choice in order:
+        try:
+            providers.append(Provider(choice, make_llm(choice, groq_key, gemini_key), max_concurrency))
+        except Exception as e:
+            errors.append(f"{choice}: {e}")
+    if not providers:
+        raise RuntimeError("No LLM provider could be initialised (" + "; ".join(errors) + ")")
+    return LLMRouter(providers, **router_options)
+
+
+def profile_text(client_profile):
+    """One-paragraph description of the applicant for the eligibility prompt"""
+    return (
+        f"{client_profile.get('name', 'User')} is a {client_profile.get('age', '')}-year-old "
+        f"{client_profile.get('gender', '')} {client_profile.get('nationality', '')} citizen. "
+        f"They belong to the {client_profile.get('caste', 'General')} category. "
+        f"They are working as a {client_profile.get('occupation', '')} "
+        f"and pursuing {client_profile.get('education', '')}. "
+        f"Their annual income is {client_profile.get('income', 0)} rupees. "
+        f"Aadhaar linked: {client_profile.get('aadhaar_linked', False)}."
+    ).strip()
+
+
+def eligibility_prompt(person, criteria, scheme=None):
+    eligibility_text = ". ".join([f"{k}: {v}" for k, v in criteria.items()])
+    scheme_line = f"\n        Scheme Name: {scheme}\n" if scheme else ""
+    return f"""
+        You are an intelligent government scheme eligibility evaluator.
+        Evaluate whether this person is eligible for the scheme based on reasoning.
+        Base your judgment strictly on the scheme's eligibility criteria – don't assume missing data.
+        Consider caste, age, income, gender, occupation, and education.
+        Respond with a short logical explanation and end with "Eligible: Yes" or "Eligible: No".
+        {scheme_line}
+        Person Profile:
+        {person}
+
+        Scheme Eligibility Requirements:
+        {eligibility_text}
+
+        Answer:
+        """
+
+
+def is_eligible(reasoning_text):
+    return "eligible: yes" in reasoning_text.lower()
+
+
+# =========================
+# EVALUATION BUDGET
+# =========================
+class EvaluationBudget:
+    """
+    Limits for one matching run; any of them may be None (no limit).
+
+      max_eligible: stop once this many schemes were judged eligible
+      max_tokens:   stop once the LLM calls used this many tokens
+      max_seconds:  stop once the run has taken this long
+      min_score:    never call the LLM for candidates whose retrieval
+                    relevance score is below this
+
+    Evaluations already in flight when a limit is hit still complete. After
+    the run, report() says how much was evaluated and skipped, and why.
+    """
+
+    def __init__(self, max_eligible=None, max_tokens=None, max_seconds=None, min_score=None):
+        self.max_eligible = max_eligible
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.min_score = min_score
+        self.started_at = None
+        self.eligible = 0
+        self.evaluated = 0
+        self.tokens_used = 0
+        self.skipped_low_score = 0
+        self.skipped_budget = 0
+        self.stop_reason = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+
+    def admits(self, score):
+        return self.min_score is None or score is None or score >= self.min_score
+
+    def record(self, verdict):
+        self.evaluated += 1
+        self.tokens_used += verdict.get("tokens", 0)
+        if is_eligible(verdict["reasoning"]):
+            self.eligible += 1
+
+    def exhausted(self):
+        """Name of the limit that has been reached, or None"""
+        if self.max_eligible is not None and self.eligible >= self.max_eligible:
+            return "max_eligible"
+        if self.max_tokens is not None and self.tokens_used >= self.max_tokens:
+            return "max_tokens"
+        if self.max_seconds is not None and time.monotonic() - self.started_at >= self.max_seconds:
+            return "max_seconds"
+        return None
+
+    def report(self):
+        return {
+            "evaluated": self.evaluated,
+            "eligible": self.eligible,
+            "tokens_used": self.tokens_used,
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 2) if self.started_at else 0.0,
+            "skipped_low_score": self.skipped_low_score,
+            "skipped_budget": self.skipped_budget,
+            "stop_reason": self.stop_reason,
+        }
+
+
+# =========================
+# MATCHER
+# =========================
+class SchemeMatcher:
+    """
+    Retrieval + eligibility reasoning, independent of any UI. One instance
+    holds the vector store and eligibility data and is shared by everything in
+    a process (Streamlit session, API worker).
+    """
+
+    def __init__(self, vectordb, eligibility_data, eligibility_table=None, context_cache_size=CONTEXT_CACHE_SIZE):
+        self.vectordb = vectordb
+        self.eligibility_data = eligibility_data
+        self.eligibility_table = eligibility_table
+        self.context_cache_size = context_cache_size
+        self._context_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @classmethod
+    def load(cls, json_path=JSON_PATH, eligibility_json_path=ELIGIBILITY_JSON_PATH, db_dir=DB_DIR,
+             corpus_path=CORPUS_PATH, embed_model=EMBED_MODEL, build=True):
+        """
+        Open the vector store (building it on first run unless build=False)
+        and load the eligibility data
+        """
+        vectordb = open_vectordb(db_dir, embed_model)
+        if vectordb is None and build:
+            vectordb, _ = build_vectordb(json_path, corpus_path, db_dir, embed_model)
+        elif vectordb is None:
+            print(f"⚠️ No vector store in {db_dir}; retrieval will return nothing")
+        try:
+            table = load_eligibility_table(eligibility_json_path)
+        except Exception as e:
+            print(f"⚠️ Eligibility pre-filter unavailable: {e}")
+            table = None
+        return cls(vectordb, load_eligibility_data(eligibility_json_path), table)
+
+    def retrieve_context(self, query, k=10):
+        """Retrieve relevant context from vector database (LRU-cached per (query, k))"""
+        if self.vectordb is None:
+            return ""
+        key = (query, k)
+        with self._cache_lock:
+            if key in self._context_cache:
+                self._context_cache.move_to_end(key)
+                self.cache_hits += 1
+                return self._context_cache[key]
+            self.cache_misses += 1
+        with tracing.span("retrieve_context"):
+            retriever = self.vectordb.as_retriever(search_kwargs={"k": k})
+            results = retriever.get_relevant_documents(query)
+        context = "\n\n".join([r.page_content for r in results])
+        with self._cache_lock:
+            self._context_cache[key] = context
+            while len(self._context_cache) > self.context_cache_size:
+                self._context_cache.popitem(last=False)
+        return context
+
+    def clear_context_cache(self):
+        """Empty the context cache and reset its hit/miss counters"""
+        with self._cache_lock:
+            self._context_cache.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
+
+    def cache_stats(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "size": len(self._context_cache),
+                "hit_ratio": round(self.cache_hits / lookups, 3) if lookups else None}
+
+    def top_schemes(self, query, top_k=30, search_k=500):
+        """Get top relevant schemes based on query"""
+        if self.vectordb is None:
+            return []
+        with tracing.span("get_top_schemes"):
+            retriever = self.vectordb.as_retriever(search_kwargs={"k": search_k})
+            results = retriever.get_relevant_documents(query)
+        seen, top_schemes = set(), []
+        for doc in results:
+            name = doc.metadata.get("scheme")
+            if name and name not in seen:
+                top_schemes.append(name)
+                seen.add(name)
+            if len(top_schemes) >= top_k:
+                break
+        return top_schemes
+
+    def top_schemes_with_scores(self, query, top_k=30, search_k=500):
+        """[(scheme, relevance score in 0..1)] best first; a scheme scores as its best chunk"""
+        if self.vectordb is None:
+            return []
+        with tracing.span("get_top_schemes"):
+            results = self.vectordb.similarity_search_with_relevance_scores(query, k=search_k)
+        best = {}
+        for doc, score in results:
+            name = doc.metadata.get("scheme")
+            if name and score > best.get(name, float("-inf")):
+                best[name] = score
+        return sorted(best.items(), key=lambda item: -item[1])[:top_k]
+
+    def prefilter(self, client_profile, schemes):
+        """Drop schemes whose age/income/gender/state/category limits rule the profile out (no LLM call)"""
+        if self.eligibility_table is None:
+            return schemes
+        return self.eligibility_table.prefilter(client_profile, schemes)
+
+    def invoke(self, llm, prompt, purpose, ledger=None):
+        """
+        llm.invoke(prompt), recording usage in `ledger` if given. Through an
+        LLMRouter each call is recorded under the provider that served it,
+        including losing hedged calls.
+        """
+        with tracing.span("llm.invoke", purpose=purpose):
+            if ledger is None:
+                return llm.invoke(prompt)
+            if isinstance(llm, LLMRouter):
+                return llm.invoke(prompt, on_response=lambda provider, response, won: ledger.record(
+                    purpose, response_usage(response, prompt), provider=provider, hedge=not won))
+            response = llm.invoke(prompt)
+        ledger.record(purpose, response_usage(response, prompt))
+        return response
+
+    def evaluate(self, llm, person, scheme, ledger=None):
+        """
+        LLM reasoning for one scheme: {'reasoning': text, 'tokens': n}, or None
+        if it has no criteria. Token usage is also recorded in `ledger` if given.
+        """
+        criteria = self.eligibility_data.get(scheme)
+        if not criteria:
+            return None
+        prompt = eligibility_prompt(person, criteria, scheme)
+        try:
+            response = self.invoke(llm, prompt, "eligibility", ledger)
+            reasoning_text = response.content.strip()
+            usage = response_usage(response, prompt)
+        except Exception as e:
+            usage = {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": 0, "estimated": True}
+            if ledger is not None:
+                ledger.record("eligibility", usage, ok=False)
+            # Flagged so callers can tell "could not evaluate" apart from "not eligible"
+            return {"reasoning": f"Error during reasoning: {e}", "tokens": usage["prompt_tokens"], "error": True}
+        return {"reasoning": reasoning_text, "tokens": usage["prompt_tokens"] + usage["completion_tokens"]}
+
+    def filter_eligible(self, client_profile, schemes, llm, max_parallel=1, ledger=None):
+        """
+        Filter schemes based on eligibility criteria using LLM reasoning.
+        With max_parallel > 1 the per-scheme calls overlap; results keep the
+        relevance order of `schemes` either way.
+        """
+        person = profile_text(client_profile)
+        if max_parallel > 1 and len(schemes) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_parallel, len(schemes))) as pool:
+                futures = [tracing.submit(pool, self.evaluate, llm, person, s, ledger) for s in schemes]
+                verdicts = [future.result() for future in futures]
+        else:
+            verdicts = [self.evaluate(llm, person, s, ledger) for s in schemes]
+
+        filtered, reasoning_results = [], {}
+        for scheme, verdict in zip(schemes, verdicts):
+            if verdict is None:
+                continue
+            reasoning_results[scheme] = verdict
+            if is_eligible(verdict["reasoning"]):
+                filtered.append(scheme)
+        return filtered, reasoning_results
+
+    def iter_verdicts(self, client_profile, schemes, llm, max_parallel=4, budget=None, scores=None, ledger=None):
+        """
+        Yield (scheme, verdict) as each LLM evaluation finishes. Schemes are
+        started in the given (relevance) order, at most max_parallel at a
+        time, so the most relevant ones are evaluated first. With a budget,
+        candidates under budget.min_score (per `scores`) are never sent to the
+        LLM, and no new evaluation starts once a budget limit is reached.
+        Closing the generator (or abandoning it, e.g. when a Streamlit run is
+        interrupted) stops it from starting anything further.
+        """
+        person = profile_text(client_profile)
+        scores = scores or {}
+        budget = budget or EvaluationBudget()
+        budget.start()
+        queue = []
+        for scheme in schemes:
+            if not self.eligibility_data.get(scheme):
+                continue
+            if budget.admits(scores.get(scheme)):
+                queue.append(scheme)
+            else:
+                budget.skipped_low_score += 1
+        if not queue:
+            return
+        queue.reverse()  # pop() from the end = most relevant first
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(queue))))
+        pending = {}
+        try:
+            while queue or pending:
+                while queue and len(pending) < max_parallel and not budget.exhausted():
+                    scheme = queue.pop()
+                    pending[tracing.submit(pool, self.evaluate, llm, person, scheme, ledger)] = scheme
+                if queue and budget.exhausted():
+                    budget.stop_reason = budget.exhausted()
+                    budget.skipped_budget += len(queue)
+                    queue = []
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    verdict = future.result()
+                    budget.record(verdict)
+                    yield pending.pop(future), verdict
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def match(self, client_profile, query, llm, top_k=30, max_parallel=1, ledger=None):
+        """Query → candidate schemes → typed pre-filter → LLM verdicts"""
+        candidates = self.prefilter(client_profile, self.top_schemes(query, top_k=top_k))
+        return self.filter_eligible(client_profile, candidates, llm, max_parallel=max_parallel, ledger=ledger)
+
+    def summarize(self, scheme, llm, ledger=None, context_tokens=SUMMARY_CONTEXT_TOKENS):
+        """Plain-language summary of one scheme; retrieved context is trimmed to context_tokens"""
+        context = fit_context(self.retrieve_context(f"Summary of {scheme} scheme"), context_tokens)
+        prompt = f"Summarize the {scheme} scheme in simple language:\n\n{context}"
+        return self.invoke(llm, prompt, "summary", ledger).content
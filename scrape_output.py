@@ -0,0 +1,243 @@
+import csv
+import gzip
+import io
+import json
+import os
+import zlib
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+# Errors raised when a compressed stream ends inside a member/frame
+_TRUNCATION_ERRORS = (EOFError, OSError) if zstd is None else (EOFError, OSError, zstd.ZstdError)
+
+
+# =========================
+# COMPRESSION HELPERS
+# =========================
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def stream_path(base_path, compression=None):
+    """Return the on-disk filename for a JSONL stream with the given compression"""
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unsupported compression: {compression!r} (use None, 'gzip' or 'zstd')")
+    if compression == "zstd" and zstd is None:
+        raise ImportError("zstd compression requires the 'zstandard' package: pip install zstandard")
+    return base_path + COMPRESSION_SUFFIXES[compression]
+
+
+def _detect_compression(path):
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+# =========================
+# STREAMING WRITER
+# =========================
+class JsonlStreamWriter:
+    """
+    Append-only JSONL sink. Every record is encoded and written as soon as it
+    arrives, so memory stays constant.
+
+    Compressed streams keep one gzip member / zstd frame open for the whole
+    writer, so records share a compression window. The compressor is flushed
+    at fsync_every boundaries and on close; until then the newest records may
+    still sit in its buffer. A crash leaves a truncated member/frame, and
+    iter_jsonl reads every record up to the last flush. Plain streams are
+    flushed after every record and are readable at any point.
+
+    With fsync_every=N the file is fsynced every N records and again on close;
+    with the default of 0 durability is left to the OS.
+    """
+
+    def __init__(self, path, compression=None, fsync_every=0, level=None):
+        self.path = path
+        self.compression = compression if compression is not None else _detect_compression(path)
+        self.fsync_every = fsync_every
+        self.count = 0
+
+        if self.compression == "zstd" and zstd is None:
+            raise ImportError("zstd compression requires the 'zstandard' package: pip install zstandard")
+        if self.compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unsupported compression: {self.compression!r}")
+
+        self._file = open(path, "ab")
+        if self.compression == "gzip":
+            # Appending starts a new member, which gzip readers concatenate
+            self._stream = gzip.GzipFile(fileobj=self._file, mode="wb", compresslevel=level or 6)
+            self._flush_stream = lambda: self._stream.flush(zlib.Z_SYNC_FLUSH)
+        elif self.compression == "zstd":
+            compressor = zstd.ZstdCompressor(level=level or 3)
+            self._stream = compressor.stream_writer(self._file, closefd=False)
+            self._flush_stream = lambda: self._stream.flush(zstd.FLUSH_BLOCK)
+        else:
+            self._stream = None
+
+    def write(self, record):
+        """Encode one record as a JSON line and push it to disk"""
+        raw = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self.count += 1
+        boundary = self.fsync_every and self.count % self.fsync_every == 0
+
+        if self._stream is None:
+            self._file.write(raw)
+            self._file.flush()
+        else:
+            self._stream.write(raw)
+            if boundary:
+                # Emit everything buffered so far as complete, decodable blocks
+                self._flush_stream()
+                self._file.flush()
+
+        if boundary:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            if self._stream is not None:
+                # Ends the gzip member / zstd frame; the underlying file stays open
+                self._stream.close()
+            self._file.flush()
+            # Only pay for a final fsync when the caller asked for durability;
+            # short-lived writers (one per cached page) would otherwise sync on every close
+            if self.fsync_every:
+                os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# =========================
+# STREAMING READER
+# =========================
+def _open_stream(path):
+    compression = _detect_compression(path)
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        if zstd is None:
+            raise ImportError("Reading .zst streams requires the 'zstandard' package: pip install zstandard")
+        raw = open(path, "rb")
+        reader = zstd.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.BufferedReader(reader)
+    return open(path, "rb")
+
+
+def _decode_line(line):
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        # Half-written line from an interrupted run
+        return None
+
+
+def iter_jsonl(path):
+    """
+    Yield records from a (possibly compressed) JSONL stream one at a time.
+    A truncated tail left by an interrupted scrape is skipped silently.
+    """
+    if not os.path.exists(path):
+        return
+
+    with _open_stream(path) as f:
+        try:
+            for line in f:
+                record = _decode_line(line)
+                if record is not None:
+                    yield record
+        except _TRUNCATION_ERRORS:
+            # Compressed member cut off mid-write; everything before it is intact
+            return
+
+
+# =========================
+# DERIVED OUTPUTS (second pass)
+# =========================
+SUMMARY_HEADER = [
+    "Scheme Name",
+    "Eligibility Count",
+    "Benefits Count",
+    "Documents Count",
+    "Application Steps Count",
+    "Has Contact Info",
+    "Source URL"
+]
+
+
+def write_summary_csv(schemes_path, csv_path):
+    """Derive the per-scheme summary CSV from a scheme stream; returns the row count"""
+    rows = 0
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_HEADER)
+        for scheme in iter_jsonl(schemes_path):
+            kb = scheme.get('knowledge_base_entry', {})
+            ki = kb.get('key_information', {})
+            writer.writerow([
+                kb.get('scheme', 'Unknown'),
+                len(ki.get('eligibility_criteria', [])),
+                len(ki.get('benefits', [])),
+                len(ki.get('required_documents', [])),
+                len(ki.get('application_steps', [])),
+                'Yes' if kb.get('contact', {}) else 'No',
+                kb.get('source', '')
+            ])
+            rows += 1
+    return rows
+
+
+def write_failed_csv(failed_path, csv_path):
+    """Derive the failed-schemes CSV from a failure stream; returns the row count"""
+    rows = 0
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Scheme Name", "URL", "Error"])
+        for failed in iter_jsonl(failed_path):
+            writer.writerow([failed.get('name', ''), failed.get('url', ''), failed.get('error', '')])
+            rows += 1
+    return rows
+
+
+def export_json_array(schemes_path, json_path):
+    """
+    Stream a JSONL scheme file into the JSON array layout used by schemes.json.
+    Records are copied one at a time, so the corpus is never held in memory.
+    """
+    count = 0
+    with open(json_path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for scheme in iter_jsonl(schemes_path):
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(scheme, ensure_ascii=False))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def count_records(path):
+    """Count records in a stream without keeping them"""
+    return sum(1 for _ in iter_jsonl(path))
+
+
+def write_json_atomic(path, data, indent=2):
+    """Write JSON to a temp file and rename it over `path`, so readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+from graph_snapshot import GraphSnapshot, update_snapshot
+from knowledge_graph import AttributeIndex, build_graph
+
+
+def _entry(scheme, **key_information):
+    return {"knowledge_base_entry": {"scheme": scheme, "key_information": key_information}}
+
+
+def _canonical(snapshot):
+    nodes = {(snapshot.name(i), snapshot.type_of(i)) for i in range(snapshot.number_of_nodes())}
+    edges = [(snapshot.name(src), snapshot.name(dst), rel) for src, dst, rel in snapshot.edges()]
+    return nodes, sorted(edges)
+
+
+def _assert_same_as_full_build(tmp_path, data):
+    full = GraphSnapshot.from_graph(build_graph(data))
+    incremental = update_snapshot(str(tmp_path / "kg"), data)
+    assert incremental.number_of_nodes() == full.number_of_nodes()
+    assert incremental.number_of_edges() == full.number_of_edges()
+    assert _canonical(incremental) == _canonical(full)
+
+
+def test_update_from_empty_matches_full_build(tmp_path):
+    data = [
+        # Repeated attribute within one record and a shared name across records
+        _entry("Quick Links", eligibility_criteria=["Resident of India", "Resident of India"]),
+        _entry("PM Kisan", eligibility_criteria=["Resident of India", "Small farmer"], benefits="Rs 6000"),
+        _entry("Quick Links", benefits=["Free training"], required_documents=["Aadhaar Card"]),
+        # Same attribute under a different relation: the last one wins
+        _entry("Skill Scheme", eligibility_criteria=["Aadhaar Card"], benefits=["Free training", " "]),
+    ]
+    _assert_same_as_full_build(tmp_path, data)
+
+
+@pytest.mark.skipif(not os.path.exists("schemes.json"), reason="schemes.json not available")
+def test_update_from_empty_matches_full_build_on_schemes_json(tmp_path):
+    with open("schemes.json", "r", encoding="utf-8") as f:
+        data = json.load(f)
+    _assert_same_as_full_build(tmp_path, data)
+
+
+def test_attribute_index_from_snapshot_matches_networkx():
+    data = [
+        _entry("PM Kisan", eligibility_criteria=["Resident of India", "Small farmer"], benefits="Rs 6000"),
+        _entry("Skill Scheme", eligibility_criteria=["Resident of India"], benefits=["Free training"]),
+    ]
+    G = build_graph(data)
+    expected = AttributeIndex.from_graph(G)
+    actual = AttributeIndex.from_graph(GraphSnapshot.from_graph(G))
+    for field in ("schemes", "attributes", "attribute_types", "attribute_schemes", "postings", "vocabulary"):
+        assert getattr(actual, field) == getattr(expected, field)
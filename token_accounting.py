@@ -0,0 +1,206 @@
+"""
+Token and cost accounting for LLM calls.
+
+Per call:  response_usage() reads prompt/completion tokens from the provider's
+           usage metadata, falling back to a local estimate (tiktoken if
+           installed, else ~4 characters per token)
+Per query: TokenLedger sums the calls of one query by purpose (eligibility,
+           summary) and prices them with PRICES_PER_MILLION
+Per user:  UsageLog appends each query's totals to token_usage.jsonl, next to
+           the search history
+
+fit_context() keeps retrieved context within a token budget before it is put
+into a prompt.
+"""
+import os
+import threading
+from datetime import datetime
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+from scrape_output import JsonlStreamWriter, iter_jsonl
+
+
+# =========================
+# CONFIG
+# =========================
+CHARS_PER_TOKEN = 4
+# USD per 1M tokens (input, output); check the providers' pricing pages when models change
+PRICES_PER_MILLION = {
+    "gemini": (0.10, 0.40),   # gemini-2.0-flash
+    "grok": (0.59, 0.79),     # llama-3.3-70b-versatile on Groq
+    "fake": (0.0, 0.0),
+}
+SUMMARY_CONTEXT_TOKENS = 1500  # retrieved context is 10 chunks × 800 chars ≈ 2000 tokens untrimmed
+USAGE_LOG_PATH = "token_usage.jsonl"
+
+_encoding = None
+
+
+# =========================
+# COUNTING
+# =========================
+def estimate_tokens(text):
+    """
+    Local token count when the provider reports none: tiktoken's cl100k
+    encoding if installed (close to the Llama/Gemini tokenizers for English),
+    otherwise ~4 characters per token.
+    """
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def response_usage(response, prompt):
+    """
+    {'prompt_tokens', 'completion_tokens', 'estimated'} for one LLM call:
+    the provider's usage metadata when the response carries it, else a local
+    estimate of the prompt and the reply.
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None:
+        return {"prompt_tokens": usage["input_tokens"], "completion_tokens": usage.get("output_tokens", 0),
+                "estimated": False}
+    metadata = getattr(response, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") or {}          # Groq / OpenAI style
+    if token_usage.get("prompt_tokens") is not None:
+        return {"prompt_tokens": token_usage["prompt_tokens"],
+                "completion_tokens": token_usage.get("completion_tokens", 0), "estimated": False}
+    gemini_usage = metadata.get("usage_metadata") or {}       # older langchain_google_genai
+    if gemini_usage.get("prompt_token_count") is not None:
+        return {"prompt_tokens": gemini_usage["prompt_token_count"],
+                "completion_tokens": gemini_usage.get("candidates_token_count", 0), "estimated": False}
+    return {"prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(getattr(response, "content", "") or ""), "estimated": True}
+
+
+def call_cost(provider, prompt_tokens, completion_tokens):
+    input_price, output_price = PRICES_PER_MILLION.get(provider, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+# =========================
+# CONTEXT BUDGET
+# =========================
+def fit_context(context, max_tokens=SUMMARY_CONTEXT_TOKENS):
+    """
+    Trim retrieved context to max_tokens. Chunks (separated by blank lines,
+    best match first) are compressed by dropping repeated lines and runs of
+    whitespace, then kept whole in retrieval order while they fit. If even
+    the first chunk is too long it is cut off.
+    """
+    if not context or estimate_tokens(context) <= max_tokens:
+        return context
+    seen_lines, chunks = set(), []
+    for chunk in context.split("\n\n"):
+        lines = []
+        for line in chunk.splitlines():
+            line = " ".join(line.split())
+            if line and line not in seen_lines:
+                seen_lines.add(line)
+                lines.append(line)
+        if lines:
+            chunks.append("\n".join(lines))
+
+    kept, used = [], 0
+    for chunk in chunks:
+        tokens = estimate_tokens(chunk)
+        if used + tokens > max_tokens:
+            break
+        kept.append(chunk)
+        used += tokens
+    if not kept and chunks:
+        kept = [chunks[0][:max_tokens * CHARS_PER_TOKEN].rstrip() + " …"]
+    return "\n\n".join(kept)
+
+
+# =========================
+# LEDGERS
+# =========================
+class TokenLedger:
+    """Token counts and cost for one query (or any other unit of work), by purpose and provider; thread-safe"""
+
+    def __init__(self, provider=None):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failed_calls = 0
+        self.estimated_calls = 0
+        self.hedge_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.by_purpose = {}
+        self.by_provider = {}
+
+    def record(self, purpose, usage, ok=True, provider=None, hedge=False):
+        """
+        Add one call, priced at the rates of the provider that served it
+        (default: the ledger's provider). hedge=True marks a losing hedged
+        call: its answer was discarded but its tokens were still used.
+        """
+        provider = provider or self.provider
+        cost = call_cost(provider, usage["prompt_tokens"], usage["completion_tokens"])
+        with self._lock:
+            self.calls += 1
+            self.failed_calls += 0 if ok else 1
+            self.estimated_calls += 1 if usage.get("estimated") else 0
+            self.hedge_calls += 1 if hedge else 0
+            self.prompt_tokens += usage["prompt_tokens"]
+            self.completion_tokens += usage["completion_tokens"]
+            self.cost_usd += cost
+            for key, table in ((purpose, self.by_purpose), (provider, self.by_provider)):
+                row = table.setdefault(key, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+                row["calls"] += 1
+                row["prompt_tokens"] += usage["prompt_tokens"]
+                row["completion_tokens"] += usage["completion_tokens"]
+
+    def totals(self):
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "calls": self.calls,
+                "failed_calls": self.failed_calls,
+                "estimated_calls": self.estimated_calls,
+                "hedge_calls": self.hedge_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+                "cost_usd": round(self.cost_usd, 6),
+                "by_purpose": {k: dict(v) for k, v in self.by_purpose.items()},
+                "by_provider": {k: dict(v) for k, v in self.by_provider.items()},
+            }
+
+
+class UsageLog:
+    """Append-only per-query token totals (token_usage.jsonl, next to the user history)"""
+
+    def __init__(self, path=USAGE_LOG_PATH):
+        self.path = path
+
+    def append(self, user_id, query, totals, timestamp=None):
+        with JsonlStreamWriter(self.path) as writer:
+            writer.write({"user_id": user_id, "timestamp": timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                          "query": query, **totals})
+
+    def user_totals(self, user_id):
+        """Summed tokens and cost over every logged query of one user"""
+        totals = {"queries": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cost_usd": 0.0}
+        if not os.path.exists(self.path):
+            return totals
+        for record in iter_jsonl(self.path):
+            if record.get("user_id") != user_id:
+                continue
+            totals["queries"] += 1
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens", "cost_usd"):
+                totals[key] += record.get(key, 0)
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        return totals
@@ -0,0 +1,320 @@
+"""
+Lightweight per-stage tracing and metrics.
+
+    with tracing.span("retrieve_context"):
+        ...
+
+Two independent consumers:
+  - metrics: with SAHAYAK_TRACING=1 (or enable()), every span feeds a latency
+    histogram and error counter, exported in Prometheus text format
+    (prometheus_text(), the API server's /metrics, or serve_metrics(port))
+  - request traces: inside start_trace()/trace(), spans are also collected
+    into a Trace, for a per-request timing breakdown (the app's debug panel,
+    the API's Server-Timing header)
+
+When neither is active, span() returns a shared no-op context manager after
+one global check and one context-variable lookup.
+
+Spans started in worker threads belong to the caller's trace only if the
+work was submitted with tracing.submit() (or via contextvars.copy_context()).
+"""
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# =========================
+# CONFIG
+# =========================
+ENABLED = os.getenv("SAHAYAK_TRACING") == "1"
+METRIC_PREFIX = "sahayak"
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MAX_TRACE_SPANS = 5000
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+# =========================
+# METRICS REGISTRY
+# =========================
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Counters and histograms keyed by (name, labels); thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self.counters}):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+                for (n, key), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{METRIC_PREFIX}_{name}{_format_labels(key)} {value}")
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} histogram")
+                for (n, key), h in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(h.buckets) + ["+Inf"], h.counts):
+                        cumulative += count
+                        lines.append(f"{METRIC_PREFIX}_{name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                    lines.append(f"{METRIC_PREFIX}_{name}_sum{_format_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{METRIC_PREFIX}_{name}_count{_format_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def prometheus_text():
+    return REGISTRY.prometheus_text()
+
+
+def inc(name, amount=1, **labels):
+    """Increment a counter (only while metrics are enabled)"""
+    if ENABLED:
+        REGISTRY.inc(name, amount, **labels)
+
+
+# =========================
+# REQUEST TRACES
+# =========================
+_current = contextvars.ContextVar("sahayak_trace", default=None)
+
+
+class Trace:
+    """Spans of one request: (name, labels, start offset, duration, error)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.finished = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name, labels, start, duration, error=False):
+        with self._lock:
+            if len(self.spans) < MAX_TRACE_SPANS:
+                self.spans.append((name, labels, start - self.started, duration, error))
+
+    @property
+    def total_seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def breakdown(self):
+        """One row per span name: calls, total/max ms, errors; slowest total first"""
+        rows = {}
+        with self._lock:
+            spans = list(self.spans)
+        for name, _, _, duration, error in spans:
+            row = rows.setdefault(name, {"stage": name, "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0})
+            row["calls"] += 1
+            row["total_ms"] += duration * 1000
+            row["max_ms"] = max(row["max_ms"], duration * 1000)
+            row["errors"] += int(error)
+        for row in rows.values():
+            row["total_ms"] = round(row["total_ms"], 1)
+            row["max_ms"] = round(row["max_ms"], 1)
+        return sorted(rows.values(), key=lambda r: -r["total_ms"])
+
+    def server_timing(self):
+        """Server-Timing header value (durations in ms)"""
+        return ", ".join(f'{r["stage"].replace(".", "_")};dur={r["total_ms"]}' for r in self.breakdown())
+
+
+def current_trace():
+    return _current.get()
+
+
+def start_trace(name="request"):
+    """Collect spans from this context into a new Trace (replacing any unfinished one)"""
+    trace_obj = Trace(name)
+    _current.set(trace_obj)
+    return trace_obj
+
+
+def finish_trace():
+    """Stop collecting; returns the finished Trace (or None)"""
+    trace_obj = _current.get()
+    if trace_obj is not None:
+        trace_obj.finished = time.perf_counter()
+        _current.set(None)
+        if ENABLED:
+            REGISTRY.observe("request_seconds", trace_obj.total_seconds, request=trace_obj.name)
+    return trace_obj
+
+
+@contextmanager
+def trace(name="request"):
+    token = _current.set(Trace(name))
+    trace_obj = _current.get()
+    try:
+        yield trace_obj
+    finally:
+        trace_obj.finished = time.perf_counter()
+        _current.reset(token)
+        if ENABLED:
+            REGISTRY.observe("request_seconds", trace_obj.total_seconds, request=trace_obj.name)
+
+
+# =========================
+# SPANS
+# =========================
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "labels", "trace", "start")
+
+    def __init__(self, name, labels, trace_obj):
+        self.name = name
+        self.labels = labels
+        self.trace = trace_obj
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _finish(self.name, self.labels, self.trace, self.start, duration, exc_type is not None)
+        return False
+
+
+def _finish(name, labels, trace_obj, start, duration, error):
+    if ENABLED:
+        REGISTRY.observe("span_seconds", duration, span=name, **labels)
+        if error:
+            REGISTRY.inc("span_errors_total", span=name, **labels)
+    if trace_obj is not None:
+        trace_obj.add(name, labels, start, duration, error)
+
+
+def span(name, **labels):
+    """Time a block; a no-op unless metrics are enabled or a trace is active"""
+    trace_obj = _current.get()
+    if not ENABLED and trace_obj is None:
+        return _NOOP
+    return _Span(name, labels, trace_obj)
+
+
+def record(name, seconds, **labels):
+    """Add an already-measured duration (e.g. a stage timed inside an OCR worker process)"""
+    trace_obj = _current.get()
+    if not ENABLED and trace_obj is None:
+        return
+    _finish(name, labels, trace_obj, time.perf_counter() - seconds, seconds, False)
+
+
+def traced(name):
+    """Decorator form of span()"""
+    def decorator(fn):
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorator
+
+
+def submit(pool, fn, *args):
+    """pool.submit that carries the current trace into the worker thread"""
+    if _current.get() is None:
+        return pool.submit(fn, *args)
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+# =========================
+# METRICS ENDPOINT
+# =========================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread (for processes without their own HTTP server, e.g. Streamlit)"""
+    enable()
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server